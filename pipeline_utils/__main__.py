@@ -16,20 +16,39 @@ import argparse
 
 # Commands
 from pipeline_utils import pipeline_deploy
+from pipeline_utils import watch
+from pipeline_utils import validate
+from pipeline_utils import analyze
+from pipeline_utils import cost
+from pipeline_utils import dry_run
+from pipeline_utils import qc_eval
 
 
 # Variables
 PIPELINE_DEPLOY = 'pipeline_deploy'
+WATCH = 'watch'
+VALIDATE = 'validate'
+ANALYZE = 'analyze'
+COST = 'cost'
+DRY_RUN = 'dry_run'
+QC_EVAL = 'qc_eval'
 CONSORTIA_ALIAS = ['smaht']
 SUBMISSION_CENTERS_ALIAS = ['smaht_dac']
 KEYS_ALIAS = '~/.cgap-keys.json'
 MAIN_ALIAS = 'main'
 BUILDER_ALIAS = '<ff-env>-pipeline-builder'
-
-
-# MAIN
-def main(args=None):
-    '''Command line wrapper around available commands.
+BUILD_POLL_INTERVAL_ALIAS = 30
+BUILD_JOBS_ALIAS = 4
+POLL_INTERVAL_ALIAS = 0.2
+INPUT_SIZE_ALIAS = 1.0
+TOLERANCE_ALIAS = 0.1
+SAMPLE_COLUMN_ALIAS = 'sample'
+
+
+# PARSER
+def build_parser():
+    '''Create the parser for the command line, with a subparser for each command.
+    Returns the parser and the subparsers map.
     '''
     # Adding parser and subparsers
     parser = argparse.ArgumentParser(prog='smaht_pipeline_utils', description='Collection of utilities for deploying pipelines and interfacing with portal infrastructure')
@@ -44,6 +63,15 @@ def main(args=None):
     pipeline_deploy_parser.add_argument('--branch', required=False, help=f'Branch to use to deploy Docker containers to AWS ECR through AWS CodeBuild [{MAIN_ALIAS}]',
                                                         default=MAIN_ALIAS)
     pipeline_deploy_parser.add_argument('--local-build', action='store_true', help='Trigger a local build for Docker containers instead of using AWS CodeBuild')
+    pipeline_deploy_parser.add_argument('--build-cache', action='store_true', help='Reuse unchanged layers from the previous image in local builds for Docker containers, base images are still pulled. By default local builds do not use cache')
+    pipeline_deploy_parser.add_argument('--cache-from-version', required=False, help='Version of the images to use as cache with --build-cache [most recent image in AWS ECR]')
+    pipeline_deploy_parser.add_argument('--build-jobs', required=False, type=int, help=f'Maximum number of local builds for Docker containers to run at the same time [{BUILD_JOBS_ALIAS}]',
+                                                        default=BUILD_JOBS_ALIAS)
+    pipeline_deploy_parser.add_argument('--wait-builds', action='store_true', help='Wait for the AWS CodeBuild runs to complete and report their status. Exit with an error if any build failed')
+    pipeline_deploy_parser.add_argument('--build-poll-interval', required=False, type=int, help=f'Seconds between status checks for the AWS CodeBuild runs when waiting for the builds [{BUILD_POLL_INTERVAL_ALIAS}]',
+                                                                 default=BUILD_POLL_INTERVAL_ALIAS)
+    pipeline_deploy_parser.add_argument('--batch-build', action='store_true', help='Build all Docker containers with a single AWS CodeBuild batch build, images are built after the images they use as base')
+    pipeline_deploy_parser.add_argument('--rebuild-images', action='store_true', help='Build all Docker container images, even if an image built from the same build context is already available in AWS ECR. Use to refresh base images')
     pipeline_deploy_parser.add_argument('--repos', required=True, nargs='+', help='List of directories for the repositories to deploy, each repository must follow the expected structure (see docs)')
     pipeline_deploy_parser.add_argument('--keydicts-json', required=False, help=f'Path to file with keys for portal auth in JSON format [{KEYS_ALIAS}]',
                                                            default=KEYS_ALIAS)
@@ -61,23 +89,111 @@ def main(args=None):
     pipeline_deploy_parser.add_argument('--post-reference-genome', action='store_true', help='POST|PATCH ReferenceGenome objects')
     pipeline_deploy_parser.add_argument('--post-workflow', action='store_true', help='POST|PATCH Workflow objects')
     pipeline_deploy_parser.add_argument('--post-metaworkflow', action='store_true', help='POST|PATCH MetaWorkflow objects')
-    pipeline_deploy_parser.add_argument('--post-wfl', action='store_true', help='Upload Workflow Description files (.cwl, .wdl)')
+    pipeline_deploy_parser.add_argument('--post-wfl', action='store_true', help='Upload Workflow Description files (.cwl, .wdl) used by the Workflow objects')
+    pipeline_deploy_parser.add_argument('--force-wfl', action='store_true', help='Upload Workflow Description files even if unchanged from the files already uploaded for the version')
     pipeline_deploy_parser.add_argument('--post-ecr', action='store_true', help='Build Docker container images and push to AWS ECR. By default will use AWS CodeBuild unless --local-build flag is set')
+    pipeline_deploy_parser.add_argument('--parallel-phases', action='store_true', help='Deploy portal objects, upload Workflow Description files and build Docker container images at the same time')
+    pipeline_deploy_parser.add_argument('--export-bundle', required=False, help='Path to file to write the JSON objects created for the portal objects in NDJSON format, with type, alias and content hash for each object. Turn off POST|PATCH action for portal objects')
+    pipeline_deploy_parser.add_argument('--from-bundle', required=False, help='Path to bundle file written with --export-bundle. POST|PATCH the portal objects from the bundle instead of the YAML files, objects are not validated again')
 
     pipeline_deploy_parser.add_argument('--version-file', required=False, help='Path to version file to use. This will override the version for all the repositories')
     pipeline_deploy_parser.add_argument('--debug', action='store_true', help='Turn off POST|PATCH action')
     pipeline_deploy_parser.add_argument('--verbose', action='store_true', help='Print the JSON structure created for the objects')
 
     pipeline_deploy_parser.add_argument('--validate', action='store_true', help='Validate YAML objects against schemas. Turn off POST|PATCH action and ignore --verbose and --debug flags')
+    pipeline_deploy_parser.add_argument('--profile', action='store_true', help='Report the time spent in each phase of the deploy and in each stage for the objects, e.g. load, validate, upload, build')
+    pipeline_deploy_parser.add_argument('--profile-output', required=False, help='Path to file to write cProfile statistics for the run, the file can be read with pstats or snakeviz. Only the main thread is profiled, cannot be used with --parallel-phases')
+    pipeline_deploy_parser.add_argument('--metrics-json', required=False, help='Path to file to write the metrics for the run in JSON format, counts of objects by type and outcome and latencies for network calls')
+    pipeline_deploy_parser.add_argument('--trace-file', required=False, help='Path to file to write a timeline of the run in Chrome Trace Event format, with spans for repositories, phases, objects and network calls. The file can be opened in Perfetto or chrome://tracing')
 
     # sentieon-specific
     pipeline_deploy_parser.add_argument('--sentieon-server', required=False, help='Address for Sentieon license server',
                                                              default=None)
 
+    # Add watch to subparsers
+    watch_parser = subparsers.add_parser(WATCH, description='Utility to validate and convert portal objects from target repositories every time the files change',
+                                                help='Utility to validate and convert portal objects from target repositories every time the files change')
+
+    watch_parser.add_argument('--repos', required=True, nargs='+', help='List of directories for the repositories to watch, each repository must follow the expected structure (see docs)')
+    watch_parser.add_argument('--wfl-bucket', required=False, help='Bucket to use for Workflow Description files in Workflow objects [<wfl-bucket> placeholder]')
+    watch_parser.add_argument('--consortia', required=False, nargs='+', help='List of consortia to use for the objects',
+                                             default=CONSORTIA_ALIAS)
+    watch_parser.add_argument('--submission-centers', required=False, nargs='+', help='List of centers to use for the objects',
+                                                      default=SUBMISSION_CENTERS_ALIAS)
+    watch_parser.add_argument('--poll-interval', required=False, type=float, help=f'Seconds between checks for changes in the files [{POLL_INTERVAL_ALIAS}]',
+                                                 default=POLL_INTERVAL_ALIAS)
+    watch_parser.add_argument('--verbose', action='store_true', help='Print the JSON structure created for the objects')
+
+    # Add validate to subparsers
+    validate_parser = subparsers.add_parser(VALIDATE, description='Utility to validate YAML files for portal objects against schemas, the object type is inferred from the file path',
+                                                      help='Utility to validate YAML files for portal objects against schemas')
+
+    validate_parser.add_argument('files', nargs='+', help='List of YAML files to validate')
+    validate_parser.add_argument('--jobs', required=False, type=int, help='Maximum number of files to validate at the same time [number of CPUs]')
+    validate_parser.add_argument('--json', action='store_true', help='Print the validation report in JSON format')
+
+    # Add analyze to subparsers
+    analyze_parser = subparsers.add_parser(ANALYZE, description='Utility to analyze the graph of the steps for MetaWorkflow objects, report unknown steps and inputs, cycles, depth, maximum parallel steps and critical path',
+                                                    help='Utility to analyze the graph of the steps for MetaWorkflow objects')
+
+    analyze_parser.add_argument('files', nargs='+', help='List of YAML files for MetaWorkflow objects to analyze')
+    analyze_parser.add_argument('--dimensions', required=False, nargs='+', type=int, help='Size of each input dimension, e.g. 30 24 for 30 samples with 24 shards each. Simulate the runs for each step from scatter, gather and fixed shards, and report dimension mismatches')
+    analyze_parser.add_argument('--json', action='store_true', help='Print the analysis report in JSON format')
+
+    # Add cost to subparsers
+    cost_parser = subparsers.add_parser(COST, description='Utility to estimate vCPU-hours, EBS-GB-hours and cost for a run of MetaWorkflow objects, from the config of the steps and a price table',
+                                              help='Utility to estimate resources and cost for a run of MetaWorkflow objects')
+
+    cost_parser.add_argument('files', nargs='+', help='List of YAML files for MetaWorkflow objects to estimate')
+    cost_parser.add_argument('--dimensions', required=True, nargs='+', type=int, help='Size of each input dimension, e.g. 30 24 for 30 samples with 24 shards each')
+    cost_parser.add_argument('--prices', required=True, help='Path to price table in YAML or JSON format, with vCPUs and price per hour for the instance types, price per GB-month for EBS and hours for the runs of the steps (see docs)')
+    cost_parser.add_argument('--input-size', required=False, type=float, help=f'Size in GB of the input files for each item of the first dimension, used for ebs_size multipliers [{INPUT_SIZE_ALIAS}]',
+                                                 default=INPUT_SIZE_ALIAS)
+    cost_parser.add_argument('--compare', required=False, nargs='+', help='List of YAML files for the MetaWorkflow objects of a previous version. Exit with an error if the estimates for MetaWorkflow objects with the same name increased beyond tolerance')
+    cost_parser.add_argument('--tolerance', required=False, type=float, help=f'Maximum increase for the estimates compared to the previous version, as a fraction [{TOLERANCE_ALIAS}]',
+                                                default=TOLERANCE_ALIAS)
+    cost_parser.add_argument('--json', action='store_true', help='Print the estimates in JSON format')
+
+    # Add dry_run to subparsers
+    dry_run_parser = subparsers.add_parser(DRY_RUN, description='Utility to run MetaWorkflow objects locally through magma with mock inputs and stub durations for the steps, report the runs created, the order of the runs and the time to create the run',
+                                                    help='Utility to run MetaWorkflow objects locally through magma with mock inputs')
+
+    dry_run_parser.add_argument('files', nargs='+', help='List of YAML files for MetaWorkflow objects to run')
+    dry_run_parser.add_argument('--dimensions', required=True, nargs='+', type=int, help='Size of each input dimension, e.g. 30 24 for 30 samples with 24 shards each. magma supports up to 3 dimensions')
+    dry_run_parser.add_argument('--durations', required=False, nargs='+', help='List of durations in hours for the runs of the steps as STEP=HOURS, default=HOURS sets the duration for the steps not listed [default=1]')
+    dry_run_parser.add_argument('--max-parallel', required=False, type=int, help='Maximum number of runs at the same time [no limit]')
+    dry_run_parser.add_argument('--json', action='store_true', help='Print the dry run report in JSON format, with the start and end for each run')
+
+    # Add qc_eval to subparsers
+    qc_eval_parser = subparsers.add_parser(QC_EVAL, description='Utility to evaluate the qc_thresholds rulesets for MetaWorkflow objects against a table of QC metrics for many samples, report PASS, WARN, FAIL for each rule and overall',
+                                                    help='Utility to evaluate the qc_thresholds rulesets for MetaWorkflow objects against a table of QC metrics')
+
+    qc_eval_parser.add_argument('files', nargs='+', help='List of YAML files for MetaWorkflow objects with the rulesets to evaluate')
+    qc_eval_parser.add_argument('--metrics', required=True, help='Path to table of QC metrics in TSV format, or CSV if the file ends with .csv, with a row for each sample and a column for each metric')
+    qc_eval_parser.add_argument('--sample-column', required=False, help=f'Column with the sample names in the table of QC metrics [{SAMPLE_COLUMN_ALIAS}]',
+                                                    default=SAMPLE_COLUMN_ALIAS)
+    qc_eval_parser.add_argument('--rulesets', required=False, nargs='+', help='List of names of the rulesets to evaluate, the name of the argument with the qc_thresholds [all rulesets]')
+    qc_eval_parser.add_argument('--output', required=False, help='Path to file to write the status for each sample in TSV format, with a column for each rule and for the overall status of each ruleset')
+    qc_eval_parser.add_argument('--json', action='store_true', help='Print the number of samples with each status for each rule in JSON format')
+
     # Subparsers map
     subparser_map = {
-                    PIPELINE_DEPLOY: pipeline_deploy_parser
+                    PIPELINE_DEPLOY: pipeline_deploy_parser,
+                    WATCH: watch_parser,
+                    VALIDATE: validate_parser,
+                    ANALYZE: analyze_parser,
+                    COST: cost_parser,
+                    DRY_RUN: dry_run_parser,
+                    QC_EVAL: qc_eval_parser
                     }
+    return parser, subparser_map
+
+
+# MAIN
+def main(args=None):
+    '''Command line wrapper around available commands.
+    '''
+    parser, subparser_map = build_parser()
 
     # Checking arguments
     if len(sys.argv) == 1:
@@ -95,6 +211,18 @@ def main(args=None):
     # Call the right tool
     if args.func == PIPELINE_DEPLOY:
         pipeline_deploy.main(args)
+    elif args.func == WATCH:
+        watch.main(args)
+    elif args.func == VALIDATE:
+        validate.main(args)
+    elif args.func == ANALYZE:
+        analyze.main(args)
+    elif args.func == COST:
+        cost.main(args)
+    elif args.func == DRY_RUN:
+        dry_run.main(args)
+    elif args.func == QC_EVAL:
+        qc_eval.main(args)
 
 
 if __name__ == "__main__":
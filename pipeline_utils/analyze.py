@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   analyze, graph of the steps for MetaWorkflow
+#       objects in YAML format
+#
+################################################
+
+import sys
+import json
+import structlog
+from pipeline_utils.lib import metaworkflow_dag
+from pipeline_utils.lib import metaworkflow_loader
+
+
+###############################################################
+#   Logger
+###############################################################
+logger = structlog.getLogger(__name__)
+
+
+###############################################################
+#   Functions
+###############################################################
+def analyze_file(file_, dimensions=None):
+    """Analyze the graph of the steps for the MetaWorkflow documents in file_.
+    Documents are validated against the schema first.
+
+        :param file_: Path to the YAML file
+        :type file_: str
+        :param dimensions: Size of each input dimension, to simulate the runs for each step
+        :type dimensions: list(int)
+        :return: Report for each document
+        :rtype: list(dict)
+    """
+    reports_ = []
+    for d, errors_ in metaworkflow_loader.load_metaworkflows(file_):
+        if errors_:
+            name_ = d.get('name') if isinstance(d, dict) else None
+            reports_.append({'file': file_, 'name': name_, 'valid': False, 'errors': errors_})
+            continue
+        report_ = metaworkflow_dag.MetaWorkflowDAG(d).analyze(dimensions)
+        report_['file'] = file_
+        reports_.append(report_)
+    return reports_
+
+
+################################################
+#  MAIN, runner
+################################################
+def main(args):
+    """Analyze the graph of the steps for the MetaWorkflow objects in the specified YAML files.
+    Exit with 1 if any graph has unknown steps or inputs, cycles, or dimension mismatches.
+    """
+    reports_ = []
+    for file_ in args.files:
+        reports_.extend(analyze_file(file_, args.dimensions))
+
+    if args.json:
+        sys.stdout.write(json.dumps(reports_, indent=2) + '\n')
+    else:
+        for report_ in reports_:
+            logger.info(f'@ {report_["file"]}...')
+            if not report_['valid']:
+                logger.info('> FAILED %s' % report_['name'])
+                for error in report_['errors']:
+                    logger.error(f'- {error}')
+                continue
+            logger.info('> Analyzed %s' % report_['name'])
+            logger.info(f'  steps: {report_["steps"]}, depth: {report_["depth"]}, max parallel steps: {report_["width"]}')
+            for i, level in enumerate(report_['levels']):
+                logger.info(f'  level {i}: {", ".join(level)}')
+            logger.info('  critical path: %s' % ' -> '.join(report_['critical_path']))
+            if report_.get('fanout'):
+                fanout_ = report_['fanout']
+                logger.info('  runs for inputs of dimensions %s:' % ' x '.join(map(str, fanout_['dimensions'])))
+                for step, step_ in fanout_['steps'].items():
+                    shards_ = ', fixed shards' if step_['fixed_shards'] else ''
+                    if step_['gather_input']:
+                        shards_ += ', gather_input from %s' % ', '.join(step_['gather_input'])
+                    logger.info(f'    {step}: {step_["runs"]} (scatter {step_["scatter"]}{shards_})')
+                logger.info(f'  total runs: {fanout_["total_runs"]}')
+
+    if not all(report_['valid'] for report_ in reports_):
+        sys.exit(1)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   cost, resources and cost for MetaWorkflow runs
+#       from the config of the steps
+#
+################################################
+
+import sys
+import json
+import structlog
+from pipeline_utils.lib import metaworkflow_loader
+from pipeline_utils.lib import cost_model
+
+
+###############################################################
+#   Logger
+###############################################################
+logger = structlog.getLogger(__name__)
+
+
+###############################################################
+#   Functions
+###############################################################
+def estimate_files(files, dimensions, prices, input_size):
+    """Estimate the resources and the cost for a run of the MetaWorkflow objects in files.
+    MetaWorkflows that are not valid or with errors in the graph are reported with the errors.
+
+        :return: Estimate for each MetaWorkflow
+        :rtype: list(dict)
+    """
+    estimates_ = []
+    for file_ in files:
+        for name_, dag_, errors_ in metaworkflow_loader.load_dags(file_):
+            if errors_:
+                estimates_.append({'file': file_, 'name': name_, 'total': None, 'errors': errors_})
+                continue
+            estimate_ = cost_model.estimate(dag_, dimensions, prices, input_size)
+            estimate_['file'] = file_
+            estimates_.append(estimate_)
+    return estimates_
+
+
+################################################
+#  MAIN, runner
+################################################
+def main(args):
+    """Estimate the resources and the cost for a run of the MetaWorkflow objects in the specified YAML files.
+    Exit with 1 if any MetaWorkflow has errors, or if the cost increased beyond tolerance
+    compared to the MetaWorkflow objects with the same name in the files to compare with.
+    """
+    try:
+        prices_ = cost_model.load_prices(args.prices)
+    except (OSError, ValueError) as e:
+        logger.info('> FAILED LOADING PRICE TABLE')
+        logger.info(e)
+        sys.exit('\nExiting...')
+
+    estimates_ = estimate_files(args.files, args.dimensions, prices_, args.input_size)
+    increases_ = []
+    if args.compare:
+        baseline_ = estimate_files(args.compare, args.dimensions, prices_, args.input_size)
+        increases_ = cost_model.compare(estimates_, baseline_, args.tolerance)
+
+    if args.json:
+        output_ = {'estimates': estimates_, 'increases': [
+            {'name': name, 'metric': metric, 'estimate': value, 'baseline': baseline}
+            for name, metric, value, baseline in increases_
+        ]}
+        sys.stdout.write(json.dumps(output_, indent=2) + '\n')
+    else:
+        for estimate_ in estimates_:
+            logger.info(f'@ {estimate_["file"]}...')
+            if estimate_['errors']:
+                logger.info('> FAILED %s' % estimate_['name'])
+                for error in estimate_['errors']:
+                    logger.error(f'- {error}')
+                continue
+            logger.info('> Estimated %s, inputs of dimensions %s, %s GB per item' % (
+                            estimate_['name'],
+                            ' x '.join(map(str, estimate_['dimensions'])),
+                            estimate_['input_size']
+                            )
+                        )
+            for step, step_ in estimate_['steps'].items():
+                logger.info(f'  {step}: {step_["runs"]} runs, {step_["ec2_type"]}, {step_["ebs_gb"]:.1f} GB EBS, '
+                            f'{step_["vcpu_hours"]:.1f} vCPU-hours, {step_["ebs_gb_hours"]:.1f} EBS-GB-hours, ${step_["dollars"]:.2f}')
+            total_ = estimate_['total']
+            logger.info(f'  total: {total_["runs"]} runs, {total_["vcpu_hours"]:.1f} vCPU-hours, '
+                        f'{total_["ebs_gb_hours"]:.1f} EBS-GB-hours, ${total_["dollars"]:.2f}')
+        for name, metric, value, baseline in increases_:
+            logger.error(f'WARNING: {name} {metric} increased to {value:.2f} from {baseline:.2f}')
+
+    if any(estimate_['errors'] for estimate_ in estimates_) or increases_:
+        sys.exit(1)
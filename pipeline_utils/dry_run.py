@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   dry_run, local run of MetaWorkflow objects
+#       through magma with mock inputs
+#
+################################################
+
+import sys
+import json
+import structlog
+from pipeline_utils.lib import metaworkflow_loader
+from pipeline_utils.lib import run_simulation
+
+
+###############################################################
+#   Logger
+###############################################################
+logger = structlog.getLogger(__name__)
+
+
+###############################################################
+#   Functions
+###############################################################
+def dry_run_files(files, dimensions, durations, max_parallel=None):
+    """Dry run for the MetaWorkflow objects in files.
+    MetaWorkflows that are not valid or with errors in the graph are reported with the errors.
+
+        :return: Report for each MetaWorkflow
+        :rtype: list(dict)
+    """
+    reports_ = []
+    for file_ in files:
+        for name_, dag_, errors_ in metaworkflow_loader.load_dags(file_):
+            if errors_:
+                reports_.append({'file': file_, 'name': name_, 'runs': None, 'errors': errors_})
+                continue
+            report_ = run_simulation.dry_run(dag_, dimensions, durations, max_parallel)
+            report_['file'] = file_
+            reports_.append(report_)
+    return reports_
+
+
+################################################
+#  MAIN, runner
+################################################
+def main(args):
+    """Dry run for the MetaWorkflow objects in the specified YAML files.
+    Exit with 1 if any MetaWorkflow has errors, or if magma fails to create or complete the run.
+    """
+    try:
+        durations_ = run_simulation.parse_durations(args.durations)
+        run_simulation.input_structure(args.dimensions)
+    except ValueError as e:
+        logger.info('> FAILED DRY RUN')
+        logger.info(e)
+        sys.exit('\nExiting...')
+
+    reports_ = dry_run_files(args.files, args.dimensions, durations_, args.max_parallel)
+
+    if args.json:
+        sys.stdout.write(json.dumps(reports_, indent=2) + '\n')
+    else:
+        for report_ in reports_:
+            logger.info(f'@ {report_["file"]}...')
+            if report_['runs'] is None or report_.get('order') is None:
+                logger.info('> FAILED %s' % report_['name'])
+                for error in report_['errors']:
+                    logger.error(f'- {error}')
+                continue
+            logger.info('> Dry run %s, inputs of dimensions %s' % (
+                            report_['name'],
+                            ' x '.join(map(str, report_['dimensions']))
+                            )
+                        )
+            logger.info(f'  runs: {report_["runs"]}, created by magma in {report_["write_run_seconds"]:.3f}s, '
+                        f'simulated in {report_["simulate_seconds"]:.3f}s')
+            for step, step_ in report_['steps'].items():
+                if step_['start'] is None:
+                    logger.info(f'  {step}: {step_["runs"]} runs, not started')
+                    continue
+                logger.info(f'  {step}: {step_["runs"]} runs, hours {step_["start"]:g}-{step_["end"]:g}')
+            logger.info(f'  total hours: {report_["hours"]:g}, final status: {report_["final_status"]}')
+            for error in report_['errors']:
+                logger.error(f'WARNING: {error}')
+
+    if any(report_['errors'] for report_ in reports_):
+        sys.exit(1)
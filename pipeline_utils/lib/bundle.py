@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+###########################################################
+#
+#   bundle
+#      portal objects converted to JSON, in NDJSON format,
+#      to deploy again without parsing the YAML files
+#
+###########################################################
+
+import json
+import hashlib
+import threading
+
+
+###############################################################
+#   Functions
+###############################################################
+def content_hash(data_json):
+    """Return the sha256 hash for a JSON object,
+    computed on the canonical serialization with sorted keys.
+    """
+    content_ = json.dumps(data_json, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(content_.encode('utf-8')).hexdigest()
+
+def read_bundle(file):
+    """Read the entries from a bundle file, in order.
+    Each entry is a dictionary with pipeline, type, alias, hash and object.
+    Raise ValueError if an object does not match its hash.
+    """
+    with open(file) as f:
+        for i, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry_ = json.loads(line)
+            if content_hash(entry_['object']) != entry_['hash']:
+                raise ValueError(f'Hash mismatch for {entry_["alias"]} at line {i} of {file}')
+            yield entry_
+
+
+###############################################################
+#   BundleWriter
+###############################################################
+class BundleWriter(object):
+    """Class to write portal objects converted to JSON to a bundle file,
+    one entry per line in NDJSON format.
+    Objects can be written from multiple threads.
+    """
+
+    def __init__(self, file):
+        """Constructor method.
+
+            :param file: Path to the bundle file, overwritten if exists
+            :type file: str
+        """
+        self.file = file
+        self._f = open(file, 'w')
+        self._lock = threading.Lock()
+
+    def write(self, pipeline, type, data_json):
+        """Write an entry for the JSON object of type from pipeline.
+        """
+        entry_ = {
+            'pipeline': pipeline,
+            'type': type,
+            'alias': data_json['aliases'][0],
+            'hash': content_hash(data_json),
+            'object': data_json
+        }
+        line_ = json.dumps(entry_, sort_keys=True)
+        with self._lock:
+            self._f.write(line_ + '\n')
+
+    def close(self):
+        """Close the bundle file.
+        """
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
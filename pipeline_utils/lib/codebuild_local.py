@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+###########################################################
+#
+#   codebuild_local
+#      local stand-in for the AWS CodeBuild client
+#
+###########################################################
+
+import uuid
+import copy
+import yaml
+import threading
+import subprocess
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, wait
+from pipeline_utils.lib import docker_utils
+
+
+###############################################################
+#   Functions
+###############################################################
+def docker_build(env):
+    """Build the image described by the CodeBuild environment variables
+    overrides with a local Docker build, the image is not pushed.
+    """
+    tag_ = f'{env["IMAGE_REPO_NAME"]}:{env["IMAGE_TAG"]}'
+    subprocess.check_call(['docker', 'build', '-t', tag_, env['BUILD_PATH']])
+
+
+###############################################################
+#   LocalCodeBuildClient
+###############################################################
+class LocalCodeBuildClient(object):
+    """Class implementing the subset of the boto3 CodeBuild client
+    used for deployment, with builds running locally in background threads.
+    Can be used with dcicutils.codebuild_utils.CodeBuildUtils(client=...)
+    to run and test the deployment of images offline.
+    """
+
+    def __init__(self, projects, runner=docker_build, max_workers=None):
+        """Constructor method.
+
+            :param projects: Names of the available CodeBuild projects
+            :type projects: list(str)
+            :param runner: Function called with the environment variables
+                overrides to run a build, the build fails if it raises
+            :type runner: function
+            :param max_workers: Maximum number of builds running at the same time
+            :type max_workers: int
+        """
+        self.projects = projects
+        self.runner = runner
+        self._builds = {}
+        self._batches = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers)
+
+    def list_projects(self, **kwargs):
+        """Return the names of the available projects.
+        """
+        return {'projects': list(self.projects)}
+
+    def batch_get_projects(self, names):
+        """Return the projects matching names.
+        """
+        return {
+            'projects': [{'name': name} for name in names if name in self.projects],
+            'projectsNotFound': [name for name in names if name not in self.projects]
+        }
+
+    def start_build(self, projectName, sourceVersion=None, environmentVariablesOverride=None, **kwargs):
+        """Start a build in background.
+        """
+        id = self._new_build(projectName, sourceVersion, environmentVariablesOverride or [])
+        with self._lock:
+            build_ = copy.deepcopy(self._builds[id])
+        self._executor.submit(self._run, id)
+        return {'build': build_}
+
+    def start_build_batch(self, projectName, sourceVersion=None, buildspecOverride=None, **kwargs):
+        """Start a batch build in background.
+        The builds in the build-graph of buildspecOverride are run after
+        the builds they depend on, builds depending on failed builds are not run.
+        """
+        if projectName not in self.projects:
+            raise ValueError(f'Project cannot be found: {projectName}')
+        build_graph = yaml.safe_load(buildspecOverride)['batch']['build-graph']
+        batch = {
+            'id': f'{projectName}:{uuid.uuid4()}',
+            'projectName': projectName,
+            'sourceVersion': sourceVersion,
+            'buildBatchStatus': 'IN_PROGRESS',
+            'currentPhase': 'SUBMITTED',
+            'startTime': datetime.now(timezone.utc),
+            'buildGroups': [
+                {'identifier': b['identifier'], 'dependsOn': b.get('depend-on', [])} for b in build_graph
+            ]
+        }
+        with self._lock:
+            self._batches[batch['id']] = batch
+            batch_ = copy.deepcopy(batch)
+        threading.Thread(target=self._run_batch, args=(batch['id'], projectName, sourceVersion, build_graph)).start()
+        return {'buildBatch': batch_}
+
+    def batch_get_builds(self, ids):
+        """Return the current state of the builds matching ids.
+        """
+        if len(ids) > 100:
+            raise ValueError('Maximum number of ids is 100')
+        with self._lock:
+            return {
+                'builds': [copy.deepcopy(self._builds[id]) for id in ids if id in self._builds],
+                'buildsNotFound': [id for id in ids if id not in self._builds]
+            }
+
+    def batch_get_build_batches(self, ids):
+        """Return the current state of the batch builds matching ids.
+        """
+        with self._lock:
+            return {
+                'buildBatches': [copy.deepcopy(self._batches[id]) for id in ids if id in self._batches],
+                'buildBatchesNotFound': [id for id in ids if id not in self._batches]
+            }
+
+    def _new_build(self, projectName, sourceVersion, environmentVariables):
+        """Helper to register a new build.
+        Return the build id.
+        """
+        if projectName not in self.projects:
+            raise ValueError(f'Project cannot be found: {projectName}')
+        build = {
+            'id': f'{projectName}:{uuid.uuid4()}',
+            'projectName': projectName,
+            'sourceVersion': sourceVersion,
+            'buildStatus': 'IN_PROGRESS',
+            'currentPhase': 'SUBMITTED',
+            'startTime': datetime.now(timezone.utc),
+            'environment': {'environmentVariables': environmentVariables}
+        }
+        with self._lock:
+            self._builds[build['id']] = build
+        return build['id']
+
+    def _run_batch(self, batch_id, projectName, sourceVersion, build_graph):
+        """Helper to run the builds of a batch build in dependency order
+        and update its state.
+        """
+        graph = {b['identifier']: set(b.get('depend-on', [])) for b in build_graph}
+        builds = {b['identifier']: b for b in build_graph}
+        status = {}
+        with self._lock:
+            self._batches[batch_id]['currentPhase'] = 'IN_PROGRESS'
+        for wave in docker_utils.build_waves(graph):
+            futures = {}
+            for identifier in wave:
+                if any(status[d] != 'SUCCEEDED' for d in graph[identifier]):
+                    status[identifier] = 'FAILED'
+                    continue
+                environmentVariables = [
+                    {'name': k, 'value': v, 'type': 'PLAINTEXT'}
+                    for k, v in builds[identifier].get('env', {}).get('variables', {}).items()
+                ]
+                id = self._new_build(projectName, sourceVersion, environmentVariables)
+                with self._lock:
+                    for group in self._batches[batch_id]['buildGroups']:
+                        if group['identifier'] == identifier:
+                            group['currentBuildSummary'] = {
+                                'arn': f'arn:aws:codebuild:local:000000000000:build/{id}',
+                                'requestedOn': self._builds[id]['startTime'],
+                                'buildStatus': 'IN_PROGRESS'
+                            }
+                futures[identifier] = (id, self._executor.submit(self._run, id))
+            wait([future for _, future in futures.values()])
+            with self._lock:
+                for identifier, (id, _) in futures.items():
+                    status[identifier] = self._builds[id]['buildStatus']
+                    for group in self._batches[batch_id]['buildGroups']:
+                        if group['identifier'] == identifier:
+                            group['currentBuildSummary']['buildStatus'] = status[identifier]
+        with self._lock:
+            self._batches[batch_id].update({
+                'buildBatchStatus': 'SUCCEEDED' if all(v == 'SUCCEEDED' for v in status.values()) else 'FAILED',
+                'currentPhase': 'SUCCEEDED',
+                'endTime': datetime.now(timezone.utc)
+            })
+
+    def _run(self, id):
+        """Helper to run a build and update its state.
+        """
+        with self._lock:
+            self._builds[id]['currentPhase'] = 'BUILD'
+            env = {e['name']: e['value'] for e in self._builds[id]['environment']['environmentVariables']}
+        try:
+            self.runner(env)
+            status = 'SUCCEEDED'
+        except Exception:
+            status = 'FAILED'
+        with self._lock:
+            self._builds[id].update({
+                'buildStatus': status,
+                'currentPhase': 'COMPLETED',
+                'endTime': datetime.now(timezone.utc)
+            })
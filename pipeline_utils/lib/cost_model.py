@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+###########################################################
+#
+#   cost_model
+#      resources and cost for a MetaWorkflow run
+#      from the config of the steps
+#
+###########################################################
+
+import re
+import yaml
+
+
+###############################################################
+#   Variables
+###############################################################
+# fields in the config of the steps
+EC2_TYPE_SCHEMA = 'ec2_type'
+EBS_SIZE_SCHEMA = 'ebs_size'
+# ebs_size as a multiplier of the size of the input files, e.g. 2x
+EBS_MULTIPLIER_RE = re.compile(r'^(\d+(?:\.\d+)?)x$')
+# hours in a month, to convert EBS prices per GB-month
+HOURS_MONTH = 730
+# metrics estimated for a run
+METRICS = ('runs', 'vcpu_hours', 'ebs_gb_hours', 'dollars')
+
+
+###############################################################
+#   Functions
+###############################################################
+def load_prices(file):
+    """Load the price and size table in YAML or JSON format.
+
+    The table has the vCPUs and the price per hour for each instance type,
+    the price per GB-month for EBS, and the hours for a run of each step,
+    with a default for the steps not listed:
+
+        instances:
+          m5.xlarge:
+            vcpus: 4
+            price: 0.192
+        ebs_gb_month: 0.08
+        hours:
+          default: 1
+          <step>: 2.5
+
+    Raise ValueError if the table is missing required fields.
+    """
+    with open(file) as f:
+        prices_ = yaml.safe_load(f) or {}
+    if not isinstance(prices_.get('instances'), dict):
+        raise ValueError(f'Missing instances in price table {file}')
+    for name, instance in prices_['instances'].items():
+        if 'vcpus' not in instance or 'price' not in instance:
+            raise ValueError(f'Missing vcpus or price for instance {name} in price table {file}')
+    prices_.setdefault('ebs_gb_month', 0)
+    prices_.setdefault('hours', {})
+    prices_['hours'].setdefault('default', 1)
+    return prices_
+
+def ebs_size_gb(ebs_size, input_gb):
+    """Return the size in GB of the EBS volume for a run,
+    ebs_size is either the size in GB or a multiplier of input_gb, e.g. 2x.
+    Raise ValueError if ebs_size is not in a known format.
+    """
+    if isinstance(ebs_size, (int, float)):
+        return ebs_size
+    match_ = EBS_MULTIPLIER_RE.match(str(ebs_size).strip())
+    if not match_:
+        raise ValueError(f'Unknown ebs_size {ebs_size}')
+    return float(match_.group(1)) * input_gb
+
+def _input_gb(input_size, dimensions, step_):
+    """Helper to estimate the size in GB of the input files for a run of a step.
+    input_size is the size for each item of the first dimension,
+    a run scattered on dimension d gets a part of an item split on the following dimensions,
+    a run that is not scattered gets all the items.
+    Fixed shards split all the items evenly.
+    """
+    if step_['fixed_shards']:
+        return input_size * dimensions[0] / max(step_['runs'], 1)
+    if not step_['scatter']:
+        return input_size * dimensions[0]
+    parts_ = 1
+    for size in dimensions[1:step_['scatter']]:
+        parts_ *= size
+    return input_size / parts_
+
+def estimate(dag, dimensions, prices, input_size):
+    """Estimate the resources and the cost for a run of the MetaWorkflow.
+
+        :param dag: Graph of the steps for the MetaWorkflow
+        :type dag: pipeline_utils.lib.metaworkflow_dag.MetaWorkflowDAG
+        :param dimensions: Size of each input dimension
+        :type dimensions: list(int)
+        :param prices: Price and size table from load_prices
+        :type prices: dict
+        :param input_size: Size in GB of the input files for each item of the first dimension
+        :type input_size: float
+        :return: Runs, vCPU-hours, EBS-GB-hours and dollars for each step and in total, and errors
+        :rtype: dict
+    """
+    fanout_ = dag.fanout(dimensions)
+    errors_ = list(fanout_['errors'])
+    ebs_price_ = prices['ebs_gb_month'] / HOURS_MONTH
+    steps_ = {}
+    for step, step_ in fanout_['steps'].items():
+        config_ = dag.workflows[step].get('config') or {}
+        hours_ = prices['hours'].get(step, prices['hours']['default'])
+        instance_ = prices['instances'].get(config_.get(EC2_TYPE_SCHEMA))
+        if instance_ is None:
+            errors_.append(f'{step}: instance type {config_.get(EC2_TYPE_SCHEMA)} not in price table')
+            instance_ = {'vcpus': 0, 'price': 0}
+        try:
+            ebs_gb_ = ebs_size_gb(config_.get(EBS_SIZE_SCHEMA, 0), _input_gb(input_size, dimensions, step_))
+        except ValueError as e:
+            errors_.append(f'{step}: {e}')
+            ebs_gb_ = 0
+        runs_ = step_['runs']
+        steps_[step] = {
+            'runs': runs_,
+            'ec2_type': config_.get(EC2_TYPE_SCHEMA),
+            'ebs_gb': ebs_gb_,
+            'hours': hours_,
+            'vcpu_hours': runs_ * instance_['vcpus'] * hours_,
+            'ebs_gb_hours': runs_ * ebs_gb_ * hours_,
+            'dollars': runs_ * hours_ * (instance_['price'] + ebs_gb_ * ebs_price_)
+        }
+    return {
+        'name': dag.name,
+        'dimensions': list(dimensions),
+        'input_size': input_size,
+        'steps': steps_,
+        'total': {m: sum(s[m] for s in steps_.values()) for m in METRICS},
+        'errors': errors_
+    }
+
+def compare(estimates, baseline, tolerance):
+    """Compare the totals for the estimates with the baseline estimates,
+    matched by MetaWorkflow name.
+    Return the increases beyond tolerance as (name, metric, estimate, baseline).
+    """
+    baseline_ = {b['name']: b['total'] for b in baseline if b.get('total')}
+    increases_ = []
+    for estimate_ in estimates:
+        total_ = baseline_.get(estimate_['name'])
+        if not total_ or not estimate_.get('total'):
+            continue
+        for metric in METRICS:
+            if estimate_['total'][metric] > total_[metric] * (1 + tolerance):
+                increases_.append((estimate_['name'], metric, estimate_['total'][metric], total_[metric]))
+    return increases_
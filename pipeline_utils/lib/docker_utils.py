@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+###########################################################
+#
+#   docker_utils
+#      functions to work with Docker build contexts
+#
+###########################################################
+
+import os
+import re
+import glob
+import hashlib
+
+
+###############################################################
+#   Variables
+###############################################################
+# prefix for the ECR tags identifying images by build context
+CONTEXT_TAG_PREFIX = 'context-'
+# variables in Dockerfile instructions, $VAR, ${VAR}, ${VAR:-default}
+VARIABLE_RE = re.compile(r'\$(?:\{(\w+)(?::-([^}]*))?\}|(\w+))')
+
+
+###############################################################
+#   Functions
+###############################################################
+def context_hash(path, bases=()):
+    """Return the sha256 hash of a build context directory.
+    The hash covers the relative path and the content
+    of every file in the directory, in sorted order,
+    and the hashes of the base images built from other contexts, if any.
+    """
+    sha256 = hashlib.sha256()
+    for base in sorted(bases):
+        sha256.update(base.encode())
+        sha256.update(b'\0')
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for fn in sorted(files):
+            file_ = os.path.join(root, fn)
+            sha256.update(os.path.relpath(file_, path).encode())
+            sha256.update(b'\0')
+            with open(file_, 'rb') as read_:
+                for chunk in iter(lambda: read_.read(1 << 20), b''):
+                    sha256.update(chunk)
+            sha256.update(b'\0')
+    return sha256.hexdigest()
+
+def context_tag(path, bases=()):
+    """Return the ECR tag identifying the image built from a build context directory.
+    """
+    return f'{CONTEXT_TAG_PREFIX}{context_hash(path, bases)}'
+
+def _instructions(dockerfile):
+    """Helper to read a Dockerfile as a list of (instruction, arguments),
+    joining continuation lines and removing comments.
+    """
+    instructions, line_ = [], ''
+    with open(dockerfile) as read_:
+        for line in read_:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.endswith('\\'):
+                line_ += line[:-1] + ' '
+                continue
+            line_ += line
+            instruction, _, arguments = line_.partition(' ')
+            instructions.append((instruction.upper(), arguments.strip()))
+            line_ = ''
+    return instructions
+
+def _substitute(value, variables):
+    """Helper to replace variables in value with their values.
+    """
+    def _replace(match):
+        name = match.group(1) or match.group(3)
+        return variables.get(name) or match.group(2) or ''
+    return VARIABLE_RE.sub(_replace, value)
+
+def from_images(dockerfile):
+    """Return the images used by the FROM instructions in a Dockerfile.
+    Variables are replaced with the default values of the ARG instructions,
+    references to previous build stages are ignored.
+    """
+    images, stages, variables = [], set(), {}
+    for instruction, arguments in _instructions(dockerfile):
+        if instruction == 'ARG':
+            name, _, default = arguments.partition('=')
+            variables.setdefault(name.strip(), default.strip().strip('"\''))
+        elif instruction == 'FROM':
+            fields = [f for f in arguments.split() if not f.startswith('--')]
+            image = _substitute(fields[0], variables)
+            if len(fields) == 3 and fields[1].upper() == 'AS':
+                stages.add(fields[2])
+            if image not in stages and image not in images:
+                images.append(image)
+    return images
+
+def image_name(image):
+    """Return the repository name of an image reference,
+    removing registry, tag and digest.
+    """
+    name = image.split('@')[0].split('/')[-1]
+    return name.split(':')[0]
+
+def build_graph(path):
+    """Return the dependencies among the images in path.
+    Each folder in path is the build context for an image,
+    an image depends on the images in path used by its FROM instructions.
+
+        :return: Dictionary mapping each image to the images it depends on
+        :rtype: dict(str, set(str))
+    """
+    images = sorted(
+        fn for fn in map(os.path.basename, glob.glob(f'{path}/*'))
+        if os.path.isdir(f'{path}/{fn}')
+    )
+    graph = {}
+    for fn in images:
+        dockerfile = f'{path}/{fn}/Dockerfile'
+        bases = set()
+        if os.path.isfile(dockerfile):
+            bases = set(map(image_name, from_images(dockerfile)))
+        graph[fn] = (bases & set(images)) - {fn}
+    return graph
+
+def build_waves(graph):
+    """Return the images in graph grouped in waves,
+    each image depends only on images in previous waves.
+    Raise ValueError if there are circular dependencies.
+
+        :param graph: Dictionary mapping each image to the images it depends on
+        :type graph: dict(str, set(str))
+        :rtype: list(list(str))
+    """
+    waves, done = [], set()
+    while len(done) < len(graph):
+        wave = sorted(fn for fn, bases in graph.items() if fn not in done and bases <= done)
+        if not wave:
+            cycle = sorted(set(graph) - done)
+            raise ValueError(f'Circular dependencies among images: {", ".join(cycle)}')
+        waves.append(wave)
+        done.update(wave)
+    return waves
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+
+###########################################################
+#
+#   metaworkflow_dag
+#      graph of the steps for a MetaWorkflow in YAML format
+#
+###########################################################
+
+from pipeline_utils.lib import shard_spec
+
+
+###############################################################
+#   Variables
+###############################################################
+# fields linking the arguments of a step to other steps or to the inputs
+DEPENDENCIES_SCHEMA = 'dependencies'
+SOURCE_SCHEMA = 'source'
+SOURCE_ARGUMENT_NAME_SCHEMA = 'source_argument_name'
+# fields for the scatter and gather of the arguments
+DIMENSIONALITY_SCHEMA = 'dimensionality'
+SCATTER_SCHEMA = 'scatter'
+GATHER_SCHEMA = 'gather'
+SHARDS_SCHEMA = 'shards'
+# fields that only change the input for the runs, not the runs
+GATHER_INPUT_SCHEMA = 'gather_input'
+INPUT_DIMENSION_SCHEMA = 'input_dimension'
+EXTRA_DIMENSION_SCHEMA = 'extra_dimension'
+# fields with the files and the value for the inputs
+FILES_SCHEMA = 'files'
+VALUE_SCHEMA = 'value'
+
+
+###############################################################
+#   Functions
+###############################################################
+def _dimensionality(input):
+    """Helper to return the dimensions of an input of the MetaWorkflow,
+    dimensionality if specified, else the nesting of the lists of files or of the value.
+    """
+    if DIMENSIONALITY_SCHEMA in input:
+        return input[DIMENSIONALITY_SCHEMA]
+    value_, dimensionality_ = input.get(FILES_SCHEMA, input.get(VALUE_SCHEMA)), 0
+    while isinstance(value_, list) and value_:
+        value_, dimensionality_ = value_[0], dimensionality_ + 1
+    return dimensionality_
+
+
+###############################################################
+#   MetaWorkflowDAG
+###############################################################
+class MetaWorkflowDAG(object):
+    """Class to build the graph of the steps for a MetaWorkflow in YAML format.
+    A step depends on the steps in its dependencies and on the steps
+    used as source for its input arguments.
+    """
+
+    def __init__(self, data):
+        """Constructor method.
+
+            :param data: MetaWorkflow document, validated against the schema
+            :type data: dict
+        """
+        self.data = data
+        self.name = data['name']
+        self.inputs = data['input']
+        self.workflows = data['workflows']
+        # steps in the order they are defined
+        self.steps = list(self.workflows)
+        # names of the steps each step depends on, only existing steps
+        self.dependencies = {}
+        # unknown steps and inputs
+        self.errors = []
+        self._build()
+
+    def _build(self):
+        """Helper to collect the dependencies for each step,
+        and the references to steps and inputs that do not exist.
+        """
+        for step, values in self.workflows.items():
+            dependencies_ = list(values.get(DEPENDENCIES_SCHEMA) or [])
+            for name, argument in values['input'].items():
+                source_ = argument.get(SOURCE_SCHEMA)
+                if source_:
+                    dependencies_.append(source_)
+                elif argument.get(SOURCE_ARGUMENT_NAME_SCHEMA):
+                    # argument from the MetaWorkflow inputs
+                    if argument[SOURCE_ARGUMENT_NAME_SCHEMA] not in self.inputs:
+                        self.errors.append(f'{step}: argument {name} uses unknown input {argument[SOURCE_ARGUMENT_NAME_SCHEMA]}')
+            self.dependencies[step] = set()
+            for dependency in dependencies_:
+                if dependency in self.workflows:
+                    self.dependencies[step].add(dependency)
+                else:
+                    self.errors.append(f'{step}: depends on unknown step {dependency}')
+
+    def cycle(self):
+        """Return a cycle in the graph as the list of steps,
+        with the first step repeated at the end.
+        Return None if the graph has no cycles.
+        """
+        # 0 not visited, 1 in the current path, 2 done
+        state_ = dict.fromkeys(self.steps, 0)
+        for start in self.steps:
+            if state_[start]:
+                continue
+            path_ = [start]
+            stack_ = [iter(sorted(self.dependencies[start]))]
+            state_[start] = 1
+            while stack_:
+                dependency = next(stack_[-1], None)
+                if dependency is None:
+                    state_[path_.pop()] = 2
+                    stack_.pop()
+                elif state_[dependency] == 1:
+                    return path_[path_.index(dependency):] + [dependency]
+                elif state_[dependency] == 0:
+                    state_[dependency] = 1
+                    path_.append(dependency)
+                    stack_.append(iter(sorted(self.dependencies[dependency])))
+        return None
+
+    def order(self):
+        """Return the steps in an order where each step comes after its dependencies,
+        steps are otherwise kept in the order they are defined.
+        Raise ValueError if the graph has a cycle.
+        """
+        order_, done_ = [], set()
+        remaining_ = list(self.steps)
+        while remaining_:
+            ready_ = [s for s in remaining_ if self.dependencies[s] <= done_]
+            if not ready_:
+                raise ValueError('Cycle in steps: %s' % ' -> '.join(self.cycle()))
+            order_.extend(ready_)
+            done_.update(ready_)
+            remaining_ = [s for s in remaining_ if s not in done_]
+        return order_
+
+    def levels(self):
+        """Return the steps grouped by depth, the length of the longest chain
+        of dependencies before the step.
+        Steps at the same depth can run at the same time.
+        """
+        depth_ = {}
+        for step in self.order():
+            depth_[step] = max((depth_[d] + 1 for d in self.dependencies[step]), default=0)
+        levels_ = [[] for _ in range(max(depth_.values(), default=-1) + 1)]
+        for step, depth in depth_.items():
+            levels_[depth].append(step)
+        return levels_
+
+    def critical_path(self, weights=None):
+        """Return the longest path in the graph and its length.
+        The length of a path is the sum of the weights of its steps.
+
+            :param weights: Weight for each step, 1 if not specified
+            :type weights: dict(str, float)
+            :return: Steps in the path in order, length of the path
+            :rtype: tuple(list(str), float)
+        """
+        weights = weights or {}
+        length_, previous_ = {}, {}
+        for step in self.order():
+            previous_[step] = max(self.dependencies[step], key=lambda d: length_[d], default=None)
+            length_[step] = weights.get(step, 1) + (length_[previous_[step]] if previous_[step] else 0)
+        if not length_:
+            return [], 0
+        step = max(self.steps, key=lambda s: length_[s])
+        total_ = length_[step]
+        path_ = []
+        while step:
+            path_.append(step)
+            step = previous_[step]
+        return path_[::-1], total_
+
+    def fanout(self, dimensions):
+        """Simulate the number of runs for each step given the size of each input dimension,
+        e.g. [30, 24] for 30 samples with 24 shards each.
+        Scatter and gather are propagated through the steps as magma does to create a MetaWorkflowRun,
+        a step is scattered at the highest scatter dimension of its arguments and of the steps it depends on,
+        unless it gathers from all the scattered steps. Fixed shards override the scatter,
+        a product of lists and ranges is counted without expanding the shards.
+        gather_input, input_dimension and extra_dimension only change the input for the runs:
+        gather_input collects the shards of a step without reducing the scatter,
+        so the step is scattered as the steps it gathers the input from,
+        input_dimension subsets the input on top of scatter and extra_dimension nests the gathered input.
+        They are checked against the dimensions of the inputs and of the steps.
+
+            :param dimensions: Size of each input dimension, the same for all the items
+            :type dimensions: list(int)
+            :return: Scatter dimension and runs for each step, total runs and dimension mismatches
+            :rtype: dict
+        """
+        scatter_, shards_dimension_ = {}, {}
+        steps_, errors_ = {}, []
+        for step in self.order():
+            values = self.workflows[step]
+            is_scatter, gather_from, gather_input = 0, {}, {}
+            for name, argument in values['input'].items():
+                scatter = argument.get(SCATTER_SCHEMA) or 0
+                is_scatter = max(is_scatter, scatter)
+                source_ = argument.get(SOURCE_SCHEMA)
+                if source_ and argument.get(GATHER_SCHEMA):
+                    gather_from.setdefault(source_, argument[GATHER_SCHEMA])
+                elif source_ and argument.get(GATHER_INPUT_SCHEMA):
+                    gather_input.setdefault(source_, argument[GATHER_INPUT_SCHEMA])
+                # scatter and input_dimension on an input with lower dimensionality
+                input_dimension = argument.get(INPUT_DIMENSION_SCHEMA) or 0
+                if (scatter or input_dimension) and not source_ and argument.get(SOURCE_ARGUMENT_NAME_SCHEMA) in self.inputs:
+                    dimensionality = _dimensionality(self.inputs[argument[SOURCE_ARGUMENT_NAME_SCHEMA]])
+                    if scatter + input_dimension > dimensionality:
+                        subset_ = f'scatters dimension {scatter}' if not input_dimension else \
+                                  f'subsets dimension {scatter + input_dimension} with input_dimension {input_dimension}'
+                        errors_.append(f'{step}: argument {name} {subset_} of input {argument[SOURCE_ARGUMENT_NAME_SCHEMA]} with dimensionality {dimensionality}')
+            if gather_from and gather_input:
+                errors_.append(f'{step}: gather and gather_input cannot be used in the same step')
+
+            # gather from steps that are not sharded enough
+            for dependency, gather in sorted(list(gather_from.items()) + list(gather_input.items())):
+                dimension_ = shards_dimension_.get(dependency, 0)
+                if gather > dimension_:
+                    errors_.append(f'{step}: gathers {gather} dimensions from {dependency}, that is sharded on {dimension_} dimensions')
+
+            # scatter dimension
+            scatter_dimension = 0
+            if is_scatter:
+                scatter_dimension = max([is_scatter] + [scatter_[d] for d in self.dependencies[step] if d in scatter_])
+            else:
+                gather_dimensions = []
+                for dependency in sorted(self.dependencies[step]):
+                    if dependency not in scatter_:
+                        continue
+                    if dependency not in gather_from:
+                        scatter_dimension, gather_dimensions = scatter_[dependency], []
+                        break
+                    gather_dimensions.append(scatter_[dependency] - gather_from[dependency])
+                if gather_dimensions:
+                    scatter_dimension = max(gather_dimensions)
+            if scatter_dimension > 0:
+                scatter_[step] = scatter_dimension
+
+            # runs
+            shards = values.get(SHARDS_SCHEMA)
+            if shards:
+                try:
+                    runs = shard_spec.count(shards)
+                except ValueError as e:
+                    runs = 0
+                    errors_.append(f'{step}: {e}')
+                dimensions_ = shard_spec.dimensions(shards)
+                shards_dimension_[step] = max(dimensions_)
+                if len(dimensions_) > 1:
+                    errors_.append(f'{step}: fixed shards have different dimensions')
+            elif scatter_dimension:
+                runs = 1
+                for size in dimensions[:scatter_dimension]:
+                    runs *= size
+                shards_dimension_[step] = scatter_dimension
+                if scatter_dimension > len(dimensions):
+                    runs = 0
+                    errors_.append(f'{step}: scatters dimension {scatter_dimension}, inputs have {len(dimensions)} dimensions')
+            else:
+                runs = 1
+            steps_[step] = {'scatter': scatter_dimension, 'runs': runs, 'fixed_shards': bool(shards),
+                            'gather_input': sorted(gather_input)}
+
+        return {
+            'dimensions': list(dimensions),
+            'steps': steps_,
+            'total_runs': sum(s['runs'] for s in steps_.values()),
+            'errors': errors_
+        }
+
+    def analyze(self, dimensions=None):
+        """Return a report for the graph, with errors, cycle,
+        depth, maximum number of steps that can run at the same time and critical path.
+        If dimensions are specified, also the runs for each step from fanout.
+        """
+        report_ = {
+            'name': self.name,
+            'steps': len(self.steps),
+            'errors': list(self.errors),
+            'cycle': self.cycle(),
+            'depth': None,
+            'width': None,
+            'levels': None,
+            'critical_path': None
+        }
+        if report_['cycle']:
+            report_['errors'].append('cycle in steps: %s' % ' -> '.join(report_['cycle']))
+        else:
+            levels_ = self.levels()
+            report_.update(
+                depth=len(levels_),
+                width=max((len(l) for l in levels_), default=0),
+                levels=levels_,
+                critical_path=self.critical_path()[0]
+            )
+            if dimensions:
+                report_['fanout'] = self.fanout(dimensions)
+                report_['errors'].extend(report_['fanout']['errors'])
+        report_['valid'] = not report_['errors']
+        return report_
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   metaworkflow_loader, load and validate
+#       MetaWorkflow objects in YAML format
+#
+################################################
+
+import yaml
+from pipeline_utils.lib import yaml_parser
+from pipeline_utils.lib import metaworkflow_dag
+
+
+###############################################################
+#   Functions
+###############################################################
+def load_metaworkflows(file_):
+    """Load the MetaWorkflow documents in file_ and validate them against the schema.
+
+        :param file_: Path to the YAML file
+        :type file_: str
+        :return: Document and errors for each document,
+            a single None document with the error if the file cannot be read
+        :rtype: list(tuple(dict, list(str)))
+    """
+    try:
+        with open(file_) as stream:
+            documents = [d for d in yaml.safe_load_all(stream) if d]
+    except (OSError, yaml.YAMLError) as e:
+        return [(None, [f'{type(e).__name__}: {e}'])]
+
+    documents_ = []
+    for d in documents:
+        try:
+            yaml_parser.YAMLMetaWorkflow(d)
+        except yaml_parser.ValidationError as e:
+            errors_ = [f'ValidationError [{error.validator}]: {error.message} in path={list(error.relative_path)}' for error in e.errors]
+            documents_.append((d, errors_))
+            continue
+        documents_.append((d, []))
+    return documents_
+
+def load_dags(file_):
+    """Load the MetaWorkflow documents in file_ and build the graph of the steps for the valid ones.
+    Unknown steps and inputs and cycles are reported as errors.
+
+        :param file_: Path to the YAML file
+        :type file_: str
+        :return: Name, graph and errors for each document, graph is None if the document is not valid
+        :rtype: list(tuple(str, pipeline_utils.lib.metaworkflow_dag.MetaWorkflowDAG, list(str)))
+    """
+    dags_ = []
+    for d, errors_ in load_metaworkflows(file_):
+        name_ = d.get('name') if isinstance(d, dict) else None
+        if errors_:
+            dags_.append((name_, None, errors_))
+            continue
+        dag_ = metaworkflow_dag.MetaWorkflowDAG(d)
+        errors_ = list(dag_.errors)
+        cycle_ = dag_.cycle()
+        if cycle_:
+            errors_.append('cycle in steps: %s' % ' -> '.join(cycle_))
+        dags_.append((name_, dag_, errors_))
+    return dags_
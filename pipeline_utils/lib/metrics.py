@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+###########################################################
+#
+#   metrics
+#      counters and latency histograms for a deploy
+#
+###########################################################
+
+import json
+import bisect
+import threading
+
+
+###############################################################
+#   Variables
+###############################################################
+# stages with latency histograms, network calls and local builds
+LATENCY_STAGES = ('portal_get', 'portal_write', 'upload', 'build', 'local_build')
+# upper bounds in seconds for the latency histogram buckets
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800, float('inf'))
+
+
+###############################################################
+#   Metrics
+###############################################################
+class Metrics(object):
+    """Class to count the objects deployed by type and outcome,
+    and to record latency histograms and bytes sent for network calls.
+    Metrics can be recorded from multiple threads.
+    """
+
+    def __init__(self):
+        """Constructor method.
+        """
+        # counts by type and outcome
+        self._objects = {}
+        # histograms by name
+        self._latency = {}
+        self._lock = threading.Lock()
+
+    def count(self, type, outcome):
+        """Count an object of type by outcome, e.g. created, patched, skipped, failed.
+        """
+        with self._lock:
+            outcomes_ = self._objects.setdefault(type, {})
+            outcomes_[outcome] = outcomes_.get(outcome, 0) + 1
+
+    def observe(self, name, seconds, bytes_sent=0):
+        """Record the latency and the bytes sent for a call.
+
+            :param name: Name of the call, e.g. portal_write
+            :type name: str
+            :param seconds: Latency in seconds
+            :type seconds: float
+            :param bytes_sent: Bytes sent with the call
+            :type bytes_sent: int
+        """
+        with self._lock:
+            histogram_ = self._latency.setdefault(name, {
+                'count': 0, 'total': 0.0, 'min': None, 'max': None,
+                'bytes': 0, 'buckets': [0] * len(BUCKETS)
+            })
+            histogram_['count'] += 1
+            histogram_['total'] += seconds
+            histogram_['bytes'] += bytes_sent
+            if histogram_['min'] is None or seconds < histogram_['min']:
+                histogram_['min'] = seconds
+            if histogram_['max'] is None or seconds > histogram_['max']:
+                histogram_['max'] = seconds
+            histogram_['buckets'][bisect.bisect_left(BUCKETS, seconds)] += 1
+
+    def _percentile(self, histogram_, q):
+        """Helper to estimate a percentile from the histogram buckets,
+        as the upper bound of the bucket, capped to the max value.
+        """
+        target_, cumulative_ = q * histogram_['count'], 0
+        for bound, count in zip(BUCKETS, histogram_['buckets']):
+            cumulative_ += count
+            if cumulative_ >= target_:
+                return min(bound, histogram_['max'])
+        return histogram_['max']
+
+    def summary(self):
+        """Return the metrics as a dictionary that can be written as JSON.
+        Latencies are in seconds, histogram buckets are cumulative
+        with their upper bound, +Inf for the last one.
+        """
+        with self._lock:
+            objects_ = {type: dict(outcomes_) for type, outcomes_ in self._objects.items()}
+            latency_ = {}
+            for name, histogram_ in self._latency.items():
+                cumulative_, buckets_ = 0, []
+                for bound, count in zip(BUCKETS, histogram_['buckets']):
+                    cumulative_ += count
+                    buckets_.append({'le': '+Inf' if bound == float('inf') else bound, 'count': cumulative_})
+                latency_[name] = {
+                    'count': histogram_['count'],
+                    'total': histogram_['total'],
+                    'min': histogram_['min'],
+                    'max': histogram_['max'],
+                    'p50': self._percentile(histogram_, 0.5),
+                    'p95': self._percentile(histogram_, 0.95),
+                    'bytes': histogram_['bytes'],
+                    'buckets': buckets_
+                }
+        return {'objects': objects_, 'latency': latency_}
+
+    def table(self):
+        """Return the summary formatted as tables,
+        objects by type and outcome, and latencies by call.
+        """
+        summary_ = self.summary()
+        outcomes_ = []
+        for type_outcomes_ in summary_['objects'].values():
+            outcomes_.extend(o for o in type_outcomes_ if o not in outcomes_)
+
+        lines_ = [('%-16s' % 'type') + ''.join('%10s' % o for o in outcomes_)]
+        for type, type_outcomes_ in summary_['objects'].items():
+            lines_.append(('%-16s' % type) + ''.join('%10d' % type_outcomes_.get(o, 0) for o in outcomes_))
+
+        lines_.append('')
+        lines_.append('%-16s %7s %10s %10s %10s %12s' % ('call', 'count', 'p50(ms)', 'p95(ms)', 'max(ms)', 'bytes'))
+        for name, latency_ in summary_['latency'].items():
+            lines_.append('%-16s %7d %10.1f %10.1f %10.1f %12d' % (
+                name, latency_['count'],
+                latency_['p50'] * 1000, latency_['p95'] * 1000, latency_['max'] * 1000,
+                latency_['bytes']
+            ))
+        return '\n'.join(lines_)
+
+    def write_json(self, file):
+        """Write the summary to file in JSON format.
+        """
+        with open(file, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+###########################################################
+#
+#   portal_objects
+#      functions to work with the YAML files in portal_objects
+#
+###########################################################
+
+import os
+from pipeline_utils.lib import yaml_parser
+
+
+###############################################################
+#   Variables
+###############################################################
+# folder with the YAML files for the portal objects
+PORTAL_OBJECTS_PATH = 'portal_objects'
+# object types for the YAML files, by file name
+FILE_TYPES = {
+    'software': 'Software',
+    'file_format': 'FileFormat',
+    'file_reference': 'ReferenceFile',
+    'reference_genome': 'ReferenceGenome'
+}
+# object types for the YAML files, by folder
+FOLDER_TYPES = {
+    'workflows': 'Workflow',
+    'metaworkflows': 'MetaWorkflow'
+}
+# classes to parse the YAML documents, by object type
+YAML_CLASSES = {
+    'Software': yaml_parser.YAMLSoftware,
+    'FileFormat': yaml_parser.YAMLFileFormat,
+    'ReferenceFile': yaml_parser.YAMLReferenceFile,
+    'ReferenceGenome': yaml_parser.YAMLReferenceGenome,
+    'Workflow': yaml_parser.YAMLWorkflow,
+    'MetaWorkflow': yaml_parser.YAMLMetaWorkflow
+}
+
+
+###############################################################
+#   Functions
+###############################################################
+def infer_type(file):
+    """Return the object type for a YAML file.
+    The type is inferred from the folder for Workflow and MetaWorkflow,
+    and from the file name for the other objects.
+    Return None if the type cannot be inferred.
+    """
+    name, ext = os.path.splitext(os.path.basename(file))
+    if ext not in ('.yaml', '.yml'):
+        return None
+    folder = os.path.basename(os.path.dirname(os.path.abspath(file)))
+    return FOLDER_TYPES.get(folder) or FILE_TYPES.get(name)
+
+def portal_files(repo):
+    """Return the YAML files for the portal objects in repo.
+    """
+    path_ = os.path.join(repo, PORTAL_OBJECTS_PATH)
+    files_ = []
+    for root, dirs, files in os.walk(path_):
+        # only portal_objects and the workflows, metaworkflows folders
+        if root != path_:
+            dirs.clear()
+        for fn in files:
+            file_ = os.path.join(root, fn)
+            if infer_type(file_):
+                files_.append(file_)
+    return sorted(files_)
+
+def to_json_kwargs(type, version, submission_centers, consortia, wflbucket_url):
+    """Return the arguments for the to_json method of the YAML class for type.
+    """
+    kwargs_ = {
+        'submission_centers': submission_centers,
+        'consortia': consortia
+    }
+    if type in FOLDER_TYPES.values():
+        kwargs_['version'] = version
+    if type == 'Workflow':
+        kwargs_['wflbucket_url'] = wflbucket_url
+    return kwargs_
+
+def to_json(data, type, version, submission_centers, consortia, wflbucket_url):
+    """Validate a YAML document of type and convert to JSON.
+    Raise yaml_parser.ValidationError if the document is not valid.
+    """
+    kwargs_ = to_json_kwargs(type, version, submission_centers, consortia, wflbucket_url)
+    return YAML_CLASSES[type](data).to_json(**kwargs_)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+###########################################################
+#
+#   profiler
+#      wall times for the phases and stages of a deploy
+#
+###########################################################
+
+import threading
+
+
+###############################################################
+#   Profiler
+###############################################################
+class Profiler(object):
+    """Class to collect the wall times for the phases of a deploy
+    and for the stages of each object, e.g. load, validate, upload.
+    Times can be recorded from multiple threads.
+    """
+
+    def __init__(self):
+        """Constructor method.
+        """
+        # times in seconds by (kind, name)
+        self._times = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind, name, seconds):
+        """Record the time for a phase or a stage.
+
+            :param kind: Kind of the timed section, phase or stage
+            :type kind: str
+            :param name: Name of the phase or stage
+            :type name: str
+            :param seconds: Wall time in seconds
+            :type seconds: float
+        """
+        with self._lock:
+            self._times.setdefault((kind, name), []).append(seconds)
+
+    def summary(self):
+        """Return the cumulative and per-item times for each phase and stage,
+        in the order they were first recorded.
+
+            :return: Rows with kind, name, count, total, mean and max times in seconds
+            :rtype: list(dict)
+        """
+        with self._lock:
+            times_ = {key: list(val) for key, val in self._times.items()}
+        rows_ = []
+        for (kind, name), seconds_ in times_.items():
+            rows_.append({
+                'kind': kind,
+                'name': name,
+                'count': len(seconds_),
+                'total': sum(seconds_),
+                'mean': sum(seconds_) / len(seconds_),
+                'max': max(seconds_)
+            })
+        return rows_
+
+    def table(self):
+        """Return the summary formatted as a table, phases first.
+        """
+        rows_ = sorted(self.summary(), key=lambda r: r['kind'] != 'phase')
+        lines_ = ['%-6s %-20s %7s %10s %10s %10s' % ('kind', 'name', 'count', 'total(s)', 'mean(ms)', 'max(ms)')]
+        for row in rows_:
+            lines_.append('%-6s %-20s %7d %10.3f %10.1f %10.1f' % (
+                row['kind'], row['name'], row['count'],
+                row['total'], row['mean'] * 1000, row['max'] * 1000
+            ))
+        return '\n'.join(lines_)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+
+###########################################################
+#
+#   qc_evaluator
+#      evaluate the qc_thresholds rulesets for a MetaWorkflow
+#      against a table of QC metrics for many samples,
+#      with vectorized comparisons in NumPy
+#
+###########################################################
+
+import ast
+import csv
+import re
+import numpy as np
+from pipeline_utils.lib import yaml_parser
+
+
+###############################################################
+#   Variables
+###############################################################
+# placeholders to convert the MetaWorkflow to JSON
+QC_EVAL_VERSION = 'qc_eval'
+QC_EVAL_CONSORTIA = ['qc_eval']
+# status for the rules, ordered from worst to best
+FAIL, WARN, PASS = 0, 1, 2
+STATUS = ('FAIL', 'WARN', 'PASS')
+# key for the overall status
+OVERALL = 'overall'
+# comparison operators for the rules
+OPERATORS = {
+    '>': 'greater',
+    '>=': 'greater_equal',
+    '<': 'less',
+    '<=': 'less_equal',
+    '==': 'equal',
+    '!=': 'not_equal'
+}
+# references to the rules in qc_rule, e.g. {c1}
+RULE_ID_RE = re.compile(r'\{([^{}]+)\}')
+
+
+###############################################################
+#   Functions
+###############################################################
+def load_rulesets(data):
+    """Return the qc_thresholds rulesets for a MetaWorkflow document,
+    parsed as for the portal by YAMLMetaWorkflow.
+    Rulesets defined in the input of a step are named <step>.<argument>.
+
+        :param data: MetaWorkflow document
+        :type data: dict
+        :return: Name, thresholds and overall_quality_status_rule for each ruleset
+        :rtype: list(dict)
+    """
+    metawfl_json = yaml_parser.YAMLMetaWorkflow(data).to_json(
+                            QC_EVAL_VERSION, QC_EVAL_CONSORTIA, QC_EVAL_CONSORTIA
+                            )
+    arguments_ = [(a[yaml_parser.YAMLMetaWorkflow.ARGUMENT_NAME_SCHEMA], a) for a in metawfl_json['input']]
+    for workflow in metawfl_json['workflows']:
+        for a in workflow['input']:
+            arguments_.append((f'{workflow["name"]}.{a[yaml_parser.YAMLMetaWorkflow.ARGUMENT_NAME_SCHEMA]}', a))
+
+    rulesets_ = []
+    for name, argument in arguments_:
+        value_ = argument.get(yaml_parser.YAMLMetaWorkflow.VALUE_SCHEMA)
+        if isinstance(value_, dict) and yaml_parser.YAMLMetaWorkflow.QC_THRESHOLDS_SCHEMA in value_:
+            rulesets_.append({
+                'name': name,
+                'thresholds': value_[yaml_parser.YAMLMetaWorkflow.QC_THRESHOLDS_SCHEMA],
+                'rule': value_[yaml_parser.YAMLMetaWorkflow.OVERALL_QUALITY_STATUS_RULE_SCHEMA]
+            })
+    return rulesets_
+
+def load_metrics(file, sample_column):
+    """Load a table of QC metrics with a row for each sample,
+    in CSV format if the file ends with .csv, else TSV.
+    Raise ValueError if the sample column is missing.
+
+        :return: Samples, values for each metric as strings
+        :rtype: tuple(list(str), dict(str, list(str)))
+    """
+    delimiter_ = ',' if file.endswith('.csv') else '\t'
+    with open(file, newline='') as f:
+        reader = csv.reader(f, delimiter=delimiter_)
+        header_ = next(reader, [])
+        rows_ = [row for row in reader if row]
+    if sample_column not in header_:
+        raise ValueError(f'Missing sample column {sample_column} in metrics table {file}')
+    columns_ = {name: [] for name in header_}
+    for row in rows_:
+        for name, value in zip(header_, row):
+            columns_[name].append(value)
+    return columns_.pop(sample_column), columns_
+
+def _column(values, target):
+    """Helper to convert the values for a metric to an array to compare with target,
+    as float if target is a number, with NaN for the values that are not numbers, else as strings.
+    Return the array and the mask for the missing values,
+    NaN for numbers and empty strings for strings.
+    """
+    if isinstance(target, str):
+        column_ = np.char.strip(np.array(values, dtype=str))
+        return column_, column_ == ''
+    try:
+        column_ = np.array(values, dtype=float)
+    except ValueError: # some values are not numbers
+        column_ = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try: column_[i] = float(value)
+            except ValueError: pass
+    return column_, np.isnan(column_)
+
+def _compile_rule(rule, ids):
+    """Helper to compile an overall_quality_status_rule, e.g. ( {c1} and {c2} ) or not {c3},
+    into a function that combines boolean arrays for the rules with and, or, not.
+    Raise ValueError if the rule references unknown rules or uses other expressions.
+    """
+    names_ = {}
+    def _name(match):
+        id = match.group(1).strip()
+        if id not in ids:
+            raise ValueError(f'Unknown rule {id} in {rule}')
+        return names_.setdefault(id, f'_r{len(names_)}')
+    try:
+        tree_ = ast.parse(RULE_ID_RE.sub(_name, rule).strip(), mode='eval').body
+    except SyntaxError as e:
+        raise ValueError(f'Invalid rule {rule}: {e.msg}')
+    ids_ = {name: id for id, name in names_.items()}
+
+    def _compile(node):
+        if isinstance(node, ast.Name) and node.id in ids_:
+            return lambda masks: masks[ids_[node.id]]
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            operand_ = _compile(node.operand)
+            return lambda masks: ~operand_(masks)
+        if isinstance(node, ast.BoolOp):
+            values_ = [_compile(v) for v in node.values]
+            reduce_ = np.logical_and.reduce if isinstance(node.op, ast.And) else np.logical_or.reduce
+            return lambda masks: reduce_([v(masks) for v in values_])
+        raise ValueError(f'Invalid rule {rule}, only rules combined with and, or, not are supported')
+
+    return _compile(tree_)
+
+
+###############################################################
+#   QCRuleset
+###############################################################
+class QCRuleset(object):
+    """Class to evaluate a qc_thresholds ruleset against the QC metrics for many samples.
+    A rule is PASS if the metric compared to pass_target holds, WARN if the metric
+    compared to warn_target holds, FAIL otherwise, or if the metric is missing for the sample.
+    The overall status is PASS if the overall_quality_status_rule holds with the rules that are PASS,
+    WARN if it holds with the rules that are PASS or WARN, FAIL otherwise.
+    """
+
+    def __init__(self, ruleset):
+        """Constructor method.
+        Raise ValueError if a rule has an unknown operator or the overall rule is not valid.
+
+            :param ruleset: Ruleset from load_rulesets
+            :type ruleset: dict
+        """
+        self.name = ruleset['name']
+        self.thresholds = ruleset['thresholds']
+        self.rule = ruleset['rule']
+        for threshold in self.thresholds:
+            if threshold['operator'] not in OPERATORS:
+                raise ValueError(f'Unknown operator {threshold["operator"]} for rule {threshold["id"]}')
+        self.ids = [threshold['id'] for threshold in self.thresholds]
+        if OVERALL in self.ids:
+            raise ValueError(f'Rule id {OVERALL} is reserved for the overall status')
+        self._overall = _compile_rule(self.rule, self.ids) if self.rule else None
+
+    def evaluate(self, metrics, samples):
+        """Evaluate the ruleset for all the samples at once.
+        Raise ValueError if a metric is missing from the table.
+
+            :param metrics: Values for each metric as strings, a value for each sample
+            :type metrics: dict(str, list(str))
+            :param samples: Number of samples
+            :type samples: int
+            :return: Status for each rule and overall, as arrays of FAIL, WARN, PASS
+            :rtype: dict(str, numpy.ndarray)
+        """
+        status_, columns_ = {}, {}
+        def _get(metric, target):
+            key_ = (metric, isinstance(target, str))
+            if key_ not in columns_:
+                columns_[key_] = _column(metrics[metric], target)
+            return columns_[key_]
+
+        for threshold in self.thresholds:
+            if threshold['metric'] not in metrics:
+                raise ValueError(f'Missing metric {threshold["metric"]} for rule {threshold["id"]} in metrics table')
+            compare_ = getattr(np, OPERATORS[threshold['operator']])
+            pass_column_, pass_missing_ = _get(threshold['metric'], threshold['pass_target'])
+            warn_column_, warn_missing_ = _get(threshold['metric'], threshold['warn_target'])
+            pass_ = compare_(pass_column_, threshold['pass_target'])
+            warn_ = compare_(warn_column_, threshold['warn_target'])
+            # missing values fail, also for != that holds for NaN and empty strings
+            status_[threshold['id']] = np.where(pass_missing_ | warn_missing_, FAIL,
+                                                np.where(pass_, PASS, np.where(warn_, WARN, FAIL))).astype(np.int8)
+
+        if self._overall:
+            pass_ = self._overall({id: s == PASS for id, s in status_.items()})
+            warn_ = self._overall({id: s >= WARN for id, s in status_.items()})
+            overall_ = np.where(pass_, PASS, np.where(warn_, WARN, FAIL)).astype(np.int8)
+        elif status_:
+            overall_ = np.min(np.stack(list(status_.values())), axis=0)
+        else:
+            overall_ = np.full(samples, PASS, dtype=np.int8)
+        status_[OVERALL] = overall_
+        return status_
+
+    @staticmethod
+    def summary(status):
+        """Return the number of samples with each status for each rule and overall.
+        """
+        counts_ = {}
+        for id, s in status.items():
+            c_ = np.bincount(s, minlength=len(STATUS))
+            counts_[id] = {STATUS[i]: int(c_[i]) for i in range(len(STATUS))}
+        return counts_
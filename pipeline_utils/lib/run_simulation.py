@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+###########################################################
+#
+#   run_simulation
+#      local dry run of a MetaWorkflow through magma,
+#      with mock inputs and stub durations for the steps
+#
+###########################################################
+
+import time
+import heapq
+from magma.metawfl import MetaWorkflow
+from magma.metawflrun import MetaWorkflowRun
+from pipeline_utils.lib import yaml_parser
+
+
+###############################################################
+#   Variables
+###############################################################
+# placeholders to convert the MetaWorkflow to JSON
+DRY_RUN_VERSION = 'dry_run'
+DRY_RUN_CONSORTIA = ['dry_run']
+# magma supports up to 3 input dimensions
+MAX_DIMENSIONS = 3
+# key for the duration of the steps not listed
+DEFAULT_DURATION = 'default'
+# magma status for the runs
+RUNNING_STATUS = 'running'
+COMPLETED_STATUS = 'completed'
+
+
+###############################################################
+#   Functions
+###############################################################
+def parse_durations(values):
+    """Parse durations in hours for the steps from STEP=HOURS strings,
+    with default=HOURS for the steps not listed, 1 if not specified.
+    Raise ValueError if a string is not in the expected format.
+    """
+    durations_ = {DEFAULT_DURATION: 1.0}
+    for value in values or []:
+        step, sep, hours = value.partition('=')
+        try:
+            if not sep or not step:
+                raise ValueError
+            durations_[step] = float(hours)
+        except ValueError:
+            raise ValueError(f'Duration {value} is not in STEP=HOURS format')
+    return durations_
+
+def input_structure(dimensions):
+    """Return mock input files nested as magma expects,
+    e.g. [2, 3] -> [['input:0:0', 'input:0:1', 'input:0:2'], ['input:1:0', ...]].
+    Raise ValueError if there are more dimensions than magma supports.
+    """
+    if not dimensions or len(dimensions) > MAX_DIMENSIONS:
+        raise ValueError(f'Inputs must have 1 to {MAX_DIMENSIONS} dimensions, found {len(dimensions or [])}')
+
+    def _nested(prefix, dimensions):
+        if not dimensions:
+            return prefix
+        return [_nested(f'{prefix}:{i}', dimensions[1:]) for i in range(dimensions[0])]
+
+    return _nested('input', list(dimensions))
+
+def simulate(run_json, durations, max_parallel=None):
+    """Simulate the MetaWorkflowRun in run_json with magma,
+    starting the runs that are ready as soon as their dependencies complete.
+    Each run takes the duration for its step.
+
+        :param run_json: MetaWorkflowRun created by magma
+        :type run_json: dict
+        :param durations: Duration in hours for the steps, from parse_durations
+        :type durations: dict
+        :param max_parallel: Maximum number of runs at the same time, no limit if not specified
+        :type max_parallel: int
+        :return: Runs in the order they started with start and end, final status
+        :rtype: tuple(list(dict), str)
+    """
+    run_ = MetaWorkflowRun(run_json)
+    order_, running_ = [], []
+    clock = 0
+    while True:
+        ready_ = run_.to_run()
+        if max_parallel:
+            ready_ = ready_[:max(max_parallel - len(running_), 0)]
+        for run_obj in ready_:
+            end_ = clock + durations.get(run_obj.name, durations[DEFAULT_DURATION])
+            run_.update_attribute(run_obj.shard_name, 'status', RUNNING_STATUS)
+            heapq.heappush(running_, (end_, len(order_), run_obj.shard_name))
+            order_.append({'run': run_obj.shard_name, 'step': run_obj.name, 'start': clock, 'end': end_})
+        if not running_:
+            break
+        # complete all the runs ending next
+        clock = running_[0][0]
+        while running_ and running_[0][0] == clock:
+            _, _, shard_name = heapq.heappop(running_)
+            run_.update_attribute(shard_name, 'status', COMPLETED_STATUS)
+    return order_, run_.update_status()
+
+def dry_run(dag, dimensions, durations, max_parallel=None):
+    """Dry run for the MetaWorkflow through magma.
+    The MetaWorkflow is converted to JSON as for deployment, magma creates the MetaWorkflowRun
+    for mock inputs of the given dimensions, and the runs are simulated with stub durations.
+    The runs created by magma are checked against the fanout simulation.
+
+        :param dag: Graph of the steps for the MetaWorkflow, without errors or cycles
+        :type dag: pipeline_utils.lib.metaworkflow_dag.MetaWorkflowDAG
+        :param dimensions: Size of each input dimension
+        :type dimensions: list(int)
+        :param durations: Duration in hours for the steps, from parse_durations
+        :type durations: dict
+        :param max_parallel: Maximum number of runs at the same time, no limit if not specified
+        :type max_parallel: int
+        :return: Runs for each step, order of the runs, simulated hours, seconds to create the run JSON, and errors
+        :rtype: dict
+    """
+    report_ = {
+        'name': dag.name,
+        'dimensions': list(dimensions),
+        'runs': None,
+        'steps': None,
+        'order': None,
+        'hours': None,
+        'final_status': None,
+        'write_run_seconds': None,
+        'simulate_seconds': None,
+        'errors': []
+    }
+    metawfl_json = yaml_parser.YAMLMetaWorkflow(dag.data).to_json(
+                            DRY_RUN_VERSION, DRY_RUN_CONSORTIA, DRY_RUN_CONSORTIA
+                            )
+    metawfl_json.setdefault(yaml_parser.YAMLMetaWorkflow.UUID_SCHEMA, f'{DRY_RUN_VERSION}-{dag.name}')
+
+    try:
+        start_ = time.perf_counter()
+        run_json = MetaWorkflow(metawfl_json).write_run(input_structure(dimensions))
+        report_['write_run_seconds'] = time.perf_counter() - start_
+    except (ValueError, KeyError, IndexError) as e:
+        report_['errors'].append(f'magma failed to create the run: {type(e).__name__}: {e}')
+        return report_
+
+    steps_ = {}
+    for run in run_json['workflow_runs']:
+        steps_.setdefault(run['name'], {'runs': 0, 'start': None, 'end': None})
+        steps_[run['name']]['runs'] += 1
+    report_['runs'] = len(run_json['workflow_runs'])
+
+    # runs created by magma against the fanout simulation
+    fanout_ = dag.fanout(dimensions)
+    for step, step_ in fanout_['steps'].items():
+        runs_ = steps_.get(step, {'runs': 0})['runs']
+        if runs_ != step_['runs']:
+            report_['errors'].append(f'{step}: magma created {runs_} runs, fanout expects {step_["runs"]}')
+
+    try:
+        start_ = time.perf_counter()
+        order_, report_['final_status'] = simulate(run_json, durations, max_parallel)
+        report_['simulate_seconds'] = time.perf_counter() - start_
+    except KeyError as e:
+        report_['errors'].append(f'run depends on missing run {e}')
+        report_['steps'] = steps_
+        return report_
+
+    for run in order_:
+        step_ = steps_[run['step']]
+        if step_['start'] is None:
+            step_['start'] = run['start']
+        step_['end'] = max(step_['end'] or 0, run['end'])
+    report_['steps'] = dict(sorted(steps_.items(), key=lambda s: (s[1]['start'] is None, s[1]['start'] or 0, s[1]['end'] or 0)))
+    report_['order'] = order_
+    report_['hours'] = max((run['end'] for run in order_), default=0)
+    if report_['final_status'] != COMPLETED_STATUS:
+        report_['errors'].append(f'run did not complete, final status {report_["final_status"]}')
+    return report_
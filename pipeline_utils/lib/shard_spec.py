@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+###########################################################
+#
+#   shard_spec
+#      fixed shards for a MetaWorkflow step, as list of shards
+#      or as product of lists and ranges expanded on demand
+#
+###########################################################
+
+import itertools
+
+
+###############################################################
+#   Variables
+###############################################################
+PRODUCT_SCHEMA = 'product'
+RANGE_SCHEMA = 'range'
+
+
+###############################################################
+#   Functions
+###############################################################
+def is_product(shards):
+    """Return True if shards are specified as product of lists and ranges,
+    e.g. {product: [[chr1, chr2], {range: [0, 24]}]}.
+    """
+    return isinstance(shards, dict)
+
+def _range(item):
+    """Helper to return the range for an item of the product specified as [start, stop[, step]].
+    """
+    try:
+        return range(*item[RANGE_SCHEMA])
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'Invalid shards range {item[RANGE_SCHEMA]}: {e}')
+
+def range_errors(shards):
+    """Return the errors for the ranges of a product that are not valid,
+    with a step of zero or without values, as (index of the item, message).
+    """
+    errors_ = []
+    if not is_product(shards):
+        return errors_
+    for i, item in enumerate(shards[PRODUCT_SCHEMA]):
+        if not isinstance(item, dict):
+            continue
+        range_ = item[RANGE_SCHEMA]
+        if len(range_) > 2 and range_[2] == 0:
+            errors_.append((i, f'{range_} has step 0'))
+        elif not len(range(*range_)):
+            errors_.append((i, f'{range_} is empty'))
+    return errors_
+
+def _values(item):
+    """Helper to return the values for an item of the product as strings,
+    item is either a list of values or a range.
+    """
+    if isinstance(item, dict):
+        return [str(i) for i in _range(item)]
+    return [str(v) for v in item]
+
+def expand(shards):
+    """Generate the shards one at a time, as list of strings for each dimension.
+    Shards specified as list are returned as they are.
+    """
+    if not is_product(shards):
+        yield from shards
+        return
+    for shard in itertools.product(*(_values(item) for item in shards[PRODUCT_SCHEMA])):
+        yield list(shard)
+
+def count(shards):
+    """Return the number of shards, without expanding a product.
+    Raise ValueError if a range is not valid.
+    """
+    if not is_product(shards):
+        return len(shards)
+    count_ = 1
+    for item in shards[PRODUCT_SCHEMA]:
+        count_ *= len(_range(item)) if isinstance(item, dict) else len(item)
+    return count_
+
+def dimensions(shards):
+    """Return the set of dimensions for the shards,
+    a product has a single dimension for each item.
+    """
+    if not is_product(shards):
+        return {len(s) for s in shards}
+    return {len(shards[PRODUCT_SCHEMA])}
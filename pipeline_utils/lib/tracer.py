@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+###########################################################
+#
+#   tracer
+#      timeline of a deploy in Chrome Trace Event format
+#
+###########################################################
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+
+###############################################################
+#   Tracer
+###############################################################
+class Tracer(object):
+    """Class to record spans for a deploy, e.g. repositories, phases,
+    objects and network calls, with the thread running them.
+    Spans are written in Chrome Trace Event format,
+    the file can be opened in Perfetto or chrome://tracing.
+    """
+
+    def __init__(self):
+        """Constructor method.
+        """
+        self._events = []
+        # small sequential ids for threads, by thread ident
+        self._threads = {}
+        self._span_id = 0
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _tid(self):
+        """Helper to get the id for the current thread,
+        register the thread name the first time.
+        """
+        ident_ = threading.get_ident()
+        tid_ = self._threads.get(ident_)
+        if tid_ is None:
+            tid_ = len(self._threads) + 1
+            self._threads[ident_] = tid_
+            self._events.append({
+                'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid_,
+                'args': {'name': threading.current_thread().name}
+            })
+        return tid_
+
+    @contextmanager
+    def span(self, name, category, **args):
+        """Context manager to record a span for the enclosed code.
+        The span is recorded also if the code raises.
+
+            :param name: Name of the span
+            :type name: str
+            :param category: Category of the span, e.g. repo, phase, object, stage
+            :type category: str
+            :param args: Additional information for the span
+        """
+        start_ = time.perf_counter()
+        with self._lock:
+            self._span_id += 1
+            span_id_ = self._span_id
+        try:
+            yield
+        finally:
+            end_ = time.perf_counter()
+            with self._lock:
+                self._events.append({
+                    'name': name,
+                    'cat': category,
+                    'ph': 'X',
+                    'ts': (start_ - self._start) * 1e6,
+                    'dur': (end_ - start_) * 1e6,
+                    'pid': os.getpid(),
+                    'tid': self._tid(),
+                    'args': dict(args, span=span_id_)
+                })
+
+    def events(self):
+        """Return the recorded events.
+        """
+        with self._lock:
+            return list(self._events)
+
+    def write(self, file):
+        """Write the recorded events to file in Chrome Trace Event format.
+        """
+        with open(file, 'w') as f:
+            json.dump({'traceEvents': self.events(), 'displayTimeUnit': 'ms'}, f)
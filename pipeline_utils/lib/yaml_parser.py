@@ -12,7 +12,11 @@
 import sys
 import yaml
 import itertools
+import functools
 from jsonschema import Draft202012Validator
+from jsonschema import exceptions as jsonschema_exceptions
+from pipeline_utils.schemas import schema as schema_
+from pipeline_utils.lib import shard_spec
 
 
 ###############################################################
@@ -26,9 +30,45 @@ from pipeline_utils.schemas.yaml_file_format import yaml_file_format_schema
 from pipeline_utils.schemas.yaml_reference_genome import yaml_reference_genome_schema
 
 
+###############################################################
+#   Variables
+###############################################################
+# compiled validators by schema $id, shared by all the documents
+VALIDATORS = {}
+# maximum number of strings for consortia kept in cache
+CONSORTIA_CACHE_SIZE = 64
+
+
 ###############################################################
 #   Functions
 ###############################################################
+def get_validator(schema):
+    """Return the validator for schema.
+    Validators are compiled once and reused for the following documents.
+    """
+    validator = VALIDATORS.get(schema['$id'])
+    if validator is None or validator.schema is not schema:
+        validator = Draft202012Validator(schema)
+        VALIDATORS[schema['$id']] = validator
+    return validator
+
+@functools.lru_cache(maxsize=CONSORTIA_CACHE_SIZE)
+def string_consortia(consortia):
+    """Return the string for consortia used in aliases.
+    Strings are created once and reused for the following objects.
+
+        :param consortia: Consortia, as tuple to be used as key for the cache
+        :type consortia: tuple(str)
+    """
+    return '_'.join(sorted(consortia))
+
+def schema_fields(schema, exclude=()):
+    """Return the fields defined in schema properties,
+    used as attributes for the objects of the corresponding class.
+    Fields in exclude are skipped.
+    """
+    return tuple(f for f in schema[schema_.PROPERTIES] if f not in exclude)
+
 def load_yaml(file):
     """Return a generator to YAML documents in file.
     """
@@ -86,8 +126,20 @@ class ValidationError(Exception):
 ###############################################################
 class YAMLTemplate(object):
     """Template class to work with YAML documents representing pipeline components.
+
+    Subclasses define FIELDS from the properties of their schema and use them as __slots__,
+    fields missing in the document are set to None.
+    Fields not in the schema are still available as attributes.
     """
 
+    # fields that can be specified for any object
+    COMMON_FIELDS = ('uuid', 'accession', 'title')
+    __slots__ = ('data', 'schema', '_extra') + COMMON_FIELDS
+    SCHEMA = None
+    FIELDS = ()
+    # type used in the aliases for the objects of the class
+    ALIAS_TYPE = None
+
     # schema constants
     NAME_SCHEMA = 'name'
     TITLE_SCHEMA = 'title'
@@ -131,11 +183,36 @@ class YAMLTemplate(object):
         self.data = data
         self.schema = schema
 
+    def __getattr__(self, name):
+        """Return fields not in the schema, called only if name is not a slot.
+        """
+        try:
+            return object.__getattribute__(self, '_extra')[name]
+        except (AttributeError, KeyError, TypeError):
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def _load(self, data, clean=()):
+        """Helper to load the fields of the document as attributes.
+        Fields in clean are cleaned from the YAML block style indicator.
+        """
+        for field in self.COMMON_FIELDS + self.FIELDS:
+            setattr(self, field, None)
+        # created only for documents with fields not in the schema
+        self._extra = None
+        for key, val in data.items():
+            if key in clean:
+                val = self._clean_newline(val)
+            if key in self.FIELDS or key in self.COMMON_FIELDS:
+                setattr(self, key, val)
+            else:
+                if self._extra is None:
+                    self._extra = {}
+                self._extra[key] = val
+
     def _validate(self):
         """Helper to validate the document against schema.
         """
-        draft202012validator = Draft202012Validator(self.schema)
-        errors = draft202012validator.iter_errors(self.data)
+        errors = get_validator(self.schema).iter_errors(self.data)
         errors_ = peek(errors)
         if errors_:
             raise ValidationError(errors_)
@@ -152,7 +229,7 @@ class YAMLTemplate(object):
     def _link_title(self, name, version=None):
         """Helper to create a "title" field.
         """
-        title = getattr(self, self.TITLE_SCHEMA, None)
+        title = self.title
         if title:
             if version:
                 if version in title:
@@ -170,7 +247,32 @@ class YAMLTemplate(object):
     def _string_consortia(self, consortia):
         """Helper to create a string from "consortia" field.
         """
-        return '_'.join(sorted(consortia))
+        return string_consortia(tuple(consortia))
+
+    @classmethod
+    def alias_prefix(cls, consortia):
+        """Return the prefix for the aliases of the objects of the class,
+        e.g. smaht:Software-
+        """
+        return f'{string_consortia(tuple(consortia))}:{cls.ALIAS_TYPE}-'
+
+    @classmethod
+    def to_json_many(cls, documents, **kwargs):
+        """Generator to validate many documents and convert them to JSON.
+        The validator and the prefix for the aliases are shared by all the documents.
+        Objects of the class already created from the documents are converted without validating them again.
+        Raise ValidationError at the first document that is not valid.
+
+            :param documents: YAML documents for objects of the class, or the objects
+            :type documents: Iterable[dict | YAMLTemplate]
+            :param kwargs: Arguments for the to_json method of the class
+            :return: Generator to the objects in JSON format, in order
+            :rtype: Iterator[dict]
+        """
+        alias_prefix_ = cls.alias_prefix(kwargs['consortia'])
+        for data in documents:
+            object_ = data if isinstance(data, cls) else cls(data)
+            yield object_.to_json(alias_prefix=alias_prefix_, **kwargs)
 
 ###############################################################
 #   YAMLWorkflow, YAML Workflow
@@ -179,6 +281,11 @@ class YAMLWorkflow(YAMLTemplate):
     """Class to work with YAML documents representing Workflow objects.
     """
 
+    SCHEMA = yaml_workflow_schema
+    FIELDS = schema_fields(SCHEMA)
+    ALIAS_TYPE = YAMLTemplate.WORKFLOW_TYPE_SCHEMA
+    __slots__ = schema_fields(SCHEMA, exclude=YAMLTemplate.COMMON_FIELDS)
+
     # schema constants
     INPUT_FILE_SCHEMA = 'Input file'
     OUTPUT_PROCESSED_FILE_SCHEMA = 'Output processed file'
@@ -199,14 +306,11 @@ class YAMLWorkflow(YAMLTemplate):
     def __init__(self, data):
         """Constructor method.
         """
-        super().__init__(data, yaml_workflow_schema)
+        super().__init__(data, self.SCHEMA)
         # validate data with schema
         self._validate()
         # load attributes
-        for key, val in data.items():
-            if key in [self.DESCRIPTION_SCHEMA]:
-                val = self._clean_newline(val)
-            setattr(self, key, val)
+        self._load(data, clean=[self.DESCRIPTION_SCHEMA])
 
     def _arguments_input(self):
         """Helper to parse input arguments and map to expected JSON structure.
@@ -289,9 +393,11 @@ class YAMLWorkflow(YAMLTemplate):
                version,
                submission_centers, # alias list
                consortia, # alias list
-               wflbucket_url
+               wflbucket_url,
+               alias_prefix=None
                ):
         """Function to build the corresponding object in JSON format.
+        alias_prefix is created from consortia if not specified.
         """
         wfl_json = {}
 
@@ -299,14 +405,14 @@ class YAMLWorkflow(YAMLTemplate):
         wfl_json[self.VERSION_SCHEMA] = version # version
         wfl_json[self.NAME_SCHEMA] = self.name
         wfl_json[self.TITLE_SCHEMA] = self._link_title(self.name, version)
-        wfl_json[self.ALIASES_SCHEMA] = [f'{self._string_consortia(consortia)}:{self.WORKFLOW_TYPE_SCHEMA}-{self.name}_{version}']
+        wfl_json[self.ALIASES_SCHEMA] = [f'{alias_prefix or self.alias_prefix(consortia)}{self.name}_{version}']
         wfl_json[self.CATEGORY_SCHEMA] = self.category
         wfl_json[self.SUBMISSION_CENTERS_SCHEMA] = submission_centers
         wfl_json[self.CONSORTIA_SCHEMA] = consortia
         wfl_json[self.DESCRIPTION_SCHEMA] = self.description
         # check if software
-        if getattr(self, self.SOFTWARE_SCHEMA, None):
-            wfl_json[self.SOFTWARE_SCHEMA] = [f'{self._string_consortia(consortia)}:{self.SOFTWARE_TYPE_SCHEMA}-{s.replace("@", "_")}' for s in getattr(self, self.SOFTWARE_SCHEMA)]
+        if self.software:
+            wfl_json[self.SOFTWARE_SCHEMA] = [f'{self._string_consortia(consortia)}:{self.SOFTWARE_TYPE_SCHEMA}-{s.replace("@", "_")}' for s in self.software]
         wfl_json[self.ARGUMENTS_SCHEMA] = self._arguments_input() + self._arguments_output()
 
         # workflow language and description files
@@ -318,9 +424,9 @@ class YAMLWorkflow(YAMLTemplate):
             wfl_json['child_file_names'] = self.runner.get('child')
 
         # uuid, accession if specified
-        if getattr(self, self.UUID_SCHEMA, None):
+        if self.uuid:
             wfl_json[self.UUID_SCHEMA] = self.uuid
-        if getattr(self, self.ACCESSION_SCHEMA, None):
+        if self.accession:
             wfl_json[self.ACCESSION_SCHEMA] = self.accession
 
         return wfl_json
@@ -333,6 +439,11 @@ class YAMLMetaWorkflow(YAMLTemplate):
     """Class to work with YAML documents representing MetaWorkflow objects.
     """
 
+    SCHEMA = yaml_metaworkflow_schema
+    FIELDS = schema_fields(SCHEMA)
+    ALIAS_TYPE = YAMLTemplate.METAWORKFLOW_TYPE_SCHEMA
+    __slots__ = schema_fields(SCHEMA, exclude=YAMLTemplate.COMMON_FIELDS)
+
     # schema constants
     DIMENSION_SCHEMA = 'dimension'
     WORKFLOW_SCHEMA = 'workflow'
@@ -355,18 +466,35 @@ class YAMLMetaWorkflow(YAMLTemplate):
     QC_RULE_SCHEMA = 'qc_rule'
     QC_RULESET_SCHEMA = 'qc_ruleset'
     QC_RULESET_PORTAL_SCHEMA = 'QC ruleset'
+    SHARDS_PRODUCT_SCHEMA = 'shards-product'
 
     def __init__(self, data):
         """Constructor method.
         """
-        super().__init__(data, yaml_metaworkflow_schema)
+        super().__init__(data, self.SCHEMA)
         # validate data with schema
         self._validate()
+        self._validate_shards()
         # load attributes
-        for key, val in data.items():
-            if key in [self.DESCRIPTION_SCHEMA]:
-                val = self._clean_newline(val)
-            setattr(self, key, val)
+        self._load(data, clean=[self.DESCRIPTION_SCHEMA])
+
+    def _validate_shards(self):
+        """Helper to validate the ranges in the shards of the steps,
+        a range with a step of zero or without values is not valid.
+        """
+        errors_ = []
+        for name, values in self.data[self.WORKFLOWS_SCHEMA].items():
+            shards_ = values.get(self.SHARDS_SCHEMA)
+            for i, message in shard_spec.range_errors(shards_):
+                errors_.append(jsonschema_exceptions.ValidationError(
+                    f'Invalid shards range for {name}, {message}',
+                    validator=shard_spec.RANGE_SCHEMA,
+                    path=[self.WORKFLOWS_SCHEMA, name, self.SHARDS_SCHEMA, shard_spec.PRODUCT_SCHEMA, i, shard_spec.RANGE_SCHEMA],
+                    instance=shards_[shard_spec.PRODUCT_SCHEMA][i],
+                    schema=self.SCHEMA[schema_.DEFS][self.SHARDS_PRODUCT_SCHEMA]
+                    ))
+        if errors_:
+            raise ValidationError(errors_)
 
     def _arguments(self, input, consortia):
         """Helper to parse arguments and map to expected JSON structure.
@@ -472,8 +600,9 @@ class YAMLMetaWorkflow(YAMLTemplate):
             if values.get(self.DEPENDENCIES_SCHEMA):
                 workflow_[self.DEPENDENCIES_SCHEMA] = values[self.DEPENDENCIES_SCHEMA]
             # fixed shards
+            #   a product of lists and ranges is expanded here
             if values.get(self.SHARDS_SCHEMA):
-                workflow_[self.SHARDS_SCHEMA] = values[self.SHARDS_SCHEMA]
+                workflow_[self.SHARDS_SCHEMA] = list(shard_spec.expand(values[self.SHARDS_SCHEMA]))
             workflows.append(workflow_)
 
         return workflows
@@ -482,9 +611,11 @@ class YAMLMetaWorkflow(YAMLTemplate):
                self,
                version,
                submission_centers, # alias list
-               consortia # alias list
+               consortia, # alias list
+               alias_prefix=None
                ):
         """Function to build the corresponding object in JSON format.
+        alias_prefix is created from consortia if not specified.
         """
         metawfl_json = {}
 
@@ -492,7 +623,7 @@ class YAMLMetaWorkflow(YAMLTemplate):
         metawfl_json[self.NAME_SCHEMA] = self.name
         metawfl_json[self.VERSION_SCHEMA] = version # version
         metawfl_json[self.TITLE_SCHEMA] = self._link_title(self.name, version)
-        metawfl_json[self.ALIASES_SCHEMA] = [f'{self._string_consortia(consortia)}:{self.METAWORKFLOW_TYPE_SCHEMA}-{self.name}_{version}']
+        metawfl_json[self.ALIASES_SCHEMA] = [f'{alias_prefix or self.alias_prefix(consortia)}{self.name}_{version}']
         metawfl_json[self.CATEGORY_SCHEMA] = self.category
         metawfl_json[self.SUBMISSION_CENTERS_SCHEMA] = submission_centers
         metawfl_json[self.CONSORTIA_SCHEMA] = consortia
@@ -501,9 +632,9 @@ class YAMLMetaWorkflow(YAMLTemplate):
         metawfl_json[self.WORKFLOWS_SCHEMA] = self._workflows(version, consortia)
 
         # uuid, accession if specified
-        if getattr(self, self.UUID_SCHEMA, None):
+        if self.uuid:
             metawfl_json[self.UUID_SCHEMA] = self.uuid
-        if getattr(self, self.ACCESSION_SCHEMA, None):
+        if self.accession:
             metawfl_json[self.ACCESSION_SCHEMA] = self.accession
 
         return metawfl_json
@@ -516,6 +647,11 @@ class YAMLSoftware(YAMLTemplate):
     """Class to work with YAML documents representing Software objects.
     """
 
+    SCHEMA = yaml_software_schema
+    FIELDS = schema_fields(SCHEMA)
+    ALIAS_TYPE = YAMLTemplate.SOFTWARE_TYPE_SCHEMA
+    __slots__ = schema_fields(SCHEMA, exclude=YAMLTemplate.COMMON_FIELDS)
+
     # schema constants
     COMMIT_SCHEMA = 'commit'
     SOURCE_URL_SCHEMA = 'source_url'
@@ -523,21 +659,20 @@ class YAMLSoftware(YAMLTemplate):
     def __init__(self, data):
         """Constructor method.
         """
-        super().__init__(data, yaml_software_schema)
+        super().__init__(data, self.SCHEMA)
         # validate data with schema
         self._validate()
         # load attributes
-        for key, val in data.items():
-            if key in [self.DESCRIPTION_SCHEMA]:
-                val = self._clean_newline(val)
-            setattr(self, key, val)
+        self._load(data, clean=[self.DESCRIPTION_SCHEMA])
 
     def to_json(
                self,
                submission_centers, # alias list
-               consortia # alias list
+               consortia, # alias list
+               alias_prefix=None
                ):
         """Function to build the corresponding object in JSON format.
+        alias_prefix is created from consortia if not specified.
         """
         sftwr_json, version = {}, None
 
@@ -547,33 +682,33 @@ class YAMLSoftware(YAMLTemplate):
         sftwr_json[self.CONSORTIA_SCHEMA] = consortia
         sftwr_json[self.CATEGORY_SCHEMA] = self.category
 
-        if getattr(self, self.VERSION_SCHEMA, None):
+        if self.version:
             sftwr_json[self.VERSION_SCHEMA] = self.version
             version = self.version
         else:
             sftwr_json[self.COMMIT_SCHEMA] = self.commit
             version = self.commit
 
-        if getattr(self, self.DESCRIPTION_SCHEMA, None):
+        if self.description:
             sftwr_json[self.DESCRIPTION_SCHEMA] = self.description
-        if getattr(self, self.SOURCE_URL_SCHEMA, None):
+        if self.source_url:
             sftwr_json[self.SOURCE_URL_SCHEMA] = self.source_url
 
         sftwr_json[self.TITLE_SCHEMA] = self._link_title(self.name)
-        sftwr_json[self.ALIASES_SCHEMA] = [f'{self._string_consortia(consortia)}:{self.SOFTWARE_TYPE_SCHEMA}-{self.name}_{version}']
+        sftwr_json[self.ALIASES_SCHEMA] = [f'{alias_prefix or self.alias_prefix(consortia)}{self.name}_{version}']
 
         # uuid, accession if specified
-        if getattr(self, self.UUID_SCHEMA, None):
+        if self.uuid:
             sftwr_json[self.UUID_SCHEMA] = self.uuid
-        if getattr(self, self.ACCESSION_SCHEMA, None):
+        if self.accession:
             sftwr_json[self.ACCESSION_SCHEMA] = self.accession
 
         # license
-        if getattr(self, self.LICENSE_SCHEMA, None):
+        if self.license:
             sftwr_json[self.LICENSE_SCHEMA] = self.license
 
         # code
-        if getattr(self, self.CODE_SCHEMA, None):
+        if self.code:
             sftwr_json[self.CODE_SCHEMA] = self.code
 
         return sftwr_json
@@ -586,6 +721,11 @@ class YAMLReferenceFile(YAMLTemplate):
     """Class to work with YAML documents representing ReferenceFile objects.
     """
 
+    SCHEMA = yaml_reference_file_schema
+    FIELDS = schema_fields(SCHEMA)
+    ALIAS_TYPE = YAMLTemplate.REFERENCEFILE_TYPE_SCHEMA
+    __slots__ = schema_fields(SCHEMA, exclude=YAMLTemplate.COMMON_FIELDS)
+
     # schema constants
     EXTRA_FILES_SCHEMA = 'extra_files'
     DATA_CATEGORY_SCHEMA = 'data_category'
@@ -594,21 +734,20 @@ class YAMLReferenceFile(YAMLTemplate):
     def __init__(self, data):
         """Constructor method.
         """
-        super().__init__(data, yaml_reference_file_schema)
+        super().__init__(data, self.SCHEMA)
         # validate data with schema
         self._validate()
         # load attributes
-        for key, val in data.items():
-            if key in [self.DESCRIPTION_SCHEMA]:
-                val = self._clean_newline(val)
-            setattr(self, key, val)
+        self._load(data, clean=[self.DESCRIPTION_SCHEMA])
 
     def to_json(
                self,
                submission_centers, # alias list
-               consortia # alias list
+               consortia, # alias list
+               alias_prefix=None
                ):
         """Function to build the corresponding object in JSON format.
+        alias_prefix is created from consortia if not specified.
         """
         ref_json = {}
 
@@ -617,32 +756,32 @@ class YAMLReferenceFile(YAMLTemplate):
         ref_json[self.CONSORTIA_SCHEMA] = consortia
         ref_json[self.DESCRIPTION_SCHEMA] = self.description
         ref_json[self.FILE_FORMAT_SCHEMA] = self.format
-        ref_json[self.ALIASES_SCHEMA] = [f'{self._string_consortia(consortia)}:{self.REFERENCEFILE_TYPE_SCHEMA}-{self.name}_{self.version}']
+        ref_json[self.ALIASES_SCHEMA] = [f'{alias_prefix or self.alias_prefix(consortia)}{self.name}_{self.version}']
         # check for secondary files
-        if getattr(self, self.SECONDARY_FILES_SCHEMA, None):
-            ref_json[self.EXTRA_FILES_SCHEMA] = getattr(self, self.SECONDARY_FILES_SCHEMA)
-        ref_json[self.STATUS_SCHEMA] = getattr(self, self.STATUS_SCHEMA, None) # this will be used during post/patch,
+        if self.secondary_files:
+            ref_json[self.EXTRA_FILES_SCHEMA] = self.secondary_files
+        ref_json[self.STATUS_SCHEMA] = self.status # this will be used during post/patch,
                                                            # if None:
                                                            #    - leave it as is if patch
                                                            #    - set to uploading if post
         ref_json[self.DATA_CATEGORY_SCHEMA] = self.category
         ref_json[self.DATA_TYPE_SCHEMA] = self.type
         # variant_type
-        if getattr(self, self.VARIANT_TYPE_SCHEMA, None):
+        if self.variant_type:
             ref_json[self.VARIANT_TYPE_SCHEMA] = self.variant_type
 
         # uuid, accession if specified
-        if getattr(self, self.UUID_SCHEMA, None):
+        if self.uuid:
             ref_json[self.UUID_SCHEMA] = self.uuid
-        if getattr(self, self.ACCESSION_SCHEMA, None):
+        if self.accession:
             ref_json[self.ACCESSION_SCHEMA] = self.accession
 
         # license
-        if getattr(self, self.LICENSE_SCHEMA, None):
+        if self.license:
             ref_json[self.LICENSE_SCHEMA] = self.license
 
         # code
-        if getattr(self, self.CODE_SCHEMA, None):
+        if self.code:
             ref_json[self.CODE_SCHEMA] = self.code
 
         # title
@@ -661,6 +800,11 @@ class YAMLFileFormat(YAMLTemplate):
     """Class to work with YAML documents representing FileFormat objects.
     """
 
+    SCHEMA = yaml_file_format_schema
+    FIELDS = schema_fields(SCHEMA)
+    ALIAS_TYPE = YAMLTemplate.FILEFORMAT_TYPE_SCHEMA
+    __slots__ = schema_fields(SCHEMA, exclude=YAMLTemplate.COMMON_FIELDS)
+
     # schema constants
     STANDARD_FILE_EXTENSION_SCHEMA = 'standard_file_extension'
     VALID_ITEM_TYPES_SCHEMA = 'valid_item_types'
@@ -670,41 +814,40 @@ class YAMLFileFormat(YAMLTemplate):
     def __init__(self, data):
         """Constructor method.
         """
-        super().__init__(data, yaml_file_format_schema)
+        super().__init__(data, self.SCHEMA)
         # validate data with schema
         self._validate()
         # load attributes
-        for key, val in data.items():
-            if key in [self.DESCRIPTION_SCHEMA]:
-                val = self._clean_newline(val)
-            setattr(self, key, val)
+        self._load(data, clean=[self.DESCRIPTION_SCHEMA])
 
     def to_json(
                self,
                submission_centers, # alias list
-               consortia # alias list
+               consortia, # alias list
+               alias_prefix=None
                ):
         """Function to build the corresponding object in JSON format.
+        alias_prefix is created from consortia if not specified.
         """
         frmt_json = {}
 
         # common metadata
         frmt_json[self.IDENTIFIER_SCHEMA] = self.name
-        frmt_json[self.ALIASES_SCHEMA] = [f'{self._string_consortia(consortia)}:{self.FILEFORMAT_TYPE_SCHEMA}-{self.name}']
+        frmt_json[self.ALIASES_SCHEMA] = [f'{alias_prefix or self.alias_prefix(consortia)}{self.name}']
         frmt_json[self.SUBMISSION_CENTERS_SCHEMA] = submission_centers
         frmt_json[self.CONSORTIA_SCHEMA] = consortia
         frmt_json[self.DESCRIPTION_SCHEMA] = self.description
         frmt_json[self.STANDARD_FILE_EXTENSION_SCHEMA] = self.extension
-        frmt_json[self.VALID_ITEM_TYPES_SCHEMA] = getattr(self, self.FILE_TYPES_SCHEMA, ['ReferenceFile', 'OutputFile'])
+        frmt_json[self.VALID_ITEM_TYPES_SCHEMA] = self.file_types if self.file_types is not None else ['ReferenceFile', 'OutputFile']
         # check for secondary formats
-        if getattr(self, self.SECONDARY_FORMATS_SCHEMA, None):
-            frmt_json[self.EXTRA_FILE_FORMATS_SCHEMA] = getattr(self, self.SECONDARY_FORMATS_SCHEMA)
-        frmt_json[self.STATUS_SCHEMA] = getattr(self, self.STATUS_SCHEMA, 'released')
+        if self.secondary_formats:
+            frmt_json[self.EXTRA_FILE_FORMATS_SCHEMA] = self.secondary_formats
+        frmt_json[self.STATUS_SCHEMA] = self.status if self.status is not None else 'released'
 
         # uuid, accession if specified
-        if getattr(self, self.UUID_SCHEMA, None):
+        if self.uuid:
             frmt_json[self.UUID_SCHEMA] = self.uuid
-        if getattr(self, self.ACCESSION_SCHEMA, None):
+        if self.accession:
             frmt_json[self.ACCESSION_SCHEMA] = self.accession
 
         return frmt_json
@@ -716,41 +859,47 @@ class YAMLReferenceGenome(YAMLTemplate):
     """Class to work with YAML documents representing ReferenceGenome objects.
     """
 
+    SCHEMA = yaml_reference_genome_schema
+    FIELDS = schema_fields(SCHEMA)
+    ALIAS_TYPE = YAMLTemplate.REFERENCEGENOME_TYPE_SCHEMA
+    __slots__ = schema_fields(SCHEMA, exclude=YAMLTemplate.COMMON_FIELDS)
+
     def __init__(self, data):
         """Constructor method.
         """
-        super().__init__(data, yaml_reference_genome_schema)
+        super().__init__(data, self.SCHEMA)
         # validate data with schema
         self._validate()
         # load attributes
-        for key, val in data.items():
-            setattr(self, key, val)
+        self._load(data)
 
     def to_json(
                self,
                submission_centers, # alias list
-               consortia # alias list
+               consortia, # alias list
+               alias_prefix=None
                ):
         """Function to build the corresponding object in JSON format.
+        alias_prefix is created from consortia if not specified.
         """
         gen_json = {}
 
         # common metadata
         gen_json[self.IDENTIFIER_SCHEMA] = self.name
-        gen_json[self.ALIASES_SCHEMA] = [f'{self._string_consortia(consortia)}:{self.REFERENCEGENOME_TYPE_SCHEMA}-{self.name}_{self.version}']
+        gen_json[self.ALIASES_SCHEMA] = [f'{alias_prefix or self.alias_prefix(consortia)}{self.name}_{self.version}']
         gen_json[self.SUBMISSION_CENTERS_SCHEMA] = submission_centers
         gen_json[self.CONSORTIA_SCHEMA] = consortia
         gen_json[self.TITLE_SCHEMA] = self._link_title(self.name, self.version)
         gen_json[self.CODE_SCHEMA] = self.code
 
         # uuid, accession if specified
-        if getattr(self, self.UUID_SCHEMA, None):
+        if self.uuid:
             gen_json[self.UUID_SCHEMA] = self.uuid
-        if getattr(self, self.ACCESSION_SCHEMA, None):
+        if self.accession:
             gen_json[self.ACCESSION_SCHEMA] = self.accession
 
         # check linked files
-        if getattr(self, self.FILES_SCHEMA, None):
+        if self.files:
             gen_json[self.FILES_SCHEMA] = []
             for file in self.files:
                 gen_json[self.FILES_SCHEMA].append(
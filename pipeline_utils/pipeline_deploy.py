@@ -9,14 +9,30 @@
 ################################################
 
 import os, sys, subprocess
+import cProfile
+import re
+import time
 import shutil
 import json
 import glob
+import hashlib
+import yaml
 import boto3
 import structlog
+import threading
+from functools import partial
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
 from dcicutils import ff_utils, s3_utils
 from dcicutils.codebuild_utils import CodeBuildUtils
 from pipeline_utils.lib import yaml_parser
+from pipeline_utils.lib import docker_utils
+from pipeline_utils.lib import portal_objects
+from pipeline_utils.lib import profiler
+from pipeline_utils.lib import metrics
+from pipeline_utils.lib import tracer
+from pipeline_utils.lib import bundle
 
 
 ###############################################################
@@ -49,6 +65,27 @@ from pipeline_utils.lib import yaml_parser
 logger = structlog.getLogger(__name__)
 
 
+###############################################################
+#   Variables
+###############################################################
+# name of the manifest object stored with the description files
+#   under <pipeline>/<version>/, maps file names to content hashes
+WFL_MANIFEST = '.manifest.json'
+# references to other description files,
+#   import statements for .wdl and run or $import fields for .cwl
+WFL_IMPORT_RE = {
+    '.wdl': re.compile(r'^\s*import\s+["\']([^"\']+)["\']', re.MULTILINE),
+    '.cwl': re.compile(r'^\s*-?\s*(?:run|\$import):\s*["\']?([^\s"\'#]+\.cwl)', re.MULTILINE)
+}
+# maximum number of ids for a single CodeBuild batch_get_builds request
+BATCH_GET_BUILDS_SIZE = 100
+# characters not allowed in the identifiers of a CodeBuild build graph
+BATCH_IDENTIFIER_RE = re.compile(r'\W')
+# boto3 default session is not thread safe,
+#   clients are created one at a time when running phases concurrently
+BOTO3_LOCK = threading.Lock()
+
+
 ###############################################################
 #   PostPatchRepo, class definition
 ###############################################################
@@ -56,7 +93,7 @@ class PostPatchRepo(object):
     """Class to handle deployment of pipeline components.
     """
 
-    def __init__(self, args, repo, version_file='VERSION', pipeline_file='PIPELINE', version=None):
+    def __init__(self, args, repo, version_file='VERSION', pipeline_file='PIPELINE', version=None, profiler=None, metrics=None, tracer=None, bundle=None):
         """Constructor method.
 
             :param args: Command line arguments
@@ -69,19 +106,24 @@ class PostPatchRepo(object):
             :type pipeline_file: str
             :param version: Pipeline version to use
             :type version: str
+            :param profiler: Profiler to record the times for phases and stages
+            :type profiler: pipeline_utils.lib.profiler.Profiler
+            :param metrics: Metrics to count the objects and record the latencies for network calls
+            :type metrics: pipeline_utils.lib.metrics.Metrics
+            :param tracer: Tracer to record the spans for phases, objects and network calls
+            :type tracer: pipeline_utils.lib.tracer.Tracer
+            :param bundle: Bundle to write the JSON objects to, instead of POST|PATCH
+            :type bundle: pipeline_utils.lib.bundle.BundleWriter
         """
         # Init attributes
         self.ff_key = None
         self.kms_key_id = None
         self.repo = repo
-        self.object_ = {
-            'Software': yaml_parser.YAMLSoftware,
-            'FileFormat': yaml_parser.YAMLFileFormat,
-            'ReferenceFile': yaml_parser.YAMLReferenceFile,
-            'ReferenceGenome': yaml_parser.YAMLReferenceGenome,
-            'Workflow': yaml_parser.YAMLWorkflow,
-            'MetaWorkflow': yaml_parser.YAMLMetaWorkflow
-        }
+        self._profiler = profiler
+        self._metrics = metrics
+        self._tracer = tracer
+        self._bundle = bundle
+        self.object_ = dict(portal_objects.YAML_CLASSES)
         self.filepath = {
             # .yaml files
             'Software': 'portal_objects/software.yaml',
@@ -135,6 +177,33 @@ class PostPatchRepo(object):
         # Get encryption key
         self.kms_key_id = os.environ.get('S3_ENCRYPT_KEY_ID', None)
 
+    @contextmanager
+    def _stage(self, name, kind='stage', bytes_sent=0, **args):
+        """Helper to time a phase, an object or a stage of the deploy,
+        for the profiler, the latency metrics and the tracer if set.
+        args are added to the span for the tracer.
+        """
+        span_ = nullcontext()
+        if self._tracer is not None:
+            span_ = self._tracer.span(name, kind, **args)
+        start_ = time.perf_counter()
+        try:
+            with span_:
+                yield
+        finally:
+            seconds_ = time.perf_counter() - start_
+            if self._profiler is not None and kind != 'object':
+                self._profiler.record(kind, name, seconds_)
+            if self._metrics is not None and kind == 'stage' and name in metrics.LATENCY_STAGES:
+                self._metrics.observe(name, seconds_, bytes_sent)
+
+    def _count(self, type, outcome):
+        """Helper to count an object of type by outcome,
+        if metrics are set.
+        """
+        if self._metrics is not None:
+            self._metrics.count(type, outcome)
+
     def _post_patch_json(self, data_json, type):
         """Helper to POST|PATCH JSON object.
         """
@@ -142,10 +211,20 @@ class PostPatchRepo(object):
         #   else use the alias
         uuid = data_json.get('uuid', data_json['aliases'][0])
 
+        # Export to bundle instead of POST|PATCH
+        if self._bundle is not None:
+            self._bundle.write(self.pipeline, type, data_json)
+            self._count(type, 'exported')
+            logger.info('> Exported %s' % data_json['aliases'][0])
+            if self.verbose:
+                logger.info(json.dumps(data_json, sort_keys=True, indent=2))
+            return
+
         if not self.debug:
             is_patch = True
             try:
-                ff_utils.get_metadata(uuid, key=self.ff_key)
+                with self._stage('portal_get', uuid=uuid):
+                    ff_utils.get_metadata(uuid, key=self.ff_key)
             except Exception:
                 is_patch = False
 
@@ -174,44 +253,85 @@ class PostPatchRepo(object):
             ###########################################################
 
             try:
-                if is_patch:
-                    ff_utils.patch_metadata(data_json, uuid, key=self.ff_key)
-                else:
-                    ff_utils.post_metadata(data_json, type, key=self.ff_key)
+                with self._stage('portal_write', bytes_sent=len(json.dumps(data_json)), uuid=uuid):
+                    if is_patch:
+                        ff_utils.patch_metadata(data_json, uuid, key=self.ff_key)
+                    else:
+                        ff_utils.post_metadata(data_json, type, key=self.ff_key)
             except Exception as E:
                 # this will exit and report errors during patching and posting
+                self._count(type, 'failed')
                 logger.info('> FAILED PORTAL VALIDATION')
                 logger.info(E)
                 sys.exit('\nExiting...')
 
+            self._count(type, 'patched' if is_patch else 'created')
             logger.info('> Posted %s' % data_json['aliases'][0])
+        else:
+            self._count(type, 'skipped')
 
         if self.verbose:
             logger.info(json.dumps(data_json, sort_keys=True, indent=2))
 
     def _yaml_to_json(self, data_yaml, YAMLClass, **kwargs):
-        """Helper to validate YAML object and convert to JSON.
+        """Helper to validate YAML object and convert to JSON,
+        errors are logged.
         """
-        if self.validate:
-            logger.info('> Validating %s' % data_yaml.get('name'))
-            try:
-                YAMLClass(data_yaml).to_json(**kwargs)
-            except yaml_parser.ValidationError as e:
-                # log errors
-                for error in e.errors:
-                    logger.error('- ValidationError [{0}]: {1} in path={2}, schema={3}'.format(
-                                    error.validator,
-                                    error.message,
-                                    error.relative_path,
-                                    error.schema
-                                    )
+        logger.info('> Validating %s' % data_yaml.get('name'))
+        try:
+            with self._stage('validate'):
+                object_ = YAMLClass(data_yaml)
+            with self._stage('to_json'):
+                return object_.to_json(**kwargs)
+        except yaml_parser.ValidationError as e:
+            # log errors
+            for error in e.errors:
+                logger.error('- ValidationError [{0}]: {1} in path={2}, schema={3}'.format(
+                                error.validator,
+                                error.message,
+                                error.relative_path,
+                                error.schema
                                 )
-        else:
-            logger.info('> Processing %s' % data_yaml.get('name'))
-            return YAMLClass(data_yaml).to_json(**kwargs)
+                            )
 
         return
 
+    def _timed(self, name, iterable):
+        """Helper to time the creation of each item of iterable as a stage.
+        """
+        iterator_ = iter(iterable)
+        while True:
+            with self._stage(name):
+                item_ = next(iterator_, None)
+            if item_ is None:
+                return
+            yield item_
+
+    def _post_patch_documents(self, documents, type, **kwargs):
+        """Helper to create JSON objects from YAML documents of type and POST|PATCH them.
+        All the documents are validated before any object is created,
+        and converted with to_json_many, that shares the prefix for the aliases.
+        When validating every document is checked to report all the errors.
+        """
+        YAMLClass = self.object_[type]
+        if self.validate:
+            for d in documents:
+                with self._stage(d.get('name'), kind='object', type=type):
+                    self._yaml_to_json(d, YAMLClass, **kwargs)
+            return
+
+        objects_ = []
+        for d in documents:
+            logger.info('> Processing %s' % d.get('name'))
+            with self._stage('validate'):
+                objects_.append(YAMLClass(d))
+        # creating JSON objects
+        jsons_ = self._timed('to_json', YAMLClass.to_json_many(objects_, **kwargs))
+        for d, d_ in zip(documents, jsons_):
+            with self._stage(d.get('name'), kind='object', type=type):
+                # post/patch object
+                self._post_patch_json(d_, type)
+
     def _post_patch_file(self, type):
         """
             'Software', 'FileFormat', 'ReferenceFile', 'ReferenceGenome'
@@ -232,15 +352,13 @@ class PostPatchRepo(object):
                 return
 
         # Read YAML file and create JSON objects from documents in file
-        for d in yaml_parser.load_yaml(filepath_):
-            # creating JSON object
-            d_ = self._yaml_to_json(
-                        d, self.object_[type],
-                        submission_centers=self.submission_centers,
-                        consortia=self.consortia
-                        )
-            # post/patch object
-            if d_: self._post_patch_json(d_, type)
+        with self._stage('load', file=filepath_):
+            documents_ = list(yaml_parser.load_yaml(filepath_))
+        self._post_patch_documents(
+                    documents_, type,
+                    submission_centers=self.submission_centers,
+                    consortia=self.consortia
+                    )
 
 
     def _post_patch_folder(self, type):
@@ -258,28 +376,109 @@ class PostPatchRepo(object):
             return
 
         # Create JSON objects
+        # creating to_json **kwargs
+        kwargs_ = {
+            'version': self.version,
+            'submission_centers': self.submission_centers,
+            'consortia': self.consortia
+        }
+        if type == 'Workflow':
+            kwargs_.setdefault(
+                'wflbucket_url', f's3://{self.wfl_bucket}/{self.pipeline}/{self.version}'
+            )
+
         files_ = glob.glob(f'{filepath_}/*.yaml')
         files_.extend(glob.glob(f'{filepath_}/*.yml'))
+        for fn in files_:
+            with self._stage('load', file=fn):
+                documents_ = list(yaml_parser.load_yaml(fn))
+            self._post_patch_documents(documents_, type, **kwargs_)
+
+    def _post_patch_bundle(self, types, type='Bundle'):
+        """Helper to POST|PATCH the JSON objects of types from the bundle,
+        in the order they were exported.
+        Only objects exported for the same pipeline are deployed.
+        """
+        logger.info(f'@ {type}...')
+
+        try:
+            for entry_ in bundle.read_bundle(self.from_bundle):
+                if entry_['pipeline'] != self.pipeline or entry_['type'] not in types:
+                    continue
+                with self._stage(entry_['alias'], kind='object', type=entry_['type']):
+                    self._post_patch_json(entry_['object'], entry_['type'])
+        except ValueError as E:
+            logger.info('> FAILED BUNDLE VALIDATION')
+            logger.info(E)
+            sys.exit('\nExiting...')
+
+    def _render_wfl(self, file_, upload_file_, account_):
+        """Helper to create the modified description file for upload.
+        Return the sha256 hash of the rendered content.
+        """
+        sha256 = hashlib.sha256()
+        with open(file_, 'r') as read_:
+            with open(upload_file_, 'w') as write_:
+                # replace generic variables
+                for line in read_:
+                    line = line.replace('ACCOUNT', account_)
+                    line = line.replace('VERSION', self.version)
+                    if self.sentieon_server:
+                        line = line.replace('LICENSEID', self.sentieon_server)
+                    write_.write(line)
+                    sha256.update(line.encode())
+        return sha256.hexdigest()
+
+    def _get_wfl_manifest(self, s3_client, manifest_key_):
+        """Helper to read the manifest of description files
+        already uploaded for the pipeline version.
+        Return an empty manifest if not found.
+        """
+        try:
+            response = s3_client.get_object(Bucket=self.wfl_bucket, Key=manifest_key_)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ['NoSuchKey', '404']:
+                return {}
+            raise
+        return json.loads(response['Body'].read()).get('files', {})
+
+    def _wfl_closure(self, filepath_, type='Workflow'):
+        """Helper to collect the description files needed by the Workflow objects.
+        Start from runner main and child files and follow the references
+        to other description files found in the files.
+        Return None if no Workflow object is found.
+        """
+        workflows_ = f'{self.repo}/{self.filepath[type]}'
+        if not os.path.isdir(workflows_):
+            return None
+
+        # Get runner files
+        queue = []
+        files_ = glob.glob(f'{workflows_}/*.yaml')
+        files_.extend(glob.glob(f'{workflows_}/*.yml'))
         for fn in files_:
             for d in yaml_parser.load_yaml(fn):
-                # creating _yaml_to_json **kwargs
-                kwargs_ = {
-                    'version': self.version,
-                    'submission_centers': self.submission_centers,
-                    'consortia': self.consortia
-                }
-                if type == 'Workflow':
-                    kwargs_.setdefault(
-                        'wflbucket_url', f's3://{self.wfl_bucket}/{self.pipeline}/{self.version}'
-                    )
-                # creating JSON object
-                d_ = self._yaml_to_json(
-                            d, self.object_[type],
-                            **kwargs_
-                            )
-                # post/patch object
-                if d_:
-                    self._post_patch_json(d_, type)
+                runner = (d or {}).get('runner') or {}
+                if runner.get('main'):
+                    queue.append(runner['main'])
+                queue.extend(runner.get('child', []))
+        if not queue:
+            return None
+
+        # Follow references
+        closure = set()
+        while queue:
+            fn = queue.pop(0)
+            if fn in closure:
+                continue
+            closure.add(fn)
+            file_ = f'{filepath_}/{fn}'
+            import_re = WFL_IMPORT_RE.get(os.path.splitext(fn)[1])
+            if import_re and os.path.isfile(file_):
+                with open(file_) as read_:
+                    queue.extend(map(os.path.basename, import_re.findall(read_.read())))
+
+        return closure
 
     def _post_patch_wfl(self, type='WFL'):
         """
@@ -290,6 +489,7 @@ class PostPatchRepo(object):
         filepath_ = f'{self.repo}/{self.filepath[type]}'
         upload_ = f'{filepath_}/upload'
         account_ = f'{self.account}.dkr.ecr.{self.region}.amazonaws.com'
+        manifest_key_ = f'{self.pipeline}/{self.version}/{WFL_MANIFEST}'
         auth_keys_ = {
             'ServerSideEncryption': 'aws:kms',
             'SSEKMSKeyId': self.kms_key_id
@@ -301,47 +501,383 @@ class PostPatchRepo(object):
             return
 
         # Create s3 object
-        s3 = boto3.resource('s3')
+        with BOTO3_LOCK:
+            s3 = boto3.resource('s3')
 
         # Make tmp dir for upload
         if os.path.isdir(upload_):
             shutil.rmtree(upload_)
         os.mkdir(upload_)
 
+        # Get hashes of files already uploaded for this version,
+        #   a single request that allows to skip unchanged files
+        manifest, is_updated = {}, False
+        if not self.debug and not self.force_wfl:
+            manifest = self._get_wfl_manifest(s3.meta.client, manifest_key_)
+
         # Read description files and create modified files for upload
         #   placeholder variables will be replaced
         #   with specific values for the target environment
         files_ = glob.glob(f'{filepath_}/*.cwl')
         files_.extend(glob.glob(f'{filepath_}/*.wdl'))
-        for fn in map(os.path.basename, files_):
-            logger.info('> Processing %s' % fn)
-            # set file specific variables
-            file_ = f'{filepath_}/{fn}'
-            upload_file_ = f'{upload_}/{fn}'
-            s3_file_ = f'{self.pipeline}/{self.version}/{fn}'
-            if not self.debug:
-                # create modified description file for upload
-                with open(file_, 'r') as read_:
-                    with open(upload_file_, 'w') as write_:
-                        # replace generic variables
-                        for line in read_:
-                            line = line.replace('ACCOUNT', account_)
-                            line = line.replace('VERSION', self.version)
-                            if self.sentieon_server:
-                                line = line.replace('LICENSEID', self.sentieon_server)
-                            write_.write(line)
-                # upload to s3
-                if self.kms_key_id:
-                    s3.meta.client.upload_file(upload_file_, self.wfl_bucket, s3_file_, ExtraArgs=auth_keys_)
-                else: # no kms_key_id, ExtraArgs not needed
-                    s3.meta.client.upload_file(upload_file_, self.wfl_bucket, s3_file_)
-                logger.info('> Posted %s' % s3_file_)
-                # delete file to allow tmp folder to be deleted at the end
-                os.remove(upload_file_)
+        files_ = set(map(os.path.basename, files_))
+
+        # Only upload files needed by the Workflow objects
+        closure = self._wfl_closure(filepath_)
+        if closure is None:
+            logger.error(f'WARNING: no Workflow objects found in {self.repo}, uploading all description files...')
+        else:
+            for fn in sorted(closure - files_):
+                logger.error(f'WARNING: {fn} is used by Workflow objects but not found in {self.filepath[type]}')
+            for fn in sorted(files_ - closure):
+                logger.error(f'WARNING: {fn} is not used by any Workflow object, skipping...')
+            files_ &= closure
+
+        for fn in sorted(files_):
+            with self._stage(fn, kind='object', type=type):
+                logger.info('> Processing %s' % fn)
+                # set file specific variables
+                file_ = f'{filepath_}/{fn}'
+                upload_file_ = f'{upload_}/{fn}'
+                s3_file_ = f'{self.pipeline}/{self.version}/{fn}'
+                if not self.debug:
+                    # create modified description file for upload
+                    sha256_ = self._render_wfl(file_, upload_file_, account_)
+                    # skip if identical to the file already uploaded
+                    if manifest.get(fn) == sha256_:
+                        self._count(type, 'skipped')
+                        logger.info('> Skipped %s, unchanged' % s3_file_)
+                    else:
+                        # upload to s3
+                        extra_args_ = {'Metadata': {'sha256': sha256_}}
+                        if self.kms_key_id:
+                            extra_args_.update(auth_keys_)
+                        with self._stage('upload', bytes_sent=os.path.getsize(upload_file_), key=s3_file_):
+                            s3.meta.client.upload_file(upload_file_, self.wfl_bucket, s3_file_, ExtraArgs=extra_args_)
+                        manifest[fn] = sha256_
+                        is_updated = True
+                        self._count(type, 'uploaded')
+                        logger.info('> Posted %s' % s3_file_)
+                    # delete file to allow tmp folder to be deleted at the end
+                    os.remove(upload_file_)
+
+        # Update manifest with the hashes of uploaded files
+        if is_updated:
+            put_args_ = {}
+            if self.kms_key_id:
+                put_args_.update(auth_keys_)
+            body_ = json.dumps({'files': manifest}, sort_keys=True, indent=2)
+            with self._stage('upload', bytes_sent=len(body_), key=manifest_key_):
+                s3.meta.client.put_object(
+                    Bucket=self.wfl_bucket,
+                    Key=manifest_key_,
+                    Body=body_,
+                    **put_args_
+                    )
 
         # Clean tmp directory
         os.rmdir(upload_)
 
+    def _ecr_repositories(self, ecr):
+        """Helper to get the names of the ECR repositories in the account.
+        """
+        repositories = set()
+        for page in ecr.get_paginator('describe_repositories').paginate():
+            for repository in page['repositories']:
+                repositories.add(repository['repositoryName'])
+        return repositories
+
+    def _get_builder(self):
+        """Helper to get the CodeBuild project to use to build the images.
+        Return None if the project is not found.
+        """
+        if self.builder:
+            builder_ = self.builder
+        else:
+            builder_ = f'{self.ff_env}-pipeline-builder'
+        response = self._codebuild.client.batch_get_projects(names=[builder_])
+        if not response.get('projects'):
+            return None
+        return response['projects'][0]
+
+    def _start_builds(self, builder, builds_):
+        """Helper to start CodeBuild runs concurrently.
+        Return a dictionary mapping the build ids to the images.
+
+            :param builder: Name of the CodeBuild project
+            :type builder: str
+            :param builds_: Environment variables overrides for each image
+            :type builds_: dict
+        """
+        def _start_build(fn):
+            with self._stage('build', image=fn):
+                response = self._codebuild.run_project_build_with_overrides(
+                    project_name=builder,
+                    branch=self.branch, # this is the branch to use
+                    env_overrides=builds_[fn]
+                )
+            logger.info('> Started build %s' % fn)
+            return response['build']['id']
+
+        with ThreadPoolExecutor() as executor:
+            build_ids = list(executor.map(_start_build, builds_))
+
+        return dict(zip(build_ids, builds_))
+
+    def _wait_builds(self, build_ids):
+        """Helper to wait for CodeBuild runs to complete.
+        Poll the status of the runs in batches, log progress and
+        a summary of the runs.
+        Return a dictionary mapping the images to the final build status.
+
+            :param build_ids: Dictionary mapping the build ids to the images
+            :type build_ids: dict
+        """
+        logger.info('@ Waiting for Docker Image builds...')
+
+        pending_, status_, completed_ = list(build_ids), {}, {}
+        while pending_:
+            # batch_get_builds accepts up to 100 ids
+            builds = []
+            for i in range(0, len(pending_), BATCH_GET_BUILDS_SIZE):
+                response = self._codebuild.client.batch_get_builds(ids=pending_[i:i + BATCH_GET_BUILDS_SIZE])
+                builds.extend(response['builds'])
+            # log changes in status
+            for build in builds:
+                fn = build_ids[build['id']]
+                state = (build.get('currentPhase'), build['buildStatus'])
+                if status_.get(fn) != state:
+                    status_[fn] = state
+                    logger.info('> %s %s [%s]' % (fn, *state))
+                if build['buildStatus'] != 'IN_PROGRESS':
+                    completed_[fn] = build
+                    pending_.remove(build['id'])
+            if pending_:
+                time.sleep(self.build_poll_interval)
+
+        return self._summary_builds(completed_)
+
+    def _summary_builds(self, completed_):
+        """Helper to log a summary of completed CodeBuild runs.
+        Return a dictionary mapping the images to the final build status.
+
+            :param completed_: Dictionary mapping the images to the builds
+            :type completed_: dict
+        """
+        logger.info('@ Docker Image builds summary...')
+        status_ = {}
+        for fn in sorted(completed_):
+            build = completed_[fn]
+            if build.get('endTime'):
+                duration = (build['endTime'] - build['startTime']).total_seconds()
+                logger.info('> %s %s in %.1fs' % (fn, build['buildStatus'], duration))
+            else: # never started
+                logger.info('> %s %s' % (fn, build['buildStatus']))
+            status_[fn] = build['buildStatus']
+
+        return status_
+
+    def _build_batch_spec(self, builder, builds_, graph):
+        """Helper to create the batch buildspec to build all images
+        with a single CodeBuild batch build.
+        Each image is a build in the build graph,
+        depending on the builds for its base images.
+
+            :param builder: CodeBuild project
+            :type builder: dict
+            :param builds_: Environment variables overrides for each image
+            :type builds_: dict
+            :param graph: Dictionary mapping each image to the images it depends on
+            :type graph: dict
+        """
+        # Use the project buildspec for the builds,
+        #   extend it with the batch configuration if inline,
+        #   else point the builds to the buildspec file
+        buildspec_ = builder.get('source', {}).get('buildspec') or 'buildspec.yml'
+        try:
+            spec = yaml.safe_load(buildspec_)
+        except yaml.YAMLError:
+            spec = None
+        if isinstance(spec, dict):
+            buildspec_ = None
+        else:
+            spec = {'version': 0.2}
+
+        build_graph = []
+        for fn, env in builds_.items():
+            build_ = {
+                'identifier': BATCH_IDENTIFIER_RE.sub('_', fn),
+                'env': {'variables': env}
+            }
+            if buildspec_:
+                build_['buildspec'] = buildspec_
+            depend_on_ = sorted(BATCH_IDENTIFIER_RE.sub('_', b) for b in graph[fn] if b in builds_)
+            if depend_on_:
+                build_['depend-on'] = depend_on_
+            build_graph.append(build_)
+
+        spec['batch'] = {'fast-fail': False, 'build-graph': build_graph}
+        return yaml.safe_dump(spec, sort_keys=False)
+
+    def _start_build_batch(self, builder, builds_, graph):
+        """Helper to start a single CodeBuild batch build for all images.
+        Return the batch build id.
+        """
+        with self._stage('build', images=list(builds_)):
+            response = self._codebuild.client.start_build_batch(
+                projectName=builder['name'],
+                sourceVersion=self.branch, # this is the branch to use
+                buildspecOverride=self._build_batch_spec(builder, builds_, graph)
+            )
+        logger.info('> Started batch build %s' % ', '.join(builds_))
+        return response['buildBatch']['id']
+
+    def _wait_build_batch(self, batch_id, builds_):
+        """Helper to wait for a CodeBuild batch build to complete.
+        Poll the status of the batch, log progress for each image and
+        a summary of the builds.
+        Return a dictionary mapping the images to the final build status.
+        """
+        logger.info('@ Waiting for Docker Image batch build...')
+
+        identifiers_ = {BATCH_IDENTIFIER_RE.sub('_', fn): fn for fn in builds_}
+        status_ = {}
+        while True:
+            batch = self._codebuild.client.batch_get_build_batches(ids=[batch_id])['buildBatches'][0]
+            # log changes in status
+            for group in batch.get('buildGroups', []):
+                fn = identifiers_.get(group['identifier'])
+                if not fn or not group.get('currentBuildSummary'):
+                    continue
+                state = group['currentBuildSummary']['buildStatus']
+                if status_.get(fn) != state:
+                    status_[fn] = state
+                    logger.info('> %s [%s]' % (fn, state))
+            if batch['buildBatchStatus'] != 'IN_PROGRESS':
+                break
+            time.sleep(self.build_poll_interval)
+
+        # Get the builds for the images
+        completed_ = {fn: {'buildStatus': 'NOT_STARTED'} for fn in builds_}
+        build_ids = {}
+        for group in batch.get('buildGroups', []):
+            fn = identifiers_.get(group['identifier'])
+            if fn and group.get('currentBuildSummary'):
+                build_ids[group['currentBuildSummary']['arn'].split('/')[-1]] = fn
+        ids_ = list(build_ids)
+        for i in range(0, len(ids_), BATCH_GET_BUILDS_SIZE):
+            response = self._codebuild.client.batch_get_builds(ids=ids_[i:i + BATCH_GET_BUILDS_SIZE])
+            for build in response['builds']:
+                completed_[build_ids[build['id']]] = build
+
+        return self._summary_builds(completed_)
+
+    def _cache_image(self, ecr, fn, account_):
+        """Helper to get the image to use as cache for a local build.
+        Use cache_from_version if set, else the most recent image
+        in ECR repository fn that is not tagged with the current version.
+        Return None if no image is found.
+        """
+        if self.cache_from_version:
+            return f'{account_}/{fn}:{self.cache_from_version}'
+
+        latest_ = None
+        for page in ecr.get_paginator('describe_images').paginate(repositoryName=fn, filter={'tagStatus': 'TAGGED'}):
+            for image in page['imageDetails']:
+                if self.version in image['imageTags']:
+                    continue
+                if not latest_ or image['imagePushedAt'] > latest_['imagePushedAt']:
+                    latest_ = image
+        if not latest_:
+            return None
+
+        # prefer version tags over build context tags
+        tags_ = sorted(latest_['imageTags'], key=lambda t: t.startswith(docker_utils.CONTEXT_TAG_PREFIX))
+        return f'{account_}/{fn}:{tags_[0]}'
+
+    def _run_prefixed(self, prefix, command):
+        """Helper to run a shell command logging each line of output with prefix.
+        Return the exit code of the command.
+        """
+        process = subprocess.Popen(command, shell=True, text=True,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        for line in process.stdout:
+            logger.info('[%s] %s' % (prefix, line.rstrip()))
+        return process.wait()
+
+    def _local_builds(self, local_builds_, waves):
+        """Helper to run local builds for images in dependency order.
+        Images in the same wave are built concurrently, up to build_jobs at a time,
+        images in the next wave are built after the images in the previous waves are pushed.
+        Exit if any build failed.
+
+            :param local_builds_: Build commands for each image
+            :type local_builds_: dict
+            :param waves: Images grouped in waves, from docker_utils.build_waves
+            :type waves: list(list(str))
+        """
+        def _local_build(fn):
+            with self._stage('local_build', image=fn):
+                return self._run_prefixed(fn, local_builds_[fn])
+
+        for wave in waves:
+            wave_ = [fn for fn in wave if fn in local_builds_]
+            if not wave_:
+                continue
+            logger.info('> Building %s' % ', '.join(wave_))
+            with ThreadPoolExecutor(self.build_jobs) as executor:
+                returncodes = list(executor.map(_local_build, wave_))
+            failed_ = [fn for fn, returncode in zip(wave_, returncodes) if returncode]
+            for fn in wave_:
+                self._count('ECR', 'failed' if fn in failed_ else 'built')
+            if failed_:
+                logger.info('> FAILED BUILD %s' % ', '.join(failed_))
+                sys.exit('\nExiting...')
+
+    def _branch_matches_tree(self, path):
+        """Helper to check that the build contexts in path, relative to the repository,
+        are the same in the local tree and in the branch built by CodeBuild,
+        origin/<branch> if available else <branch>.
+        Return False if the repository is not a git repository, the branch is missing,
+        or the files differ, including uncommitted and untracked files.
+        """
+        def _git(*args):
+            return subprocess.run(['git', '-C', self.repo] + list(args),
+                                  stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+
+        for ref in (f'origin/{self.branch}', self.branch):
+            if _git('rev-parse', '--verify', '--quiet', f'{ref}^{{commit}}').returncode == 0:
+                break
+        else:
+            return False
+        # tracked files that differ from the branch
+        if _git('diff', '--quiet', ref, '--', path).returncode != 0:
+            return False
+        # untracked files, including ignored, are in the local build context only
+        untracked_ = _git('ls-files', '--others', '--', path)
+        return untracked_.returncode == 0 and not untracked_.stdout.strip()
+
+    def _retag_image(self, ecr, fn, source_tag, target_tag):
+        """Helper to add target_tag to the image tagged as source_tag in ECR repository fn.
+        Return True if the image is found, else False.
+        """
+        response = ecr.batch_get_image(repositoryName=fn, imageIds=[{'imageTag': source_tag}])
+        if not response['images']:
+            return False
+        image = response['images'][0]
+        try:
+            ecr.put_image(
+                repositoryName=fn,
+                imageManifest=image['imageManifest'],
+                imageManifestMediaType=image.get('imageManifestMediaType', ''),
+                imageTag=target_tag
+            )
+        except ClientError as e:
+            # the image already has the tag
+            if e.response['Error']['Code'] != 'ImageAlreadyExistsException':
+                raise
+        return True
+
     def _post_patch_ecr(self, type='ECR'):
         """
         """
@@ -356,91 +892,225 @@ class PostPatchRepo(object):
             logger.error(f'WARNING: {self.filepath[type]} not found in {self.repo}, skipping...')
             return
 
-        # Create ecr object
-        ecr = boto3.client('ecr')
-        response = ecr.describe_repositories()
+        # Get images, each folder is the build context for an image,
+        #   and sort them so that images are processed after their base images
+        graph = docker_utils.build_graph(filepath_)
+        try:
+            waves = docker_utils.build_waves(graph)
+        except ValueError as e:
+            logger.info('> FAILED BUILD PLAN')
+            logger.info(e)
+            sys.exit('\nExiting...')
+        images_ = [fn for wave in waves for fn in wave]
 
-        # Generic bash commands to be modified to correct version and account information
-        for fn in map(os.path.basename, glob.glob(f'{filepath_}/*')):
-            logger.info('> Processing %s' % fn)
-            if not self.debug:
-                # set specific variables
-                tag_ = f'{account_}/{fn}:{self.version}'
-                path_ = f'{filepath_}/{fn}'
-                is_repository = False
-                # check if tag is present in ECR repositories,
-                #   if not create it
-                for repository in response['repositories']:
-                    if repository['repositoryArn'].split('/')[-1] == fn:
-                        is_repository = True
-                        break
-                if not is_repository:
-                    logger.info('> Creating ECR Repository %s' % fn)
-                    ecr.create_repository(repositoryName=fn)
-                # build and push the image
-                #   do so by local build or triggering a CodeBuild run
-                build_projects = self._codebuild.list_projects()
-                if self.builder:
-                    builder_ = self.builder
-                else:
-                    builder_ = f'{self.ff_env}-pipeline-builder'
-                builder = list(filter(lambda b: builder_ == b, build_projects))
-                if self.local_build:
-                    # TODO
-                    #   enable amd/arm build
-                    image = f"""
-                            aws ecr get-login-password --region {self.region} | docker login --username AWS --password-stdin {account_}
-                            docker build -t {tag_} {path_} --no-cache
-                            docker push {tag_}
-                        """ # note that we are ALWAYS doing no-cache builds so that we can get updated base images whenever applicable
-                    subprocess.check_call(image, shell=True)
-                elif not builder:
+        if not self.debug:
+            # Create ecr object
+            with BOTO3_LOCK:
+                ecr = boto3.client('ecr')
+
+            # Check if images are present in ECR repositories,
+            #   create the missing ones
+            missing_ = sorted(set(images_) - self._ecr_repositories(ecr))
+            for fn in missing_:
+                logger.info('> Creating ECR Repository %s' % fn)
+            with ThreadPoolExecutor() as executor:
+                list(executor.map(lambda fn: ecr.create_repository(repositoryName=fn), missing_))
+
+            # Get builder
+            if not self.local_build:
+                builder = self._get_builder()
+                if not builder:
                     logger.error('NOTE: no builder job found in Build projects!')
-                else:
-                    self._codebuild.run_project_build_with_overrides(
-                        project_name=builder[0], # there should only be one
-                        branch=self.branch, # this is the branch to use
-                        env_overrides={
+                    return
+
+        # Build contexts are hashed from the local tree,
+        #   CodeBuild builds the branch, use the hashes only if the trees are the same
+        use_context_ = self.local_build or (not self.debug and self._branch_matches_tree(self.filepath[type]))
+        if not self.debug and not use_context_:
+            logger.info(f'NOTE: {self.filepath[type]} in the local tree differs from branch {self.branch}, '
+                        'images are built without looking up or recording the build context')
+
+        # Generic bash commands to be modified to correct version and account information
+        builds_, local_builds_, context_tags_ = {}, {}, {}
+        for fn in images_:
+            with self._stage(fn, kind='object', type=type):
+                logger.info('> Processing %s' % fn)
+                if not self.debug:
+                    # set specific variables
+                    tag_ = f'{account_}/{fn}:{self.version}'
+                    path_ = f'{filepath_}/{fn}'
+                    # check if an image was already built from the same build context,
+                    #   if so tag it with the version instead of building it again
+                    context_tags_[fn] = docker_utils.context_tag(path_, [context_tags_[b] for b in graph[fn]])
+                    if use_context_ and not self.rebuild_images:
+                        if self._retag_image(ecr, fn, context_tags_[fn], self.version):
+                            logger.info('> Build context unchanged, tagged existing image as %s' % tag_)
+                            self._count(type, 'skipped')
+                            continue
+                    # build and push the image
+                    #   do so by local build or triggering a CodeBuild run
+                    if self.local_build:
+                        # TODO
+                        #   enable amd/arm build
+                        context_tag_ = f'{account_}/{fn}:{context_tags_[fn]}'
+                        if self.build_cache:
+                            # reuse unchanged layers from the previous image,
+                            #   --pull still gets updated base images whenever applicable
+                            cache_ = self._cache_image(ecr, fn, account_)
+                            pull_, options_ = '', '--pull --build-arg BUILDKIT_INLINE_CACHE=1'
+                            if cache_:
+                                logger.info('> Using %s as cache' % cache_)
+                                pull_ = f'docker pull {cache_} || true'
+                                options_ += f' --cache-from {cache_}'
+                        else:
+                            # note that by default we are ALWAYS doing no-cache builds
+                            #   so that we can get updated base images whenever applicable
+                            pull_, options_ = '', '--no-cache'
+                        local_builds_[fn] = f"""
+                                set -e
+                                {pull_}
+                                docker build -t {tag_} -t {context_tag_} {path_} {options_}
+                                docker push {tag_}
+                                docker push {context_tag_}
+                            """
+                    else:
+                        builds_[fn] = {
                             'IMAGE_REPO_NAME': fn,
                             'IMAGE_TAG': self.version,
                             'BUILD_PATH': path_
                         }
-                    )
 
-    def run_post_patch(self):
-        """Main function to deploy specified components.
+        # Run local builds
+        if local_builds_:
+            login = f'aws ecr get-login-password --region {self.region} | docker login --username AWS --password-stdin {account_}'
+            subprocess.check_call(login, shell=True)
+            self._local_builds(local_builds_, waves)
+
+        # Trigger CodeBuild runs
+        if builds_:
+            if self.batch_build:
+                batch_id = self._start_build_batch(builder, builds_, graph)
+                if self.wait_builds:
+                    with self._stage('wait_builds'):
+                        status_ = self._wait_build_batch(batch_id, builds_)
+            else:
+                build_ids = self._start_builds(builder['name'], builds_)
+                if self.wait_builds:
+                    with self._stage('wait_builds'):
+                        status_ = self._wait_builds(build_ids)
+            if self.wait_builds:
+                # tag the new images with their build context
+                failed_ = []
+                for fn, status in sorted(status_.items()):
+                    if status == 'SUCCEEDED':
+                        self._count(type, 'built')
+                        if use_context_:
+                            self._retag_image(ecr, fn, self.version, context_tags_[fn])
+                    else:
+                        self._count(type, 'failed')
+                        failed_.append(fn)
+                if failed_:
+                    logger.info('> FAILED BUILD %s' % ', '.join(failed_))
+                    sys.exit('\nExiting...')
+            else:
+                for fn in builds_:
+                    self._count(type, 'triggered')
+                logger.info('NOTE: build context is not recorded for images built without --wait-builds')
+
+    def _phases(self):
+        """Helper to group the components to deploy in independent phases.
+        Portal objects are deployed in a single phase in order,
+        as objects can link to objects of the previous types.
+        Workflow Descriptions and Docker images do not depend on
+        portal objects and are deployed in separate phases.
+
+            :return: Dictionary mapping each phase to the (name, function) to call in order
+            :rtype: dict(str, list(tuple))
         """
+        portal_ = []
         # Software
         if self.post_software:
-            self._post_patch_file('Software')
+            portal_.append(('Software', partial(self._post_patch_file, 'Software')))
 
         # FileFormat
         if self.post_file_format:
-            self._post_patch_file('FileFormat')
+            portal_.append(('FileFormat', partial(self._post_patch_file, 'FileFormat')))
 
         # ReferenceFile
         if self.post_file_reference:
-            self._post_patch_file('ReferenceFile')
+            portal_.append(('ReferenceFile', partial(self._post_patch_file, 'ReferenceFile')))
 
         # ReferenceGenome
         if self.post_reference_genome:
-            self._post_patch_file('ReferenceGenome')
+            portal_.append(('ReferenceGenome', partial(self._post_patch_file, 'ReferenceGenome')))
 
         # Workflow
         if self.post_workflow:
-            self._post_patch_folder('Workflow')
+            portal_.append(('Workflow', partial(self._post_patch_folder, 'Workflow')))
 
         # Metaworkflow
         if self.post_metaworkflow:
-            self._post_patch_folder('MetaWorkflow')
+            portal_.append(('MetaWorkflow', partial(self._post_patch_folder, 'MetaWorkflow')))
+
+        # Replay the portal objects from the bundle,
+        #   instead of converting the YAML files
+        if portal_ and self.from_bundle:
+            portal_ = [('Bundle', partial(self._post_patch_bundle, [name for name, _ in portal_]))]
+
+        phases_ = {}
+        if portal_:
+            phases_['Portal'] = portal_
 
         # Workflow Descriptions
         if self.post_wfl:
-            self._post_patch_wfl()
+            phases_['WFL'] = [('WFL', self._post_patch_wfl)]
 
         # ECR
         if self.post_ecr:
-            self._post_patch_ecr()
+            phases_['ECR'] = [('ECR', self._post_patch_ecr)]
+
+        return phases_
+
+    def _run_phase(self, steps_):
+        """Helper to run the functions of a phase in order.
+        """
+        for name, step in steps_:
+            with self._stage(name, kind='phase'):
+                step()
+
+    def _run_phases(self, phases_):
+        """Helper to run the phases concurrently, one thread for each phase.
+        Wait for all the phases to complete before exiting if any failed.
+        """
+        with ThreadPoolExecutor(len(phases_)) as executor:
+            futures_ = {
+                phase: executor.submit(self._run_phase, steps_) for phase, steps_ in phases_.items()
+            }
+
+        failed_ = []
+        for phase, future in futures_.items():
+            error = future.exception()
+            if error is not None:
+                failed_.append(phase)
+                # SystemExit errors are already reported by the phase
+                if not isinstance(error, SystemExit):
+                    logger.info(f'> FAILED PHASE {phase}')
+                    logger.info(error)
+        if failed_:
+            logger.info('> FAILED PHASES %s' % ', '.join(failed_))
+            sys.exit('\nExiting...')
+
+    def run_post_patch(self):
+        """Main function to deploy specified components.
+        """
+        phases_ = self._phases()
+
+        # Run independent phases at the same time
+        if self.parallel_phases and len(phases_) > 1:
+            self._run_phases(phases_)
+        else:
+            for steps_ in phases_.values():
+                self._run_phase(steps_)
 
 
 ################################################
@@ -461,6 +1131,10 @@ def main(args):
             error = 'MISSING ARGUMENT, --post-wfl | --post-workflow requires --wfl-bucket argument.\n'
             sys.exit(error)
 
+    if args.profile_output and args.parallel_phases:
+        error = 'INCOMPATIBLE ARGUMENTS, --profile-output profiles only the main thread and cannot be used with --parallel-phases.\n'
+        sys.exit(error)
+
     if not args.account:
         if args.post_workflow or args.post_wfl or args.post_ecr:
             error = 'MISSING ARGUMENT, --post-wfl | --post-workflow | --post-ecr requires --account argument.\n'
@@ -476,7 +1150,34 @@ def main(args):
         with open(args.version_file) as f:
             version = f.readlines()[0].strip()
     else: version = None
+    # Profile if flags are set
+    profiler_ = profiler.Profiler() if args.profile else None
+    metrics_ = metrics.Metrics()
+    tracer_ = tracer.Tracer() if args.trace_file else None
+    bundle_ = bundle.BundleWriter(args.export_bundle) if args.export_bundle else None
+    cprofile_ = cProfile.Profile() if args.profile_output else None
+    if cprofile_:
+        cprofile_.enable()
+
     # Run
-    for repo in args.repos:
-        pprepo = PostPatchRepo(args, repo, version=version)
-        pprepo.run_post_patch()
+    try:
+        for repo in args.repos:
+            pprepo = PostPatchRepo(args, repo, version=version, profiler=profiler_, metrics=metrics_, tracer=tracer_, bundle=bundle_)
+            with tracer_.span(repo, 'repo') if tracer_ else nullcontext():
+                pprepo.run_post_patch()
+    finally:
+        if bundle_:
+            bundle_.close()
+            logger.info(f'@ Bundle written to {args.export_bundle}')
+        if cprofile_:
+            cprofile_.disable()
+            cprofile_.dump_stats(args.profile_output)
+            logger.info(f'@ Profile written to {args.profile_output}')
+        if profiler_:
+            logger.info('@ Profile...\n' + profiler_.table())
+        logger.info('@ Summary...\n' + metrics_.table())
+        if args.metrics_json:
+            metrics_.write_json(args.metrics_json)
+        if tracer_:
+            tracer_.write(args.trace_file)
+            logger.info(f'@ Trace written to {args.trace_file}')
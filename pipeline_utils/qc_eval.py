@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   qc_eval, evaluate the qc_thresholds rulesets
+#       for MetaWorkflow objects against
+#       a table of QC metrics
+#
+################################################
+
+import sys
+import csv
+import json
+import time
+import structlog
+from pipeline_utils.lib import metaworkflow_loader
+from pipeline_utils.lib import qc_evaluator
+
+
+###############################################################
+#   Logger
+###############################################################
+logger = structlog.getLogger(__name__)
+
+
+###############################################################
+#   Functions
+###############################################################
+def evaluate_files(files, samples, metrics, rulesets=None):
+    """Evaluate the qc_thresholds rulesets for the MetaWorkflow objects in files
+    against the QC metrics for the samples.
+
+        :param rulesets: Names of the rulesets to evaluate, all if not specified
+        :type rulesets: list(str)
+        :return: Report for each MetaWorkflow, status for each sample for each ruleset
+        :rtype: tuple(list(dict), dict(str, dict(str, numpy.ndarray)))
+    """
+    reports_, status_ = [], {}
+    for file_ in files:
+        for d, errors_ in metaworkflow_loader.load_metaworkflows(file_):
+            name_ = d.get('name') if isinstance(d, dict) else None
+            report_ = {'file': file_, 'name': name_, 'rulesets': [], 'errors': errors_}
+            reports_.append(report_)
+            if errors_:
+                continue
+            for ruleset in qc_evaluator.load_rulesets(d):
+                if rulesets and ruleset['name'] not in rulesets:
+                    continue
+                try:
+                    start_ = time.perf_counter()
+                    ruleset_ = qc_evaluator.QCRuleset(ruleset)
+                    s_ = ruleset_.evaluate(metrics, len(samples))
+                    seconds_ = time.perf_counter() - start_
+                except ValueError as e:
+                    report_['errors'].append(f'{ruleset["name"]}: {e}')
+                    continue
+                status_[f'{name_}.{ruleset["name"]}'] = s_
+                report_['rulesets'].append({
+                    'name': ruleset['name'],
+                    'rule': ruleset['rule'],
+                    'summary': qc_evaluator.QCRuleset.summary(s_),
+                    'seconds': seconds_
+                })
+    return reports_, status_
+
+def write_status(file, samples, status):
+    """Write the status for each sample in TSV format,
+    with a column for each rule and for the overall status of each ruleset.
+    """
+    columns_ = [(f'{ruleset}.{id}', s) for ruleset, status_ in status.items() for id, s in status_.items()]
+    with open(file, 'w', newline='') as f:
+        writer = csv.writer(f, delimiter='\t')
+        writer.writerow(['sample'] + [name for name, _ in columns_])
+        for i, sample in enumerate(samples):
+            writer.writerow([sample] + [qc_evaluator.STATUS[s[i]] for _, s in columns_])
+
+
+################################################
+#  MAIN, runner
+################################################
+def main(args):
+    """Evaluate the qc_thresholds rulesets for the MetaWorkflow objects in the specified YAML files
+    against a table of QC metrics with a row for each sample.
+    Exit with 1 if any MetaWorkflow or ruleset has errors.
+    """
+    try:
+        samples_, metrics_ = qc_evaluator.load_metrics(args.metrics, args.sample_column)
+    except (OSError, ValueError) as e:
+        logger.info('> FAILED LOADING METRICS TABLE')
+        logger.info(e)
+        sys.exit('\nExiting...')
+
+    reports_, status_ = evaluate_files(args.files, samples_, metrics_, args.rulesets)
+    if args.output:
+        write_status(args.output, samples_, status_)
+
+    if args.json:
+        sys.stdout.write(json.dumps(reports_, indent=2) + '\n')
+    else:
+        for report_ in reports_:
+            logger.info(f'@ {report_["file"]}...')
+            if report_['errors']:
+                logger.info('> FAILED %s' % report_['name'])
+                for error in report_['errors']:
+                    logger.error(f'- {error}')
+            for ruleset_ in report_['rulesets']:
+                logger.info(f'> Evaluated {report_["name"]} {ruleset_["name"]} for {len(samples_)} samples in {ruleset_["seconds"]:.3f}s')
+                for id, counts in ruleset_['summary'].items():
+                    logger.info(f'  {id}: ' + ', '.join(f'{status} {n}' for status, n in reversed(counts.items())))
+
+    if any(report_['errors'] for report_ in reports_):
+        sys.exit(1)
@@ -20,6 +20,10 @@ STRING = 'string'
 ARRAY = 'array'
 BOOLEAN = 'boolean'
 NUMBER = 'number'
+INTEGER = 'integer'
 # MODIFIERS VARIABLES
 PATTERN = 'pattern'
 PATTERNPROPERTIES = 'patternProperties'
+ADDITIONALPROPERTIES = 'additionalProperties'
+MINITEMS = 'minItems'
+MAXITEMS = 'maxItems'
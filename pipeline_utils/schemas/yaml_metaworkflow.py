@@ -74,8 +74,11 @@ yaml_metaworkflow_schema = {
                             }
                         },
                         'shards': {
-                            schema.DESCRIPTION: 'Shards structure to create for the step',
-                            schema.TYPE: schema.ARRAY
+                            schema.DESCRIPTION: 'Shards structure to create for the step, as list of shards or as product of lists and ranges',
+                            schema.ONEOF: [
+                                {schema.TYPE: schema.ARRAY},
+                                {schema.REF: '/schemas/shards-product'}
+                            ]
                         }
                     },
                     schema.REQUIRED: ['input', 'config']
@@ -160,6 +163,46 @@ yaml_metaworkflow_schema = {
             },
             schema.REQUIRED: ['argument_type']
         },
+        'shards-product': {
+            schema.SCHEMA: 'https://json-schema.org/draft/2020-12/schema',
+            schema.ID: '/schemas/shards-product',
+            schema.TYPE: schema.OBJECT,
+            schema.PROPERTIES: {
+                'product': {
+                    schema.TYPE: schema.ARRAY,
+                    schema.MINITEMS: 1,
+                    schema.MAXITEMS: 3, # magma supports up to 3 dimensions
+                    schema.ITEMS: {
+                        schema.ONEOF: [
+                            {
+                                schema.TYPE: schema.ARRAY,
+                                schema.MINITEMS: 1,
+                                schema.ITEMS: {
+                                    schema.TYPE: [schema.STRING, schema.NUMBER]
+                                }
+                            },
+                            {
+                                schema.TYPE: schema.OBJECT,
+                                schema.PROPERTIES: {
+                                    'range': {
+                                        schema.TYPE: schema.ARRAY,
+                                        schema.MINITEMS: 2,
+                                        schema.MAXITEMS: 3, # start, stop, step
+                                        schema.ITEMS: {
+                                            schema.TYPE: schema.INTEGER
+                                        }
+                                    }
+                                },
+                                schema.REQUIRED: ['range'],
+                                schema.ADDITIONALPROPERTIES: False
+                            }
+                        ]
+                    }
+                }
+            },
+            schema.REQUIRED: ['product'],
+            schema.ADDITIONALPROPERTIES: False
+        },
         'argument-output': {
             schema.SCHEMA: 'https://json-schema.org/draft/2020-12/schema',
             schema.ID: '/schemas/argument-output',
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   validate, YAML portal objects against schemas
+#
+################################################
+
+import os, sys
+import json
+import yaml
+import structlog
+from concurrent.futures import ProcessPoolExecutor
+from pipeline_utils.lib import yaml_parser
+from pipeline_utils.lib import portal_objects
+
+
+###############################################################
+#   Logger
+###############################################################
+logger = structlog.getLogger(__name__)
+
+
+###############################################################
+#   Functions
+###############################################################
+def validate_file(file_):
+    """Validate the YAML documents in file_ against the schema
+    for the object type inferred from the file path.
+
+        :param file_: Path to the YAML file
+        :type file_: str
+        :return: Report with the errors for the file and each document
+        :rtype: dict
+    """
+    type_ = portal_objects.infer_type(file_)
+    report_ = {'file': file_, 'type': type_, 'valid': True, 'error': None, 'documents': []}
+
+    if not type_:
+        report_.update(valid=False, error='Cannot infer object type from file path')
+        return report_
+
+    try:
+        with open(file_) as stream:
+            documents = [d for d in yaml.safe_load_all(stream) if d]
+    except (OSError, yaml.YAMLError) as e:
+        report_.update(valid=False, error=f'{type(e).__name__}: {e}')
+        return report_
+
+    for d in documents:
+        document_ = {
+            'name': d.get('name') if isinstance(d, dict) else None,
+            'valid': True,
+            'errors': []
+        }
+        try:
+            portal_objects.YAML_CLASSES[type_](d)
+        except yaml_parser.ValidationError as e:
+            document_['valid'] = False
+            for error in e.errors:
+                document_['errors'].append({
+                    'validator': error.validator,
+                    'message': error.message,
+                    'path': list(error.relative_path)
+                })
+        report_['documents'].append(document_)
+        report_['valid'] = report_['valid'] and document_['valid']
+
+    return report_
+
+def validate_files(files, jobs=None):
+    """Validate the YAML documents in files, in parallel processes
+    if there are multiple files and jobs is not 1.
+    Return the reports for the files in order.
+    """
+    jobs = jobs or os.cpu_count()
+    if jobs == 1 or len(files) < 2:
+        return [validate_file(file_) for file_ in files]
+
+    with ProcessPoolExecutor(min(jobs, len(files))) as executor:
+        return list(executor.map(validate_file, files))
+
+
+################################################
+#  MAIN, runner
+################################################
+def main(args):
+    """Validate the specified YAML files against the schemas.
+    Does not require credentials or a repository.
+    Exit with 1 if any file is not valid.
+    """
+    reports_ = validate_files(args.files, args.jobs)
+
+    if args.json:
+        sys.stdout.write(json.dumps(reports_, indent=2) + '\n')
+    else:
+        for report_ in reports_:
+            logger.info(f'@ {report_["file"]}...')
+            if report_['error']:
+                logger.info('> FAILED %s' % report_['file'])
+                logger.error(f'- {report_["error"]}')
+            for document_ in report_['documents']:
+                if document_['valid']:
+                    logger.info('> Validated %s' % document_['name'])
+                    continue
+                logger.info('> FAILED %s' % document_['name'])
+                for error in document_['errors']:
+                    logger.error('- ValidationError [{0}]: {1} in path={2}'.format(
+                                    error['validator'],
+                                    error['message'],
+                                    error['path']
+                                    )
+                                )
+
+    if not all(report_['valid'] for report_ in reports_):
+        sys.exit(1)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   watch, validate YAML portal objects on change
+#
+################################################
+
+import os, sys
+import time
+import json
+import yaml
+import structlog
+from pipeline_utils.lib import yaml_parser
+from pipeline_utils.lib import portal_objects
+
+
+###############################################################
+#   Logger
+###############################################################
+logger = structlog.getLogger(__name__)
+
+
+###############################################################
+#   Variables
+###############################################################
+# bucket for the Workflow Description files when --wfl-bucket is not specified
+WFL_BUCKET_PLACEHOLDER = '<wfl-bucket>'
+
+
+###############################################################
+#   Watcher
+###############################################################
+class Watcher(object):
+    """Class to validate and convert the portal objects in a repository,
+    checking again only the documents that changed since the last scan.
+    """
+
+    def __init__(self, args, repo, version_file='VERSION', pipeline_file='PIPELINE'):
+        """Constructor method.
+
+            :param args: Command line arguments
+            :type args: object returned by ArgumentParser.parse_args() method
+            :param repo: Name of the repository
+            :type repo: str
+            :param version_file: Name of the file storing pipeline version information
+            :type version_file: str
+            :param pipeline_file: Name of the file storing pipeline name information
+            :type pipeline_file: str
+        """
+        self.repo = repo
+        # Load attributes
+        for key, val in vars(args).items():
+            setattr(self, key, val)
+
+        # Get pipeline version and name
+        with open(f'{self.repo}/{version_file}') as f:
+            self.version = f.readlines()[0].strip()
+        with open(f'{self.repo}/{pipeline_file}') as f:
+            self.pipeline = f.readlines()[0].strip()
+
+        # URL for the Workflow Description files in Workflow objects
+        self.wflbucket_url = f's3://{self.wfl_bucket or WFL_BUCKET_PLACEHOLDER}/{self.pipeline}/{self.version}'
+
+        # (mtime, size) for the files at the last scan
+        self._files = {}
+        # JSON objects for the valid documents in each file,
+        #   by document content
+        self._documents = {}
+
+    def _check_file(self, file_):
+        """Helper to validate and convert the documents in file_.
+        Documents unchanged since the last check are skipped.
+        Return the number of documents that failed.
+        """
+        type_ = portal_objects.infer_type(file_)
+        try:
+            with open(file_) as stream:
+                documents = [d for d in yaml.safe_load_all(stream) if d]
+        except (OSError, yaml.YAMLError) as e:
+            # file removed or replaced after the scan
+            logger.error(f'- {type(e).__name__}: {e}')
+            return 1
+
+        cache_ = self._documents.get(file_, {})
+        documents_, failed = {}, 0
+        for d in documents:
+            key = json.dumps(d, sort_keys=True, default=str)
+            if key in cache_:
+                documents_[key] = cache_[key]
+                continue
+
+            name = d.get('name') if isinstance(d, dict) else None
+            try:
+                d_ = portal_objects.to_json(
+                        d, type_,
+                        version=self.version,
+                        submission_centers=self.submission_centers,
+                        consortia=self.consortia,
+                        wflbucket_url=self.wflbucket_url
+                        )
+            except yaml_parser.ValidationError as e:
+                failed += 1
+                logger.info('> FAILED %s' % name)
+                for error in e.errors:
+                    logger.error('- ValidationError [{0}]: {1} in path={2}, schema={3}'.format(
+                                    error.validator,
+                                    error.message,
+                                    error.relative_path,
+                                    error.schema
+                                    )
+                                )
+                continue
+            except Exception as e:
+                failed += 1
+                logger.info('> FAILED %s' % name)
+                logger.error(f'- {type(e).__name__}: {e}')
+                continue
+
+            documents_[key] = d_
+            logger.info('> Validated %s' % name)
+            if self.verbose:
+                logger.info(json.dumps(d_, sort_keys=True, indent=2))
+
+        self._documents[file_] = documents_
+        return failed
+
+    def scan(self):
+        """Check the files changed since the last scan.
+        Return the changed files.
+        """
+        files_ = {}
+        for file_ in portal_objects.portal_files(self.repo):
+            try:
+                stat_ = os.stat(file_)
+            except FileNotFoundError:
+                continue
+            files_[file_] = (stat_.st_mtime_ns, stat_.st_size)
+
+        for file_ in sorted(set(self._files) - set(files_)):
+            logger.info(f'@ {os.path.relpath(file_, self.repo)} removed')
+            self._documents.pop(file_, None)
+
+        changed_ = sorted(fn for fn, stat_ in files_.items() if self._files.get(fn) != stat_)
+        self._files = files_
+        for file_ in changed_:
+            logger.info(f'@ {os.path.relpath(file_, self.repo)}...')
+            start_ = time.perf_counter()
+            failed = self._check_file(file_)
+            logger.info('> Checked in %.1f ms, %d failed' % ((time.perf_counter() - start_) * 1000, failed))
+
+        return changed_
+
+
+################################################
+#  MAIN, runner
+################################################
+def main(args):
+    """Watch the portal objects in the specified repositories,
+    validate and convert the documents again when the files change.
+    Runs until interrupted.
+    """
+    watchers_ = [Watcher(args, repo) for repo in args.repos]
+    for watcher in watchers_:
+        watcher.scan()
+
+    logger.info('@ Watching for changes, press Ctrl+C to stop...')
+    try:
+        while True:
+            time.sleep(args.poll_interval)
+            for watcher in watchers_:
+                watcher.scan()
+    except KeyboardInterrupt:
+        sys.exit(0)
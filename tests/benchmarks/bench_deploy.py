@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   bench_deploy, benchmarks for parsing, validating
+#       and converting generated pipeline repositories
+#
+#   python tests/benchmarks/bench_deploy.py [--sizes 1 2 4 8] [--absolute]
+#
+#   regressions are checked on the scaling exponents, that do not depend
+#       on the machine, --absolute also checks the times against the baseline
+#
+################################################
+
+import os, sys
+import json
+import math
+import time
+import argparse
+import tempfile
+import structlog
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import generator
+from pipeline_utils import pipeline_deploy
+from pipeline_utils import __main__ as cli
+from pipeline_utils.lib import yaml_parser
+from pipeline_utils.lib import portal_objects
+
+
+###############################################################
+#   Variables
+###############################################################
+SIZES = [1, 2, 4, 8]
+REPEAT = 3
+# maximum slowdown compared to the baseline before failing, with --absolute
+TOLERANCE = 0.5
+# maximum increase of the scaling exponent compared to the baseline before failing
+SCALING_TOLERANCE = 0.25
+# benchmarks faster than this at the largest size are too noisy to check the scaling
+MIN_SECONDS = 0.005
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+###############################################################
+#   Functions
+###############################################################
+def scale(size):
+    """Return the generator arguments for a repository of size.
+    """
+    return {
+        'softwares': 10 * size,
+        'workflows': 5 * size,
+        'metaworkflows': 2 * size,
+        'steps': 10,
+        'shards': 10,
+        'reference_files': 100 * size,
+        'file_formats': 5
+    }
+
+def deploy_args(repo, keydicts_json, **kwargs):
+    """Return the command line arguments for an offline pipeline_deploy
+    of all the portal objects in repo, with the defaults from the command line parser.
+    """
+    parser, _ = cli.build_parser()
+    args = parser.parse_args([
+        'pipeline_deploy', '--ff-env', 'benchmark', '--repos', repo, '--keydicts-json', keydicts_json,
+        '--wfl-bucket', 'BUCKETCWL', '--account', '000000000000', '--region', 'us-east-1',
+        '--post-software', '--post-file-format', '--post-file-reference', '--post-reference-genome',
+        '--post-workflow', '--post-metaworkflow', '--build-poll-interval', '0', '--debug'
+    ])
+    for key, value in kwargs.items():
+        setattr(args, key, value)
+    return args
+
+def drop_info(logger, method_name, event_dict):
+    """structlog processor to drop debug and info messages.
+    """
+    if method_name in ('debug', 'info'):
+        raise structlog.DropEvent
+    return event_dict
+
+def best_of(fn, repeat):
+    """Return the best wall time in seconds for fn over repeat runs.
+    """
+    times_ = []
+    for _ in range(repeat):
+        start_ = time.perf_counter()
+        fn()
+        times_.append(time.perf_counter() - start_)
+    return min(times_)
+
+def run_benchmarks(repo, repeat=REPEAT):
+    """Run the benchmarks on repo.
+
+        :return: Best time and number of items for each benchmark
+        :rtype: dict
+    """
+    files_ = portal_objects.portal_files(repo)
+    documents_ = {}
+    for file_ in files_:
+        type_ = portal_objects.infer_type(file_)
+        documents_.setdefault(type_, []).extend(yaml_parser.load_yaml(file_))
+
+    results_ = {}
+    n_documents_ = sum(len(d) for d in documents_.values())
+    results_['load_yaml'] = {
+        'seconds': best_of(lambda: [list(yaml_parser.load_yaml(f)) for f in files_], repeat),
+        'items': n_documents_
+    }
+
+    kwargs_ = {'version': 'v1.0.0', 'submission_centers': ['smaht_dac'], 'consortia': ['smaht'],
+               'wflbucket_url': 's3://BUCKETCWL/benchmark_pipeline/v1.0.0'}
+    for type_, docs_ in sorted(documents_.items()):
+        YAMLClass = portal_objects.YAML_CLASSES[type_]
+        results_[f'validate:{type_}'] = {
+            'seconds': best_of(lambda: [YAMLClass(d) for d in docs_], repeat),
+            'items': len(docs_)
+        }
+        objects_ = [YAMLClass(d) for d in docs_]
+        to_json_kwargs_ = portal_objects.to_json_kwargs(type_, **kwargs_)
+        results_[f'to_json:{type_}'] = {
+            'seconds': best_of(lambda: [o.to_json(**to_json_kwargs_) for o in objects_], repeat),
+            'items': len(docs_)
+        }
+        results_[f'to_json_many:{type_}'] = {
+            'seconds': best_of(lambda: list(YAMLClass.to_json_many(docs_, **to_json_kwargs_)), repeat),
+            'items': len(docs_)
+        }
+
+    with tempfile.TemporaryDirectory() as tmp_:
+        keydicts_json_ = os.path.join(tmp_, 'keys.json')
+        with open(keydicts_json_, 'w') as f:
+            json.dump({'benchmark': {'key': 'XXXXXXXX', 'secret': 'xxxxxxxx', 'server': 'http://localhost'}}, f)
+        args_ = deploy_args(repo, keydicts_json_)
+        results_['run_post_patch'] = {
+            'seconds': best_of(lambda: pipeline_deploy.PostPatchRepo(args_, repo).run_post_patch(), repeat),
+            'items': n_documents_
+        }
+
+    for result_ in results_.values():
+        result_['per_item'] = result_['seconds'] / result_['items'] if result_['items'] else 0.0
+    return results_
+
+def scaling(results, sizes):
+    """Return the scaling exponent for each benchmark,
+    the slope of time versus size in log-log scale between the smallest and largest size.
+    1.0 is linear scaling.
+    """
+    exponents_ = {}
+    first_, last_ = results[str(sizes[0])], results[str(sizes[-1])]
+    for name in first_:
+        if name in last_ and first_[name]['seconds'] > 0 and last_[name]['seconds'] > 0 and sizes[-1] != sizes[0]:
+            exponents_[name] = math.log(last_[name]['seconds'] / first_[name]['seconds']) / math.log(sizes[-1] / sizes[0])
+    return exponents_
+
+def compare_scaling(results, baseline, sizes, tolerance=SCALING_TOLERANCE, min_seconds=MIN_SECONDS):
+    """Return the benchmarks whose scaling exponent increased compared to baseline
+    by more than tolerance, as (name, exponent, baseline exponent).
+    Benchmarks faster than min_seconds at the largest size are not checked.
+    """
+    if str(sizes[0]) not in baseline or str(sizes[-1]) not in baseline:
+        return []
+    exponents_, baseline_exponents_ = scaling(results, sizes), scaling(baseline, sizes)
+    regressions_ = []
+    for name, exponent in exponents_.items():
+        if results[str(sizes[-1])][name]['seconds'] < min_seconds or name not in baseline_exponents_:
+            continue
+        if exponent > baseline_exponents_[name] + tolerance:
+            regressions_.append((name, exponent, baseline_exponents_[name]))
+    return regressions_
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Return the benchmarks slower than baseline by more than tolerance,
+    as (size, name, seconds, baseline seconds).
+    The times depend on the machine, compare with a baseline saved on the same machine.
+    """
+    regressions_ = []
+    for size, benchmarks_ in results.items():
+        for name, result_ in benchmarks_.items():
+            baseline_ = baseline.get(size, {}).get(name)
+            if baseline_ and result_['seconds'] > baseline_['seconds'] * (1 + tolerance):
+                regressions_.append((size, name, result_['seconds'], baseline_['seconds']))
+    return regressions_
+
+def table(results, sizes):
+    """Return the results formatted as a table,
+    time in ms and time per item in us for each size.
+    """
+    names_ = list(results[str(sizes[0])])
+    header_ = '%-28s' % 'benchmark' + ''.join('%22s' % f'size {s} ms (us/item)' for s in sizes)
+    lines_ = [header_]
+    for name in names_:
+        cells_ = []
+        for size in sizes:
+            result_ = results[str(size)].get(name)
+            cells_.append('%22s' % ('%.1f (%.1f)' % (result_['seconds'] * 1000, result_['per_item'] * 1e6) if result_ else '-'))
+        lines_.append('%-28s' % name + ''.join(cells_))
+    return '\n'.join(lines_)
+
+
+################################################
+#  MAIN, runner
+################################################
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks for generated pipeline repositories')
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES, help=f'Sizes of the generated repositories [{SIZES}]')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help=f'Runs for each benchmark, the best time is used [{REPEAT}]')
+    parser.add_argument('--output', help='Path to file to write the results in JSON format')
+    parser.add_argument('--baseline', help=f'Path to baseline results to compare with, fail on regressions [{BASELINE}]')
+    parser.add_argument('--save-baseline', action='store_true', help='Write the results to the baseline file instead of comparing')
+    parser.add_argument('--scaling-tolerance', type=float, default=SCALING_TOLERANCE, help=f'Maximum increase of the scaling exponents compared to the baseline [{SCALING_TOLERANCE}]')
+    parser.add_argument('--absolute', action='store_true', help='Also fail if the times are slower than the baseline, use only with a baseline saved on the same machine')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help=f'Maximum slowdown compared to the baseline with --absolute [{TOLERANCE}]')
+    args = parser.parse_args(argv)
+
+    # offline deploy, only warnings and errors
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    structlog.configure(processors=[drop_info] + structlog.get_config()['processors'])
+
+    results = {}
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_:
+            repo_ = generator.generate_repo(os.path.join(tmp_, 'repo'), **scale(size))
+            results[str(size)] = run_benchmarks(repo_, args.repeat)
+
+    print(table(results, args.sizes))
+    print('\nscaling exponents (1.0 is linear)')
+    for name, exponent in scaling(results, args.sizes).items():
+        print('%-28s %6.2f' % (name, exponent))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    baseline_ = args.baseline or BASELINE
+    if args.save_baseline:
+        with open(baseline_, 'w') as f:
+            json.dump(results, f, indent=2)
+    elif os.path.isfile(baseline_):
+        with open(baseline_) as f:
+            baseline_results_ = json.load(f)
+        regressions_ = compare_scaling(results, baseline_results_, args.sizes, args.scaling_tolerance)
+        for name, exponent, baseline_exponent in regressions_:
+            print(f'REGRESSION {name}: scaling exponent {exponent:.2f}, baseline {baseline_exponent:.2f}')
+        if args.absolute:
+            slower_ = compare(results, baseline_results_, args.tolerance)
+            for size, name, seconds, baseline_seconds in slower_:
+                print(f'REGRESSION size {size} {name}: {seconds * 1000:.1f} ms, baseline {baseline_seconds * 1000:.1f} ms')
+            regressions_ += slower_
+        if regressions_:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   bench_memory, memory profiling for parsing, validating
+#       and converting generated pipeline repositories
+#
+#   python tests/benchmarks/bench_memory.py [--sizes 1 8]
+#
+################################################
+
+import os, sys
+import gc
+import json
+import argparse
+import tempfile
+import tracemalloc
+import structlog
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import generator
+import bench_deploy
+from pipeline_utils import pipeline_deploy
+from pipeline_utils.lib import yaml_parser
+from pipeline_utils.lib import portal_objects
+
+
+###############################################################
+#   Variables
+###############################################################
+SIZES = [1, 8]
+# budgets for peak memory in bytes, by size and benchmark
+BUDGETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'memory_budgets.json')
+# headroom over the measured peak when saving budgets
+HEADROOM = 2.0
+
+
+###############################################################
+#   Functions
+###############################################################
+def measure(fn):
+    """Run fn with tracemalloc.
+    Retained is the memory still allocated when fn returns, including the result,
+    peak is the maximum memory allocated while running fn.
+
+        :return: Result of fn, retained bytes, peak bytes
+        :rtype: tuple
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result_ = fn()
+        retained_, peak_ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result_, retained_, peak_
+
+def _record(results, name, retained, peak, items):
+    """Helper to add a measure to results, with bytes per item.
+    """
+    results[name] = {
+        'retained': retained,
+        'peak': peak,
+        'items': items,
+        'peak_per_item': peak / items if items else 0.0
+    }
+
+def run_suite(repo):
+    """Measure memory for each stage and object type on repo.
+
+        :return: Retained and peak bytes and number of items for each benchmark
+        :rtype: dict
+    """
+    files_ = {}
+    for file_ in portal_objects.portal_files(repo):
+        files_.setdefault(portal_objects.infer_type(file_), []).append(file_)
+
+    kwargs_ = {'version': 'v1.0.0', 'submission_centers': ['smaht_dac'], 'consortia': ['smaht'],
+               'wflbucket_url': 's3://BUCKETCWL/benchmark_pipeline/v1.0.0'}
+    results_ = {}
+    n_documents_ = 0
+    for type_, type_files_ in sorted(files_.items()):
+        YAMLClass = portal_objects.YAML_CLASSES[type_]
+
+        documents_, retained_, peak_ = measure(
+            lambda: [d for f in type_files_ for d in yaml_parser.load_yaml(f)]
+        )
+        n_documents_ += len(documents_)
+        _record(results_, f'load_yaml:{type_}', retained_, peak_, len(documents_))
+
+        objects_, retained_, peak_ = measure(lambda: [YAMLClass(d) for d in documents_])
+        _record(results_, f'validate:{type_}', retained_, peak_, len(documents_))
+
+        to_json_kwargs_ = portal_objects.to_json_kwargs(type_, **kwargs_)
+        _, retained_, peak_ = measure(lambda: [o.to_json(**to_json_kwargs_) for o in objects_])
+        _record(results_, f'to_json:{type_}', retained_, peak_, len(documents_))
+        del documents_, objects_
+
+    with tempfile.TemporaryDirectory() as tmp_:
+        keydicts_json_ = os.path.join(tmp_, 'keys.json')
+        with open(keydicts_json_, 'w') as f:
+            json.dump({'benchmark': {'key': 'XXXXXXXX', 'secret': 'xxxxxxxx', 'server': 'http://localhost'}}, f)
+        args_ = bench_deploy.deploy_args(repo, keydicts_json_)
+        _, retained_, peak_ = measure(lambda: pipeline_deploy.PostPatchRepo(args_, repo).run_post_patch())
+        _record(results_, 'run_post_patch', retained_, peak_, n_documents_)
+
+    return results_
+
+def check_budgets(results, budgets):
+    """Return the benchmarks with peak bytes over budget,
+    as (size, name, peak bytes, budget).
+    """
+    violations_ = []
+    for size, benchmarks_ in results.items():
+        for name, result_ in benchmarks_.items():
+            budget_ = budgets.get(size, {}).get(name)
+            if budget_ is not None and result_['peak'] > budget_:
+                violations_.append((size, name, result_['peak'], budget_))
+    return violations_
+
+def make_budgets(results, headroom=HEADROOM):
+    """Return budgets for peak bytes, the measured peak times headroom.
+    """
+    return {
+        size: {name: int(result_['peak'] * headroom) for name, result_ in benchmarks_.items()}
+        for size, benchmarks_ in results.items()
+    }
+
+def table(results, sizes):
+    """Return the results formatted as a table,
+    retained and peak memory in KiB and peak bytes per item for each size.
+    """
+    names_ = list(results[str(sizes[0])])
+    header_ = '%-28s' % 'benchmark' + ''.join('%34s' % f'size {s} KiB retained/peak (B/item)' for s in sizes)
+    lines_ = [header_]
+    for name in names_:
+        cells_ = []
+        for size in sizes:
+            result_ = results[str(size)].get(name)
+            if result_:
+                cell_ = '%.0f/%.0f (%.0f)' % (result_['retained'] / 1024, result_['peak'] / 1024, result_['peak_per_item'])
+            else:
+                cell_ = '-'
+            cells_.append('%34s' % cell_)
+        lines_.append('%-28s' % name + ''.join(cells_))
+    return '\n'.join(lines_)
+
+
+################################################
+#  MAIN, runner
+################################################
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Memory profiling for generated pipeline repositories')
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES, help=f'Sizes of the generated repositories [{SIZES}]')
+    parser.add_argument('--output', help='Path to file to write the results in JSON format')
+    parser.add_argument('--budgets', help=f'Path to budgets for peak bytes, fail when exceeded [{BUDGETS}]')
+    parser.add_argument('--save-budgets', action='store_true', help='Write budgets from the results to the budgets file instead of checking')
+    parser.add_argument('--headroom', type=float, default=HEADROOM, help=f'Headroom over the measured peak when saving budgets [{HEADROOM}]')
+    args = parser.parse_args(argv)
+
+    # offline deploy, only warnings and errors
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    structlog.configure(processors=[bench_deploy.drop_info] + structlog.get_config()['processors'])
+
+    # warm up imports and schema caches, so they are not counted for the first size
+    with tempfile.TemporaryDirectory() as tmp_:
+        run_suite(generator.generate_repo(os.path.join(tmp_, 'repo'), softwares=2, workflows=1, metaworkflows=1, steps=2, shards=2, reference_files=2, file_formats=1))
+
+    results = {}
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_:
+            repo_ = generator.generate_repo(os.path.join(tmp_, 'repo'), **bench_deploy.scale(size))
+            results[str(size)] = run_suite(repo_)
+
+    print(table(results, args.sizes))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    budgets_ = args.budgets or BUDGETS
+    if args.save_budgets:
+        with open(budgets_, 'w') as f:
+            json.dump(make_budgets(results, args.headroom), f, indent=2, sort_keys=True)
+    elif os.path.isfile(budgets_):
+        with open(budgets_) as f:
+            violations_ = check_budgets(results, json.load(f))
+        for size, name, peak, budget in violations_:
+            print(f'OVER BUDGET size {size} {name}: peak {peak / 1024:.0f} KiB, budget {budget / 1024:.0f} KiB')
+        if violations_:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
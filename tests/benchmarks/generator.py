@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+################################################
+#
+#   generator, synthetic pipeline repositories
+#       for benchmarks
+#
+################################################
+
+import os
+import yaml
+
+
+###############################################################
+#   Functions
+###############################################################
+def _dump_all(file, documents):
+    """Helper to write documents to file as multi-document YAML.
+    """
+    with open(file, 'w') as f:
+        yaml.safe_dump_all(documents, f, sort_keys=False)
+
+def software(i):
+    """Return a Software document.
+    """
+    return {
+        'name': f'software-{i}',
+        'version': f'{i}.0.0',
+        'title': f'software-{i} {i}.0.0',
+        'source_url': f'https://github.com/example/software-{i}',
+        'description': f'Synthetic software package {i}',
+        'category': ['Aligner']
+    }
+
+def file_format(i):
+    """Return a FileFormat document.
+    """
+    return {
+        'name': f'format_{i}',
+        'extension': f'fmt{i}',
+        'description': f'Synthetic file format {i}',
+        'secondary_formats': [f'format_{i}_idx']
+    }
+
+def reference_file(i):
+    """Return a ReferenceFile document.
+    """
+    return {
+        'name': f'reference-{i}',
+        'description': f'Synthetic reference file {i}',
+        'format': 'format_0',
+        'version': f'v{i}',
+        'secondary_files': ['format_0_idx'],
+        'status': 'uploading',
+        'category': ['Sequencing Reads'],
+        'type': ['Unaligned Reads']
+    }
+
+def workflow(i, softwares):
+    """Return a Workflow document.
+    """
+    return {
+        'name': f'workflow-{i}',
+        'description': f'Synthetic workflow {i}',
+        'title': f'Synthetic workflow {i}',
+        'category': ['Alignment'],
+        'runner': {'language': 'wdl', 'main': f'workflow-{i}.wdl'},
+        'software': [f'software-{j}@{j}.0.0' for j in range(i % softwares, min(i % softwares + 2, softwares))],
+        'input': {
+            'input_file': {'argument_type': 'file.format_0'},
+            'reference': {'argument_type': 'file.format_0'},
+            'nthreads': {'argument_type': 'parameter.integer'},
+            'qc_ruleset': {'argument_type': 'parameter.object'}
+        },
+        'output': {
+            'output_file': {'argument_type': 'file.format_0', 'secondary_files': ['format_0_idx']},
+            'qc_output': {'argument_type': 'qc', 'argument_to_be_attached_to': 'output_file', 'zipped': False, 'json': True}
+        }
+    }
+
+def metaworkflow(i, steps, shards, workflows, reference_files):
+    """Return a MetaWorkflow document with steps chained one after the other,
+    each step with a fixed shards structure and a QC ruleset.
+    """
+    input_ = {
+        'input_files': {'argument_type': 'file.format_0', 'dimensionality': 1},
+        'reference': {
+            'argument_type': 'file.format_0',
+            'files': [f'reference-{j}@v{j}' for j in range(min(2, reference_files))]
+        },
+        'qc_ruleset': {
+            'argument_type': 'parameter.object',
+            'qc_thresholds': {
+                f'c{j}': {'rule': f'metric_{j}|>=|{100 + j}|{80 + j}', 'flag': bool(j % 2)} for j in range(5)
+            },
+            'qc_rule': '( {c0} and {c1} ) or not ( {c2} and {c3} and {c4} )'
+        }
+    }
+    workflows_ = {}
+    previous_ = None
+    for j in range(steps):
+        name_ = f'workflow-{j % workflows}@step{j}'
+        if previous_:
+            input_file_ = {'argument_type': 'file.format_0', 'source': previous_, 'source_argument_name': 'output_file'}
+        else:
+            input_file_ = {'argument_type': 'file.format_0', 'source_argument_name': 'input_files', 'scatter': 1}
+        workflows_[name_] = {
+            'input': {
+                'input_file': input_file_,
+                'reference': {'argument_type': 'file.format_0'},
+                'nthreads': {'argument_type': 'parameter.integer', 'value': 4},
+                'qc_ruleset': {'argument_type': 'parameter.object'}
+            },
+            'output': {
+                'output_file': {
+                    'description': f'output from step {j}',
+                    'data_category': ['Sequencing Reads'],
+                    'data_type': ['Aligned Reads']
+                }
+            },
+            'config': {'ebs_size': '2x', 'ec2_type': 'm5.xlarge'},
+            'shards': [[str(k)] for k in range(shards)]
+        }
+        previous_ = name_
+    return {
+        'name': f'metaworkflow-{i}',
+        'description': f'Synthetic metaworkflow {i}',
+        'title': f'Synthetic metaworkflow {i}',
+        'category': ['Alignment'],
+        'input': input_,
+        'workflows': workflows_
+    }
+
+def generate_repo(
+        path,
+        softwares=10,
+        workflows=5,
+        metaworkflows=2,
+        steps=5,
+        shards=10,
+        reference_files=100,
+        file_formats=5
+        ):
+    """Write a synthetic pipeline repository to path,
+    following the expected structure for the repository.
+    Software, FileFormat and ReferenceFile objects are written
+    to a single multi-document YAML file each.
+
+        :return: Path to the repository
+        :rtype: str
+    """
+    os.makedirs(f'{path}/portal_objects/workflows', exist_ok=True)
+    os.makedirs(f'{path}/portal_objects/metaworkflows', exist_ok=True)
+    os.makedirs(f'{path}/descriptions', exist_ok=True)
+    os.makedirs(f'{path}/dockerfiles', exist_ok=True)
+
+    with open(f'{path}/PIPELINE', 'w') as f:
+        f.write('benchmark_pipeline\n')
+    with open(f'{path}/VERSION', 'w') as f:
+        f.write('v1.0.0\n')
+
+    _dump_all(f'{path}/portal_objects/software.yaml', (software(i) for i in range(softwares)))
+    _dump_all(f'{path}/portal_objects/file_format.yaml', (file_format(i) for i in range(file_formats)))
+    _dump_all(f'{path}/portal_objects/file_reference.yaml', (reference_file(i) for i in range(reference_files)))
+
+    for i in range(workflows):
+        _dump_all(f'{path}/portal_objects/workflows/workflow-{i}.yaml', [workflow(i, softwares)])
+        with open(f'{path}/descriptions/workflow-{i}.wdl', 'w') as f:
+            f.write(f'version 1.0\n\nworkflow workflow_{i} {{\n}}\n')
+
+    for i in range(metaworkflows):
+        _dump_all(
+            f'{path}/portal_objects/metaworkflows/metaworkflow-{i}.yaml',
+            [metaworkflow(i, steps, shards, workflows, reference_files)]
+        )
+
+    return path
@@ -0,0 +1,169 @@
+#################################################################
+#   Libraries
+#################################################################
+import sys, os
+import json
+import argparse
+import pytest
+from pipeline_utils import analyze
+from pipeline_utils.lib import metaworkflow_dag
+from pipeline_utils.lib import metaworkflow_loader
+from pipeline_utils.lib import run_simulation
+
+#################################################################
+#   Functions
+#################################################################
+def _metaworkflow(steps):
+    """Helper to create a MetaWorkflow document,
+    steps maps each step to the steps used as source.
+    """
+    workflows = {}
+    for step, sources in steps.items():
+        input = {'input_file': {'argument_type': 'file.bam', 'source_argument_name': 'input_files'}}
+        for i, source in enumerate(sources):
+            input[f'input_{i}'] = {'argument_type': 'file.bam', 'source': source, 'source_argument_name': 'output'}
+        workflows[step] = {'input': input, 'config': {'ec2_type': 'm5.xlarge', 'ebs_size': '2x'}}
+    return {
+        'name': 'test-pipeline',
+        'description': 'test pipeline',
+        'category': ['Alignment'],
+        'input': {'input_files': {'argument_type': 'file.bam', 'dimensionality': 1}},
+        'workflows': workflows
+    }
+
+#################################################################
+#   Tests
+#################################################################
+def test_dag():
+    """
+    """
+    dag = metaworkflow_dag.MetaWorkflowDAG(_metaworkflow({
+        'align': [], 'sort': ['align'], 'qc': ['align'], 'dedup': ['sort'], 'call': ['dedup', 'qc']
+    }))
+    assert dag.errors == []
+    assert dag.cycle() is None
+    assert dag.levels() == [['align'], ['sort', 'qc'], ['dedup'], ['call']]
+    assert dag.critical_path() == (['align', 'sort', 'dedup', 'call'], 4)
+    assert dag.critical_path({'qc': 10}) == (['align', 'qc', 'call'], 12)
+
+    report = dag.analyze()
+    assert report['valid'] is True
+    assert (report['depth'], report['width']) == (4, 2)
+
+def test_dag_errors():
+    """
+    """
+    data = _metaworkflow({'align': ['call'], 'sort': ['align'], 'call': ['sort', 'missing']})
+    data['workflows']['align']['dependencies'] = ['align']
+    data['workflows']['sort']['input']['input_file']['source_argument_name'] = 'unknown_input'
+    report = metaworkflow_dag.MetaWorkflowDAG(data).analyze()
+    assert report['valid'] is False
+    assert report['cycle'] == ['align', 'align']
+    assert 'call: depends on unknown step missing' in report['errors']
+    assert 'sort: argument input_file uses unknown input unknown_input' in report['errors']
+    assert report['critical_path'] is None
+
+    with pytest.raises(ValueError):
+        metaworkflow_dag.MetaWorkflowDAG(data).order()
+
+def test_load_dags(tmp_path):
+    """
+    """
+    file = tmp_path / 'metaworkflows.yaml'
+    file.write_text('\n---\n'.join([
+        json.dumps(_metaworkflow({'align': [], 'call': ['align']})),
+        json.dumps(dict(_metaworkflow({'align': ['call'], 'call': ['align']}), name='cycle')),
+        json.dumps({'name': 'invalid'})
+    ]))
+    (name_0, dag_0, errors_0), (name_1, dag_1, errors_1), (name_2, dag_2, errors_2) = metaworkflow_loader.load_dags(str(file))
+    assert (name_0, errors_0) == ('test-pipeline', [])
+    assert dag_0.order() == ['align', 'call']
+    assert name_1 == 'cycle' and dag_1 is not None
+    assert errors_1 == ['cycle in steps: align -> call -> align']
+    assert (name_2, dag_2) == ('invalid', None) and errors_2
+
+    assert metaworkflow_loader.load_dags(str(tmp_path / 'missing.yaml'))[0][:2] == (None, None)
+
+def test_analyze(tmp_path, capsys):
+    """
+    """
+    args = argparse.Namespace(files=['tests/repo_correct/portal_objects/metaworkflows/A_gatk-HC-GT.yaml'], dimensions=[2], json=True)
+    analyze.main(args)
+    reports = json.loads(capsys.readouterr().out)
+    assert reports[0]['critical_path'] == ['gatk-HC', 'gatk-GT']
+    assert reports[0]['fanout']['total_runs'] == 2
+
+    data = _metaworkflow({'align': ['call'], 'call': ['align']})
+    file = tmp_path / 'cycle.yaml'
+    file.write_text(json.dumps(data))
+    with pytest.raises(SystemExit):
+        analyze.main(argparse.Namespace(files=[str(file)], dimensions=None, json=False))
+
+def test_fanout():
+    """
+    """
+    data = _metaworkflow({'align': [], 'merge': ['align'], 'call': ['merge'], 'joint': ['call'], 'qc': ['align']})
+    data['input']['input_files']['dimensionality'] = 2
+    workflows = data['workflows']
+    workflows['align']['input']['input_file']['scatter'] = 2
+    workflows['merge']['input']['input_0']['gather'] = 1
+    workflows['joint']['input']['input_0']['gather'] = 1
+    workflows['qc']['shards'] = [['0'], ['1'], ['2']]
+    dag = metaworkflow_dag.MetaWorkflowDAG(data)
+
+    fanout = dag.fanout([30, 24])
+    assert fanout['errors'] == []
+    assert {s: v['runs'] for s, v in fanout['steps'].items()} == {'align': 720, 'merge': 30, 'call': 30, 'joint': 1, 'qc': 3}
+    assert fanout['steps']['call']['scatter'] == 1
+    assert fanout['total_runs'] == 784
+
+    # inputs with fewer dimensions than the scatter
+    fanout = dag.fanout([30])
+    assert fanout['steps']['align']['runs'] == 0
+    assert fanout['errors'] == ['align: scatters dimension 2, inputs have 1 dimensions']
+
+    # gather from a step that is not scattered, scatter on an input with lower dimensionality
+    workflows['joint']['input']['input_0']['gather'] = 2
+    data['input']['input_files']['dimensionality'] = 1
+    report = metaworkflow_dag.MetaWorkflowDAG(data).analyze([30, 24])
+    assert report['valid'] is False
+    assert 'align: argument input_file scatters dimension 2 of input input_files with dimensionality 1' in report['errors']
+    assert 'joint: gathers 2 dimensions from call, that is sharded on 1 dimensions' in report['errors']
+
+
+def test_fanout_gather_input():
+    """
+    """
+    data = _metaworkflow({'align': [], 'merge': ['align'], 'call': ['merge'], 'joint': ['call']})
+    data['input']['input_files']['dimensionality'] = 2
+    workflows = data['workflows']
+    workflows['align']['input']['input_file']['scatter'] = 2
+    # gather the shards into a run for each sample
+    workflows['merge']['input']['input_0']['gather'] = 1
+    # gather_input collects the input from all the samples, without reducing the scatter
+    workflows['call']['input']['input_0']['gather_input'] = 1
+    workflows['call']['input']['input_file']['input_dimension'] = 1
+    workflows['joint']['input']['input_0']['gather'] = 1
+    workflows['joint']['input']['input_0']['extra_dimension'] = 1
+    dag = metaworkflow_dag.MetaWorkflowDAG(data)
+
+    fanout = dag.fanout([3, 2])
+    assert fanout['errors'] == []
+    assert {s: v['runs'] for s, v in fanout['steps'].items()} == {'align': 6, 'merge': 3, 'call': 3, 'joint': 1}
+    assert fanout['steps']['call']['gather_input'] == ['merge']
+    # same runs as magma
+    report = run_simulation.dry_run(dag, [3, 2], run_simulation.parse_durations([]))
+    assert report['errors'] == []
+    assert {s: v['runs'] for s, v in report['steps'].items()} == {'align': 6, 'merge': 3, 'call': 3, 'joint': 1}
+
+    # input_dimension on top of scatter beyond the dimensions of the input,
+    #   gather_input from a step that is not sharded enough, gather and gather_input together
+    workflows['call']['input']['input_file']['input_dimension'] = 3
+    workflows['call']['input']['input_0']['gather_input'] = 2
+    workflows['call']['input']['input_1'] = {'argument_type': 'file.bam', 'source': 'align', 'source_argument_name': 'output', 'gather': 1}
+    errors = metaworkflow_dag.MetaWorkflowDAG(data).fanout([3, 2])['errors']
+    assert errors == [
+        'call: argument input_file subsets dimension 3 with input_dimension 3 of input input_files with dimensionality 2',
+        'call: gather and gather_input cannot be used in the same step',
+        'call: gathers 2 dimensions from merge, that is sharded on 1 dimensions'
+    ]
@@ -0,0 +1,75 @@
+#################################################################
+#   Libraries
+#################################################################
+import sys, os
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+import generator
+import bench_deploy
+import bench_memory
+from pipeline_utils import validate
+from pipeline_utils.lib import portal_objects
+
+#################################################################
+#   Tests
+#################################################################
+def test_generate_repo(tmp_path):
+    """
+    """
+    repo = generator.generate_repo(str(tmp_path / 'repo'), softwares=3, workflows=2, metaworkflows=2,
+                                   steps=3, shards=4, reference_files=5, file_formats=2)
+    files = portal_objects.portal_files(repo)
+    assert len(files) == 7
+    reports = validate.validate_files(files, jobs=1)
+    assert all(r['valid'] for r in reports)
+    n_documents = {r['type']: len(r['documents']) for r in reports if r['type'] in portal_objects.FILE_TYPES.values()}
+    assert n_documents == {'Software': 3, 'FileFormat': 2, 'ReferenceFile': 5}
+    assert os.path.isfile(f'{repo}/descriptions/workflow-1.wdl')
+
+def test_scaling_compare():
+    """
+    """
+    results = {
+        '1': {'load_yaml': {'seconds': 1.0, 'items': 10, 'per_item': 0.1}},
+        '4': {'load_yaml': {'seconds': 4.0, 'items': 40, 'per_item': 0.1}}
+    }
+    assert bench_deploy.scaling(results, [1, 4]) == {'load_yaml': pytest.approx(1.0)}
+
+    baseline = {'4': {'load_yaml': {'seconds': 2.0}}}
+    assert bench_deploy.compare(results, baseline, tolerance=0.5) == [('4', 'load_yaml', 4.0, 2.0)]
+    assert bench_deploy.compare(results, baseline, tolerance=1.0) == []
+
+    # scaling exponents do not depend on the machine, a baseline 10x faster is not a regression
+    baseline = {
+        '1': {'load_yaml': {'seconds': 0.1}},
+        '4': {'load_yaml': {'seconds': 0.4}}
+    }
+    assert bench_deploy.compare_scaling(results, baseline, [1, 4]) == []
+    baseline['4']['load_yaml']['seconds'] = 0.2
+    assert bench_deploy.compare_scaling(results, baseline, [1, 4], tolerance=0.25) == [('load_yaml', pytest.approx(1.0), pytest.approx(0.5))]
+    assert bench_deploy.compare_scaling(results, baseline, [1, 4], min_seconds=10.0) == []
+    assert bench_deploy.compare_scaling(results, {'1': baseline['1']}, [1, 4]) == []
+
+def test_deploy_args():
+    """
+    """
+    args = bench_deploy.deploy_args('repo', 'keys.json', verbose=True)
+    assert args.repos == ['repo'] and args.keydicts_json == 'keys.json'
+    assert args.post_software and args.post_metaworkflow and args.debug and args.verbose
+    assert not args.post_ecr and not args.parallel_phases
+    assert args.consortia == ['smaht'] and args.submission_centers == ['smaht_dac']
+
+def test_memory_budgets():
+    """
+    """
+    result, retained, peak = bench_memory.measure(lambda: [bytearray(1024) for _ in range(100)])
+    assert len(result) == 100
+    assert retained >= 100 * 1024
+    assert peak >= retained
+
+    results = {'1': {'validate:Software': {'retained': 10, 'peak': 1000, 'items': 10, 'peak_per_item': 100.0}}}
+    budgets = bench_memory.make_budgets(results, headroom=2.0)
+    assert budgets == {'1': {'validate:Software': 2000}}
+    assert bench_memory.check_budgets(results, budgets) == []
+    assert bench_memory.check_budgets(results, {'1': {'validate:Software': 500}}) == [('1', 'validate:Software', 1000, 500)]
@@ -0,0 +1,47 @@
+#################################################################
+#   Libraries
+#################################################################
+import sys, os
+import time
+import pytest
+from dcicutils.codebuild_utils import CodeBuildUtils
+from pipeline_utils.lib.codebuild_local import LocalCodeBuildClient
+
+#################################################################
+#   Tests
+#################################################################
+def test_local_codebuild():
+    """
+    """
+    def runner(env):
+        if env['IMAGE_REPO_NAME'] == 'foo':
+            raise Exception('build failed')
+
+    client = LocalCodeBuildClient(['builder'], runner=runner)
+    codebuild = CodeBuildUtils(client=client)
+    assert codebuild.list_projects() == ['builder']
+    assert client.batch_get_projects(names=['builder', 'missing']) == {
+        'projects': [{'name': 'builder'}], 'projectsNotFound': ['missing']
+    }
+
+    ids = []
+    for fn in ['foo', 'bar']:
+        response = codebuild.run_project_build_with_overrides(
+            project_name='builder',
+            branch='main',
+            env_overrides={'IMAGE_REPO_NAME': fn, 'IMAGE_TAG': 'v1.0.0', 'BUILD_PATH': f'dockerfiles/{fn}'}
+        )
+        assert response['build']['projectName'] == 'builder'
+        assert response['build']['sourceVersion'] == 'main'
+        ids.append(response['build']['id'])
+
+    builds = client.batch_get_builds(ids=ids + ['missing'])
+    while any(b['buildStatus'] == 'IN_PROGRESS' for b in builds['builds']):
+        time.sleep(0.01)
+        builds = client.batch_get_builds(ids=ids + ['missing'])
+    assert [b['buildStatus'] for b in builds['builds']] == ['FAILED', 'SUCCEEDED']
+    assert all(b['endTime'] >= b['startTime'] for b in builds['builds'])
+    assert builds['buildsNotFound'] == ['missing']
+
+    with pytest.raises(ValueError):
+        codebuild.run_project_build(project_name='missing')
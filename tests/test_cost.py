@@ -0,0 +1,116 @@
+#################################################################
+#   Libraries
+#################################################################
+import sys, os
+import json
+import copy
+import argparse
+import pytest
+from pipeline_utils import cost
+from pipeline_utils.lib import cost_model
+from pipeline_utils.lib import metaworkflow_dag
+
+#################################################################
+#   Variables
+#################################################################
+PRICES = {
+    'instances': {
+        'm5.xlarge': {'vcpus': 4, 'price': 0.2},
+        'c5.4xlarge': {'vcpus': 16, 'price': 0.68}
+    },
+    'ebs_gb_month': 73,
+    'hours': {'default': 1, 'call': 2}
+}
+
+METAWORKFLOW = {
+    'name': 'test-pipeline',
+    'description': 'test pipeline',
+    'category': ['Alignment'],
+    'input': {'input_files': {'argument_type': 'file.bam', 'dimensionality': 2}},
+    'workflows': {
+        'align': {
+            'input': {'input_file': {'argument_type': 'file.bam', 'source_argument_name': 'input_files', 'scatter': 2}},
+            'config': {'ec2_type': 'c5.4xlarge', 'ebs_size': '2x'}
+        },
+        'call': {
+            'input': {'input_file': {'argument_type': 'file.bam', 'source': 'align', 'source_argument_name': 'bam', 'gather': 1}},
+            'config': {'ec2_type': 'm5.xlarge', 'ebs_size': 10}
+        },
+        'joint': {
+            'input': {'input_file': {'argument_type': 'file.vcf', 'source': 'call', 'source_argument_name': 'vcf', 'gather': 1}},
+            'config': {'ec2_type': 'm5.xlarge', 'ebs_size': '1.5x'}
+        }
+    }
+}
+
+#################################################################
+#   Tests
+#################################################################
+def test_ebs_size_gb():
+    """
+    """
+    assert cost_model.ebs_size_gb(50, 10) == 50
+    assert cost_model.ebs_size_gb('2x', 10) == 20
+    assert cost_model.ebs_size_gb('1.5x', 10) == 15
+    with pytest.raises(ValueError):
+        cost_model.ebs_size_gb('2GB', 10)
+
+def test_load_prices(tmp_path):
+    """
+    """
+    prices = tmp_path / 'prices.yaml'
+    prices.write_text('instances:\n  m5.xlarge:\n    vcpus: 4\n    price: 0.2\n')
+    assert cost_model.load_prices(str(prices))['hours'] == {'default': 1}
+    prices.write_text('instances:\n  m5.xlarge:\n    vcpus: 4\n')
+    with pytest.raises(ValueError):
+        cost_model.load_prices(str(prices))
+
+def test_estimate():
+    """
+    """
+    dag = metaworkflow_dag.MetaWorkflowDAG(METAWORKFLOW)
+    estimate = cost_model.estimate(dag, [10, 4], PRICES, 100)
+    assert estimate['errors'] == []
+    steps = estimate['steps']
+    # align, 40 runs with a quarter of a sample each
+    assert steps['align']['runs'] == 40
+    assert steps['align']['ebs_gb'] == 50
+    assert steps['align']['vcpu_hours'] == 40 * 16
+    assert steps['align']['dollars'] == pytest.approx(40 * (0.68 + 50 * 0.1))
+    # call, 10 runs of 2 hours
+    assert steps['call']['runs'] == 10
+    assert steps['call']['ebs_gb_hours'] == 10 * 10 * 2
+    # joint, a single run with all the samples
+    assert steps['joint']['ebs_gb'] == 1500
+    assert estimate['total']['runs'] == 51
+    assert estimate['total']['vcpu_hours'] == 640 + 80 + 4
+
+    prices = copy.deepcopy(PRICES)
+    del prices['instances']['m5.xlarge']
+    assert 'call: instance type m5.xlarge not in price table' in cost_model.estimate(dag, [10, 4], prices, 100)['errors']
+
+def test_cost(tmp_path, capsys):
+    """
+    """
+    prices = tmp_path / 'prices.json'
+    prices.write_text(json.dumps(PRICES))
+    previous = tmp_path / 'previous.yaml'
+    previous.write_text(json.dumps(METAWORKFLOW))
+    current = copy.deepcopy(METAWORKFLOW)
+    current['workflows']['call']['config']['ec2_type'] = 'c5.4xlarge'
+    current_file = tmp_path / 'current.yaml'
+    current_file.write_text(json.dumps(current))
+
+    args = argparse.Namespace(files=[str(previous)], dimensions=[10, 4], prices=str(prices),
+                              input_size=100, compare=[str(previous)], tolerance=0.1, json=True)
+    cost.main(args)
+    output = json.loads(capsys.readouterr().out)
+    assert output['estimates'][0]['total']['runs'] == 51
+    assert output['increases'] == []
+
+    args.files = [str(current_file)]
+    args.tolerance = 0.01
+    with pytest.raises(SystemExit):
+        cost.main(args)
+    output = json.loads(capsys.readouterr().out)
+    assert {i['metric'] for i in output['increases']} == {'vcpu_hours', 'dollars'}
@@ -0,0 +1,97 @@
+#################################################################
+#   Libraries
+#################################################################
+import sys, os
+import shutil
+import pytest
+from pipeline_utils.lib import docker_utils
+
+#################################################################
+#   Tests
+#################################################################
+def test_context_hash(tmp_path):
+    """
+    """
+    context = tmp_path / 'bar'
+    shutil.copytree('tests/repo_correct/dockerfiles/bar', context)
+    hash_ = docker_utils.context_hash(context)
+
+    # same content in a different location
+    shutil.copytree(context, tmp_path / 'foo')
+    assert docker_utils.context_hash(tmp_path / 'foo') == hash_
+    assert docker_utils.context_tag(tmp_path / 'foo') == f'context-{hash_}'
+
+    # new file in a subfolder
+    os.mkdir(context / 'scripts')
+    (context / 'scripts' / 'run.sh').write_text('echo run\n')
+    hash_new = docker_utils.context_hash(context)
+    assert hash_new != hash_
+
+    # renamed file
+    (context / 'scripts' / 'run.sh').rename(context / 'scripts' / 'start.sh')
+    assert docker_utils.context_hash(context) not in [hash_, hash_new]
+
+
+def _dockerfile(path, content):
+    """Helper to write a Dockerfile in path.
+    """
+    os.makedirs(path, exist_ok=True)
+    (path / 'Dockerfile').write_text(content)
+
+
+def test_from_images(tmp_path):
+    """
+    """
+    assert docker_utils.from_images('tests/repo_correct/dockerfiles/bar/Dockerfile') == ['ubuntu:20.04']
+
+    _dockerfile(tmp_path, '\n'.join([
+        '# multi-stage build',
+        'ARG ACCOUNT=000000000000.dkr.ecr.us-east-1.amazonaws.com',
+        'ARG VERSION="v1.0.0"',
+        'FROM --platform=linux/amd64 ${ACCOUNT}/base:${VERSION} AS builder',
+        'RUN make \\',
+        '    install',
+        'FROM $ACCOUNT/tools:${TAG:-latest}',
+        'COPY --from=builder /usr/local/bin /usr/local/bin',
+        'FROM builder',
+        'from python:3.11'
+    ]))
+    assert docker_utils.from_images(tmp_path / 'Dockerfile') == [
+        '000000000000.dkr.ecr.us-east-1.amazonaws.com/base:v1.0.0',
+        '000000000000.dkr.ecr.us-east-1.amazonaws.com/tools:latest',
+        'python:3.11'
+    ]
+
+
+def test_image_name():
+    """
+    """
+    assert docker_utils.image_name('ubuntu') == 'ubuntu'
+    assert docker_utils.image_name('ubuntu:20.04') == 'ubuntu'
+    assert docker_utils.image_name('000000000000.dkr.ecr.us-east-1.amazonaws.com/base:v1.0.0') == 'base'
+    assert docker_utils.image_name('localhost:5000/tools/base@sha256:0a1b') == 'base'
+
+
+def test_build_graph(tmp_path):
+    """
+    """
+    _dockerfile(tmp_path / 'base', 'FROM ubuntu:20.04\n')
+    _dockerfile(tmp_path / 'tools', 'FROM ACCOUNT/base:VERSION\n')
+    _dockerfile(tmp_path / 'caller', 'FROM ACCOUNT/tools:VERSION AS build\nFROM ACCOUNT/base:VERSION\n')
+    _dockerfile(tmp_path / 'other', 'FROM python:3.11\n')
+    (tmp_path / 'README.md').write_text('not an image')
+
+    graph = docker_utils.build_graph(tmp_path)
+    assert graph == {
+        'base': set(),
+        'caller': {'base', 'tools'},
+        'other': set(),
+        'tools': {'base'}
+    }
+    assert docker_utils.build_waves(graph) == [['base', 'other'], ['tools'], ['caller']]
+
+    # circular dependencies
+    _dockerfile(tmp_path / 'base', 'FROM ACCOUNT/caller:VERSION\n')
+    with pytest.raises(ValueError) as e:
+        docker_utils.build_waves(docker_utils.build_graph(tmp_path))
+    assert 'base, caller, tools' in str(e.value)
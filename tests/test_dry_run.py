@@ -0,0 +1,101 @@
+#################################################################
+#   Libraries
+#################################################################
+import sys, os
+import json
+import copy
+import argparse
+import pytest
+from pipeline_utils import dry_run
+from pipeline_utils.lib import run_simulation
+from pipeline_utils.lib import metaworkflow_dag
+
+#################################################################
+#   Variables
+#################################################################
+METAWORKFLOW = {
+    'name': 'test-pipeline',
+    'description': 'test pipeline',
+    'category': ['Alignment'],
+    'input': {'input_files': {'argument_type': 'file.bam', 'dimensionality': 2}},
+    'workflows': {
+        'align': {
+            'input': {'input_file': {'argument_type': 'file.bam', 'source_argument_name': 'input_files', 'scatter': 2}},
+            'config': {'ec2_type': 'c5.4xlarge', 'ebs_size': '2x'}
+        },
+        'call': {
+            'input': {'input_file': {'argument_type': 'file.bam', 'source': 'align', 'source_argument_name': 'bam', 'gather': 1}},
+            'config': {'ec2_type': 'm5.xlarge', 'ebs_size': 10}
+        },
+        'joint': {
+            'input': {'input_file': {'argument_type': 'file.vcf', 'source': 'call', 'source_argument_name': 'vcf', 'gather': 1}},
+            'config': {'ec2_type': 'm5.xlarge', 'ebs_size': '1.5x'}
+        }
+    }
+}
+
+#################################################################
+#   Tests
+#################################################################
+def test_parse_durations():
+    """
+    """
+    assert run_simulation.parse_durations(None) == {'default': 1.0}
+    assert run_simulation.parse_durations(['align=2.5', 'default=0.5']) == {'default': 0.5, 'align': 2.5}
+    for value in ['align', '=2', 'align=fast']:
+        with pytest.raises(ValueError):
+            run_simulation.parse_durations([value])
+
+def test_input_structure():
+    """
+    """
+    assert run_simulation.input_structure([2]) == ['input:0', 'input:1']
+    assert run_simulation.input_structure([2, 1, 2]) == [[['input:0:0:0', 'input:0:0:1']], [['input:1:0:0', 'input:1:0:1']]]
+    with pytest.raises(ValueError):
+        run_simulation.input_structure([2, 2, 2, 2])
+
+def test_dry_run():
+    """
+    """
+    dag = metaworkflow_dag.MetaWorkflowDAG(METAWORKFLOW)
+    durations = run_simulation.parse_durations(['align=2', 'call=3'])
+    report = run_simulation.dry_run(dag, [3, 4], durations)
+    assert report['errors'] == []
+    assert report['runs'] == 12 + 3 + 1
+    assert report['final_status'] == 'completed'
+    assert report['steps'] == {
+        'align': {'runs': 12, 'start': 0, 'end': 2},
+        'call': {'runs': 3, 'start': 2, 'end': 5},
+        'joint': {'runs': 1, 'start': 5, 'end': 6}
+    }
+    assert report['hours'] == 6
+    assert [run['step'] for run in report['order']] == ['align'] * 12 + ['call'] * 3 + ['joint']
+    assert report['write_run_seconds'] >= 0
+
+    # runs are queued when parallelism is limited
+    report = run_simulation.dry_run(dag, [3, 4], durations, max_parallel=5)
+    assert report['steps']['align'] == {'runs': 12, 'start': 0, 'end': 6}
+    assert report['hours'] == 6 + 3 + 1
+    assert max(sum(1 for r in report['order'] if r['start'] <= t < r['end']) for t in range(10)) == 5
+
+def test_dry_run_command(tmp_path, capsys):
+    """
+    """
+    file = tmp_path / 'metaworkflow.yaml'
+    file.write_text(json.dumps(METAWORKFLOW))
+    args = argparse.Namespace(files=[str(file)], dimensions=[2, 2], durations=None, max_parallel=None, json=True)
+    dry_run.main(args)
+    reports = json.loads(capsys.readouterr().out)
+    assert reports[0]['runs'] == 4 + 2 + 1
+    assert reports[0]['hours'] == 3
+
+    data = copy.deepcopy(METAWORKFLOW)
+    data['workflows']['call']['dependencies'] = ['joint']
+    file.write_text(json.dumps(data))
+    args.json = False
+    with pytest.raises(SystemExit):
+        dry_run.main(args)
+
+    args.dimensions = [2, 2, 2, 2]
+    with pytest.raises(SystemExit):
+        dry_run.main(args)
@@ -0,0 +1,46 @@
+#################################################################
+#   Libraries
+#################################################################
+import sys, os
+import json
+import pytest
+from pipeline_utils.lib.metrics import Metrics
+
+#################################################################
+#   Tests
+#################################################################
+def test_metrics(tmp_path):
+    """
+    """
+    metrics = Metrics()
+    metrics.count('Software', 'created')
+    metrics.count('Software', 'created')
+    metrics.count('Software', 'patched')
+    metrics.count('WFL', 'skipped')
+    for seconds in [0.005, 0.02, 0.02, 0.3, 2]:
+        metrics.observe('portal_write', seconds, bytes_sent=100)
+
+    summary = metrics.summary()
+    assert summary['objects'] == {'Software': {'created': 2, 'patched': 1}, 'WFL': {'skipped': 1}}
+    latency = summary['latency']['portal_write']
+    assert latency['count'] == 5
+    assert latency['bytes'] == 500
+    assert latency['min'] == 0.005
+    assert latency['max'] == 2
+    # estimated from the buckets
+    assert latency['p50'] == 0.025
+    assert latency['p95'] == 2
+    buckets = {b['le']: b['count'] for b in latency['buckets']}
+    assert buckets[0.01] == 1
+    assert buckets[0.025] == 3
+    assert buckets['+Inf'] == 5
+
+    lines = metrics.table().split('\n')
+    assert lines[0].split() == ['type', 'created', 'patched', 'skipped']
+    assert lines[1].split() == ['Software', '2', '1', '0']
+    assert lines[2].split() == ['WFL', '0', '0', '1']
+    assert lines[5].split()[:2] == ['portal_write', '5']
+
+    metrics.write_json(tmp_path / 'metrics.json')
+    with open(tmp_path / 'metrics.json') as f:
+        assert json.load(f) == summary
@@ -2,4 +2,799 @@
 #   Libraries
 #################################################################
 import sys, os
+import io
+import subprocess
+import json
+import shutil
+import threading
+import argparse
+import pstats
 import pytest
+from botocore.exceptions import ClientError
+from dcicutils.codebuild_utils import CodeBuildUtils
+from pipeline_utils import pipeline_deploy
+from pipeline_utils import __main__ as cli
+from pipeline_utils.lib.codebuild_local import LocalCodeBuildClient
+
+#################################################################
+#   Helpers
+#################################################################
+class FakeS3Client(object):
+    """In-memory stand-in for the boto3 S3 client.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.requests = []
+
+    def get_object(self, Bucket, Key):
+        self.requests.append(('get_object', Key))
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        return {'Body': io.BytesIO(self.objects[(Bucket, Key)]['Body'])}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.requests.append(('put_object', Key))
+        if isinstance(Body, str):
+            Body = Body.encode()
+        self.objects[(Bucket, Key)] = {'Body': Body, **kwargs}
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None):
+        self.requests.append(('upload_file', Key))
+        with open(Filename, 'rb') as f:
+            self.objects[(Bucket, Key)] = {'Body': f.read(), **(ExtraArgs or {})}
+
+
+class FakeS3Resource(object):
+    """In-memory stand-in for the boto3 S3 resource.
+    """
+
+    def __init__(self, client):
+        self.meta = argparse.Namespace(client=client)
+
+
+class FakeECRClient(object):
+    """In-memory stand-in for the boto3 ECR client.
+    """
+
+    def __init__(self, repositories, page_size=1):
+        self.repositories = list(repositories)
+        self.page_size = page_size
+        self.images = {} # {(repository, tag): manifest}
+        self.requests = []
+
+    def get_paginator(self, operation):
+        return argparse.Namespace(paginate=getattr(self, f'_{operation}'))
+
+    def _describe_repositories(self):
+        self.requests.append(('describe_repositories',))
+        for i in range(0, len(self.repositories), self.page_size):
+            yield {'repositories': [
+                {'repositoryName': name, 'repositoryArn': f'arn:aws:ecr:us-east-1:000000000000:repository/{name}'}
+                for name in self.repositories[i:i + self.page_size]
+            ]}
+
+    def _describe_images(self, repositoryName, filter):
+        self.requests.append(('describe_images', repositoryName))
+        images = {}
+        # images are pushed in insertion order
+        for i, ((repository, tag), manifest) in enumerate(self.images.items()):
+            if repository == repositoryName:
+                images.setdefault(manifest, {'imageTags': [], 'imagePushedAt': i})
+                images[manifest]['imageTags'].append(tag)
+        for image in images.values():
+            yield {'imageDetails': [image]}
+
+    def create_repository(self, repositoryName):
+        self.requests.append(('create_repository', repositoryName))
+        self.repositories.append(repositoryName)
+
+    def batch_get_image(self, repositoryName, imageIds):
+        images = []
+        for image_id in imageIds:
+            manifest = self.images.get((repositoryName, image_id['imageTag']))
+            if manifest:
+                images.append({'imageId': image_id, 'imageManifest': manifest,
+                               'imageManifestMediaType': 'application/vnd.docker.distribution.manifest.v2+json'})
+        return {'images': images, 'failures': []}
+
+    def put_image(self, repositoryName, imageManifest, imageManifestMediaType, imageTag):
+        self.requests.append(('put_image', repositoryName, imageTag))
+        if self.images.get((repositoryName, imageTag)) == imageManifest:
+            raise ClientError({'Error': {'Code': 'ImageAlreadyExistsException'}}, 'PutImage')
+        self.images[(repositoryName, imageTag)] = imageManifest
+
+
+class FakeCodeBuildClient(object):
+    """In-memory stand-in for the boto3 CodeBuild client.
+    """
+
+    def __init__(self, projects):
+        self.projects = projects
+        self.requests = []
+
+    def batch_get_projects(self, names):
+        self.requests.append(('batch_get_projects', names))
+        return {
+            'projects': [{'name': n} for n in names if n in self.projects],
+            'projectsNotFound': [n for n in names if n not in self.projects]
+        }
+
+    def start_build(self, **kwargs):
+        self.requests.append(('start_build', kwargs))
+        return {'build': {'id': f'{kwargs["projectName"]}:{len(self.requests)}'}}
+
+
+def _args(tmp_path, **kwargs):
+    """Create command line arguments for pipeline_deploy,
+    with the defaults from the command line parser.
+    """
+    keydicts_json = tmp_path / 'keys.json'
+    keydicts_json.write_text(json.dumps({
+        'test-env': {'key': 'XXXXXXXX', 'secret': 'xxxxxxxxxxxxxxxx', 'server': 'http://localhost'}
+    }))
+    parser, _ = cli.build_parser()
+    args = parser.parse_args([
+        'pipeline_deploy', '--ff-env', 'test-env', '--repos', '.',
+        '--keydicts-json', str(keydicts_json), '--wfl-bucket', 'BUCKETCWL',
+        '--account', '000000000000', '--region', 'us-east-1', '--build-poll-interval', '0'
+    ])
+    args.repos = []
+    for key, value in kwargs.items():
+        setattr(args, key, value)
+    return args
+
+
+def _git(repo, *args):
+    """Run a git command in repo.
+    """
+    subprocess.run(['git', '-C', repo, '-c', 'user.name=test', '-c', 'user.email=test@test'] + list(args),
+                   check=True, capture_output=True)
+
+
+def _git_commit(repo, branch='main'):
+    """Commit all the files in repo to branch, creating the git repository if needed.
+    """
+    if not os.path.isdir(f'{repo}/.git'):
+        _git(repo, 'init')
+    _git(repo, 'checkout', '-B', branch)
+    _git(repo, 'add', '-A')
+    _git(repo, 'commit', '--allow-empty', '-m', branch)
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """Copy of repo_correct that can be modified by the tests.
+    """
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    repo_ = tmp_path / 'repo_correct'
+    shutil.copytree('tests/repo_correct', repo_)
+    return str(repo_)
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    """Patch boto3 to use an in-memory S3 client.
+    """
+    client = FakeS3Client()
+    monkeypatch.setattr(pipeline_deploy.boto3, 'resource', lambda service: FakeS3Resource(client))
+    return client
+
+
+@pytest.fixture
+def ecr_client(monkeypatch):
+    """Patch boto3 to use an in-memory ECR client.
+    """
+    client = FakeECRClient(['bar', 'other-1', 'other-2', 'other-3'])
+    client_ = pipeline_deploy.boto3.client
+    monkeypatch.setattr(pipeline_deploy.boto3, 'client',
+        lambda service, **kwargs: client if service == 'ecr' else client_(service, **kwargs))
+    return client
+
+#################################################################
+#   Tests
+#################################################################
+def test_post_patch_documents(tmp_path, repo, monkeypatch):
+    """
+    """
+    posted = []
+    monkeypatch.setattr(pipeline_deploy.PostPatchRepo, '_post_patch_json', lambda self, d_, type: posted.append(d_['aliases'][0]))
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path), repo)
+    pprepo._post_patch_file('Software')
+    assert posted[:2] == ['smaht:Software-gatk_4.1.2', 'smaht:Software-picard_324ePT']
+
+    # documents are validated before any object is posted
+    posted.clear()
+    with open(f'{repo}/portal_objects/software.yaml', 'a') as f:
+        f.write('\n---\nname: invalid\n')
+    with pytest.raises(pipeline_deploy.yaml_parser.ValidationError):
+        pprepo._post_patch_file('Software')
+    assert posted == []
+
+
+def test_post_patch_wfl(tmp_path, repo, s3_client):
+    """
+    """
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path), repo)
+    pprepo._post_patch_wfl()
+
+    uploaded = sorted(k for (_, k) in s3_client.objects)
+    assert uploaded == [
+        'test_pipeline/v1.0.0/.manifest.json',
+        'test_pipeline/v1.0.0/gatk-HaplotypeCaller-check.cwl',
+        'test_pipeline/v1.0.0/gatk-HaplotypeCaller.wdl',
+        'test_pipeline/v1.0.0/integrity-check.wdl',
+        'test_pipeline/v1.0.0/workflow_gatk-HaplotypeCaller-check.wdl'
+    ]
+    # placeholders are replaced
+    body = s3_client.objects[('BUCKETCWL', 'test_pipeline/v1.0.0/gatk-HaplotypeCaller.wdl')]['Body'].decode()
+    assert 'docker: "000000000000.dkr.ecr.us-east-1.amazonaws.com/gatk:v1.0.0"' in body
+    # content hash is stored in metadata and manifest
+    manifest = json.loads(s3_client.objects[('BUCKETCWL', 'test_pipeline/v1.0.0/.manifest.json')]['Body'])
+    for fn, sha256 in manifest['files'].items():
+        assert s3_client.objects[('BUCKETCWL', f'test_pipeline/v1.0.0/{fn}')]['Metadata'] == {'sha256': sha256}
+    # tmp folder is cleaned
+    assert not os.path.isdir(f'{repo}/descriptions/upload')
+
+
+def test_post_patch_wfl_unchanged(tmp_path, repo, s3_client):
+    """
+    """
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path), repo)
+    pprepo._post_patch_wfl()
+
+    # version already complete, single request to read the manifest
+    s3_client.requests = []
+    pprepo._post_patch_wfl()
+    assert s3_client.requests == [('get_object', 'test_pipeline/v1.0.0/.manifest.json')]
+
+    # only the modified file is uploaded
+    with open(f'{repo}/descriptions/integrity-check.wdl', 'a') as f:
+        f.write('\n')
+    s3_client.requests = []
+    pprepo._post_patch_wfl()
+    assert s3_client.requests == [
+        ('get_object', 'test_pipeline/v1.0.0/.manifest.json'),
+        ('upload_file', 'test_pipeline/v1.0.0/integrity-check.wdl'),
+        ('put_object', 'test_pipeline/v1.0.0/.manifest.json')
+    ]
+
+    # force upload
+    pprepo.force_wfl = True
+    s3_client.requests = []
+    pprepo._post_patch_wfl()
+    assert len([r for r in s3_client.requests if r[0] == 'upload_file']) == 4
+    assert ('get_object', 'test_pipeline/v1.0.0/.manifest.json') not in s3_client.requests
+
+
+def test_post_patch_wfl_debug(tmp_path, repo, s3_client):
+    """
+    """
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path, debug=True), repo)
+    pprepo._post_patch_wfl()
+    assert s3_client.requests == []
+
+
+def test_wfl_closure(tmp_path, repo):
+    """
+    """
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path), repo)
+    filepath_ = f'{repo}/descriptions'
+
+    # child files of A_gatk-HC and main file of B_minimal-gatk-HC
+    assert pprepo._wfl_closure(filepath_) == {
+        'workflow_gatk-HaplotypeCaller-check.wdl',
+        'gatk-HaplotypeCaller.wdl',
+        'integrity-check.wdl',
+        'gatk-HaplotypeCaller-check.cwl'
+    }
+
+    # files imported by description files are followed
+    with open(f'{repo}/portal_objects/workflows/A_gatk-HC.yaml') as f:
+        workflow = f.read()
+    with open(f'{repo}/portal_objects/workflows/A_gatk-HC.yaml', 'w') as f:
+        f.write(workflow.replace('  child:\n    - gatk-HaplotypeCaller.wdl\n    - integrity-check.wdl\n', ''))
+    with open(f'{repo}/descriptions/gatk-HaplotypeCaller-check.cwl', 'a') as f:
+        f.write('\nsteps:\n  - id: check\n    run: missing-tool.cwl\n')
+    assert pprepo._wfl_closure(filepath_) == {
+        'workflow_gatk-HaplotypeCaller-check.wdl',
+        'gatk-HaplotypeCaller.wdl',
+        'integrity-check.wdl',
+        'gatk-HaplotypeCaller-check.cwl',
+        'missing-tool.cwl'
+    }
+
+    # no Workflow objects
+    shutil.rmtree(f'{repo}/portal_objects/workflows')
+    assert pprepo._wfl_closure(filepath_) is None
+
+
+def test_post_patch_wfl_closure(tmp_path, repo, s3_client):
+    """
+    """
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path), repo)
+    pprepo._post_patch_wfl()
+    # unused-tool.cwl is not used by any Workflow object
+    assert ('BUCKETCWL', 'test_pipeline/v1.0.0/unused-tool.cwl') not in s3_client.objects
+
+    # all files are uploaded if there are no Workflow objects
+    shutil.rmtree(f'{repo}/portal_objects/workflows')
+    pprepo._post_patch_wfl()
+    assert ('BUCKETCWL', 'test_pipeline/v1.0.0/unused-tool.cwl') in s3_client.objects
+
+
+def test_post_patch_ecr(tmp_path, repo, ecr_client):
+    """
+    """
+    for fn in ['foo', 'baz']:
+        os.mkdir(f'{repo}/dockerfiles/{fn}')
+        shutil.copy(f'{repo}/dockerfiles/bar/Dockerfile', f'{repo}/dockerfiles/{fn}/Dockerfile')
+    with open(f'{repo}/dockerfiles/README.md', 'w') as f:
+        f.write('not an image')
+
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path), repo)
+    codebuild = FakeCodeBuildClient(['test-env-pipeline-builder'])
+    pprepo._codebuild = CodeBuildUtils(client=codebuild)
+    pprepo._post_patch_ecr()
+
+    # repositories past the first page are found, only missing ones are created
+    assert ecr_client.requests == [
+        ('describe_repositories',),
+        ('create_repository', 'baz'),
+        ('create_repository', 'foo')
+    ]
+    # single lookup for the builder
+    assert codebuild.requests[0] == ('batch_get_projects', ['test-env-pipeline-builder'])
+    builds = [r[1] for r in codebuild.requests[1:]]
+    assert [b['projectName'] for b in builds] == ['test-env-pipeline-builder'] * 3
+    assert [b['environmentVariablesOverride'][0]['value'] for b in builds] == ['bar', 'baz', 'foo']
+
+
+def test_post_patch_ecr_no_builder(tmp_path, repo, ecr_client):
+    """
+    """
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path, builder='missing-builder'), repo)
+    codebuild = FakeCodeBuildClient(['test-env-pipeline-builder'])
+    pprepo._codebuild = CodeBuildUtils(client=codebuild)
+    pprepo._post_patch_ecr()
+
+    assert codebuild.requests == [('batch_get_projects', ['missing-builder'])]
+
+
+def test_post_patch_ecr_debug(tmp_path, repo, ecr_client):
+    """
+    """
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path, debug=True), repo)
+    codebuild = FakeCodeBuildClient(['test-env-pipeline-builder'])
+    pprepo._codebuild = CodeBuildUtils(client=codebuild)
+    pprepo._post_patch_ecr()
+
+    assert ecr_client.requests == []
+    assert codebuild.requests == []
+
+
+def test_post_patch_ecr_wait_builds(tmp_path, repo, ecr_client):
+    """
+    """
+    os.mkdir(f'{repo}/dockerfiles/foo')
+    shutil.copy(f'{repo}/dockerfiles/bar/Dockerfile', f'{repo}/dockerfiles/foo/Dockerfile')
+
+    built = []
+    def runner(env):
+        built.append(env['IMAGE_REPO_NAME'])
+        assert env['IMAGE_TAG'] == 'v1.0.0'
+
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path, wait_builds=True), repo)
+    pprepo._codebuild = CodeBuildUtils(client=LocalCodeBuildClient(['test-env-pipeline-builder'], runner=runner))
+    pprepo._post_patch_ecr()
+    assert sorted(built) == ['bar', 'foo']
+
+
+def test_post_patch_ecr_wait_builds_failed(tmp_path, repo, ecr_client, monkeypatch):
+    """
+    """
+    os.mkdir(f'{repo}/dockerfiles/foo')
+    shutil.copy(f'{repo}/dockerfiles/bar/Dockerfile', f'{repo}/dockerfiles/foo/Dockerfile')
+    # more builds than a single status request can handle
+    monkeypatch.setattr(pipeline_deploy, 'BATCH_GET_BUILDS_SIZE', 1)
+
+    def runner(env):
+        if env['IMAGE_REPO_NAME'] == 'foo':
+            raise Exception('build failed')
+
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path, wait_builds=True), repo)
+    pprepo._codebuild = CodeBuildUtils(client=LocalCodeBuildClient(['test-env-pipeline-builder'], runner=runner))
+    with pytest.raises(SystemExit):
+        pprepo._post_patch_ecr()
+
+
+def test_post_patch_ecr_context(tmp_path, repo, ecr_client):
+    """
+    """
+    os.mkdir(f'{repo}/dockerfiles/foo')
+    shutil.copy(f'{repo}/dockerfiles/bar/Dockerfile', f'{repo}/dockerfiles/foo/Dockerfile')
+    _git_commit(repo)
+
+    built = []
+    def runner(env):
+        # push the image
+        built.append(env['IMAGE_REPO_NAME'])
+        ecr_client.images[(env['IMAGE_REPO_NAME'], env['IMAGE_TAG'])] = f'{env["IMAGE_REPO_NAME"]}-{len(built)}'
+
+    def deploy(**kwargs):
+        built.clear()
+        pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path, wait_builds=True, **kwargs), repo, version=kwargs.get('version'))
+        pprepo._codebuild = CodeBuildUtils(client=LocalCodeBuildClient(['test-env-pipeline-builder'], runner=runner))
+        pprepo._post_patch_ecr()
+
+    # images are built and tagged with the build context
+    deploy()
+    assert sorted(built) == ['bar', 'foo']
+    context_tags = [tag for (_, tag) in ecr_client.images if tag.startswith('context-')]
+    assert len(context_tags) == 2
+
+    # unchanged build context, existing images are tagged with the new version
+    deploy(version='v1.0.1')
+    assert built == []
+    assert ecr_client.images[('bar', 'v1.0.1')] == ecr_client.images[('bar', 'v1.0.0')]
+    assert ecr_client.images[('foo', 'v1.0.1')] == ecr_client.images[('foo', 'v1.0.0')]
+
+    # same version again, image already tagged
+    deploy(version='v1.0.1')
+    assert built == []
+
+    # only the changed image is built
+    with open(f'{repo}/dockerfiles/foo/Dockerfile', 'a') as f:
+        f.write('\nRUN echo foo\n')
+    _git_commit(repo)
+    deploy(version='v1.0.2')
+    assert built == ['foo']
+    assert ecr_client.images[('bar', 'v1.0.2')] == ecr_client.images[('bar', 'v1.0.0')]
+
+    # force rebuild
+    deploy(version='v1.0.3', rebuild_images=True)
+    assert sorted(built) == ['bar', 'foo']
+
+
+def test_post_patch_ecr_context_branch(tmp_path, repo, ecr_client):
+    """
+    """
+    built = []
+    def runner(env):
+        built.append(env['IMAGE_REPO_NAME'])
+        ecr_client.images[(env['IMAGE_REPO_NAME'], env['IMAGE_TAG'])] = f'{env["IMAGE_REPO_NAME"]}-{len(built)}'
+
+    def deploy(**kwargs):
+        built.clear()
+        pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path, wait_builds=True, **kwargs), repo, version=kwargs.get('version'))
+        pprepo._codebuild = CodeBuildUtils(client=LocalCodeBuildClient(['test-env-pipeline-builder'], runner=runner))
+        pprepo._post_patch_ecr()
+
+    def context_tags():
+        return sorted(tag for (_, tag) in ecr_client.images if tag.startswith('context-'))
+
+    # not a git repository, the build context is not used
+    deploy()
+    assert built == ['bar'] and context_tags() == []
+
+    # local tree on a branch that differs from the branch built by CodeBuild
+    _git_commit(repo)
+    with open(f'{repo}/dockerfiles/bar/Dockerfile', 'a') as f:
+        f.write('\nRUN echo dev\n')
+    _git_commit(repo, branch='dev')
+    deploy(version='v1.0.1')
+    assert built == ['bar'] and context_tags() == []
+
+    # same branch, the image is tagged with the build context
+    deploy(version='v1.0.2', branch='dev')
+    assert built == ['bar'] and len(context_tags()) == 1
+
+    # uncommitted changes, the image tagged with the context is not reused
+    with open(f'{repo}/dockerfiles/bar/Dockerfile', 'a') as f:
+        f.write('\nRUN echo dirty\n')
+    deploy(version='v1.0.3', branch='dev')
+    assert built == ['bar'] and len(context_tags()) == 1
+    _git(repo, 'checkout', '--', '.')
+
+    # untracked files
+    with open(f'{repo}/dockerfiles/bar/extra.txt', 'w') as f:
+        f.write('extra\n')
+    deploy(version='v1.0.4', branch='dev')
+    assert built == ['bar'] and len(context_tags()) == 1
+    os.remove(f'{repo}/dockerfiles/bar/extra.txt')
+
+    # clean tree, the image is reused
+    deploy(version='v1.0.5', branch='dev')
+    assert built == []
+
+
+def test_post_patch_ecr_local_build(tmp_path, repo, ecr_client, monkeypatch):
+    """
+    """
+    for fn, base in [('foo', 'bar'), ('baz', 'foo'), ('qux', 'bar')]:
+        os.mkdir(f'{repo}/dockerfiles/{fn}')
+        with open(f'{repo}/dockerfiles/{fn}/Dockerfile', 'w') as f:
+            f.write(f'FROM 000000000000.dkr.ecr.us-east-1.amazonaws.com/{base}:v1.0.0\n')
+
+    commands = []
+    monkeypatch.setattr(pipeline_deploy.subprocess, 'check_call', lambda command, shell: commands.append(('login', command)))
+    monkeypatch.setattr(pipeline_deploy.PostPatchRepo, '_run_prefixed', lambda self, fn, command: commands.append((fn, command)) or 0)
+
+    metrics = pipeline_deploy.metrics.Metrics()
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path, local_build=True), repo, metrics=metrics)
+    pprepo._post_patch_ecr()
+
+    # local builds have their own latency, separate from CodeBuild starts
+    latency = metrics.summary()['latency']
+    assert latency['local_build']['count'] == 4
+    assert 'build' not in latency
+
+    # login once, then images in dependency order
+    assert commands[0][0] == 'login'
+    order = [fn for fn, _ in commands[1:]]
+    assert order[0] == 'bar'
+    assert sorted(order[1:3]) == ['foo', 'qux']
+    assert order[3] == 'baz'
+    assert 'docker build -t 000000000000.dkr.ecr.us-east-1.amazonaws.com/bar:v1.0.0' in commands[1][1]
+
+
+def test_local_builds(tmp_path, repo):
+    """
+    """
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path, local_build=True), repo)
+    assert pprepo._run_prefixed('foo', 'echo line_1; echo line_2 >&2') == 0
+    assert pprepo._run_prefixed('foo', 'exit 3') == 3
+
+    # failed build stops the following waves
+    with pytest.raises(SystemExit):
+        pprepo._local_builds(
+            {'foo': f'touch {tmp_path}/foo', 'bar': 'exit 1', 'baz': f'touch {tmp_path}/baz'},
+            [['bar', 'foo'], ['baz']]
+        )
+    assert os.path.isfile(f'{tmp_path}/foo')
+    assert not os.path.isfile(f'{tmp_path}/baz')
+
+
+def test_post_patch_ecr_local_build_cache(tmp_path, repo, ecr_client, monkeypatch):
+    """
+    """
+    commands = {}
+    monkeypatch.setattr(pipeline_deploy.subprocess, 'check_call', lambda command, shell: None)
+    monkeypatch.setattr(pipeline_deploy.PostPatchRepo, '_run_prefixed', lambda self, fn, command: commands.update({fn: command}) or 0)
+    image_ = '000000000000.dkr.ecr.us-east-1.amazonaws.com/bar'
+
+    # no cache by default
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path, local_build=True), repo)
+    pprepo._post_patch_ecr()
+    assert '--no-cache' in commands['bar']
+    assert 'docker pull' not in commands['bar']
+
+    # no previous image
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path, local_build=True, build_cache=True), repo)
+    pprepo._post_patch_ecr()
+    assert '--no-cache' not in commands['bar']
+    assert '--pull' in commands['bar']
+    assert '--cache-from' not in commands['bar']
+
+    # most recent previous version
+    ecr_client.images[('bar', 'v0.9.0')] = 'bar-1'
+    ecr_client.images[('bar', 'context-1')] = 'bar-2'
+    ecr_client.images[('bar', 'v0.9.1')] = 'bar-2'
+    ecr_client.images[('bar', 'v1.0.0')] = 'bar-3'
+    pprepo._post_patch_ecr()
+    assert f'docker pull {image_}:v0.9.1 || true' in commands['bar']
+    assert f'--pull --build-arg BUILDKIT_INLINE_CACHE=1 --cache-from {image_}:v0.9.1' in commands['bar']
+
+    # explicit version
+    pprepo.cache_from_version = 'v0.9.0'
+    pprepo._post_patch_ecr()
+    assert f'--cache-from {image_}:v0.9.0' in commands['bar']
+
+
+def test_build_batch_spec(tmp_path, repo):
+    """
+    """
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path), repo)
+    builds_ = {
+        'base.img': {'IMAGE_REPO_NAME': 'base.img'},
+        'foo': {'IMAGE_REPO_NAME': 'foo'}
+    }
+    graph = {'base.img': set(), 'foo': {'base.img', 'ubuntu'}}
+
+    # buildspec file
+    spec = pipeline_deploy.yaml.safe_load(pprepo._build_batch_spec({'name': 'builder'}, builds_, graph))
+    assert spec['version'] == 0.2
+    assert spec['batch']['fast-fail'] is False
+    assert spec['batch']['build-graph'] == [
+        {'identifier': 'base_img', 'env': {'variables': {'IMAGE_REPO_NAME': 'base.img'}}, 'buildspec': 'buildspec.yml'},
+        {'identifier': 'foo', 'env': {'variables': {'IMAGE_REPO_NAME': 'foo'}}, 'buildspec': 'buildspec.yml', 'depend-on': ['base_img']}
+    ]
+
+    # inline buildspec
+    builder = {'name': 'builder', 'source': {'buildspec': 'version: 0.2\nphases:\n  build:\n    commands:\n      - make\n'}}
+    spec = pipeline_deploy.yaml.safe_load(pprepo._build_batch_spec(builder, builds_, graph))
+    assert spec['phases'] == {'build': {'commands': ['make']}}
+    assert all('buildspec' not in b for b in spec['batch']['build-graph'])
+
+
+def test_post_patch_ecr_batch_build(tmp_path, repo, ecr_client):
+    """
+    """
+    os.mkdir(f'{repo}/dockerfiles/foo')
+    with open(f'{repo}/dockerfiles/foo/Dockerfile', 'w') as f:
+        f.write('FROM 000000000000.dkr.ecr.us-east-1.amazonaws.com/bar:v1.0.0\n')
+    _git_commit(repo)
+
+    built = []
+    def runner(env):
+        built.append(env['IMAGE_REPO_NAME'])
+        if env['IMAGE_REPO_NAME'] == 'bar' and 'fail' in env['IMAGE_TAG']:
+            raise Exception('build failed')
+        ecr_client.images[(env['IMAGE_REPO_NAME'], env['IMAGE_TAG'])] = f'{env["IMAGE_REPO_NAME"]}-{len(built)}'
+
+    # base image is built first, images are tagged with the build context
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path, wait_builds=True, batch_build=True), repo)
+    client = LocalCodeBuildClient(['test-env-pipeline-builder'], runner=runner)
+    pprepo._codebuild = CodeBuildUtils(client=client)
+    pprepo._post_patch_ecr()
+    assert built == ['bar', 'foo']
+    assert len([tag for (_, tag) in ecr_client.images if tag.startswith('context-')]) == 2
+
+    # failed base image, dependent image is not built
+    built.clear()
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path, wait_builds=True, batch_build=True, rebuild_images=True), repo, version='fail')
+    pprepo._codebuild = CodeBuildUtils(client=client)
+    with pytest.raises(SystemExit):
+        pprepo._post_patch_ecr()
+    assert built == ['bar']
+
+
+def test_run_post_patch_parallel_phases(tmp_path, repo, monkeypatch):
+    """
+    """
+    barrier = threading.Barrier(3, timeout=5)
+    calls = []
+
+    def phase(name, wait=False, fail=False):
+        def _phase(self, *args):
+            calls.append((name, ) + args)
+            # wfl and ecr phases run at the same time as the portal phase
+            if wait:
+                barrier.wait()
+            if fail:
+                sys.exit('\nExiting...')
+        return _phase
+
+    monkeypatch.setattr(pipeline_deploy.PostPatchRepo, '_post_patch_file', phase('file'))
+    monkeypatch.setattr(pipeline_deploy.PostPatchRepo, '_post_patch_folder', phase('folder', wait=True))
+    monkeypatch.setattr(pipeline_deploy.PostPatchRepo, '_post_patch_wfl', phase('wfl', wait=True))
+    monkeypatch.setattr(pipeline_deploy.PostPatchRepo, '_post_patch_ecr', phase('ecr', wait=True, fail=True))
+
+    args = _args(tmp_path, parallel_phases=True, post_software=True, post_file_format=True,
+                 post_workflow=True, post_wfl=True, post_ecr=True)
+    pprepo = pipeline_deploy.PostPatchRepo(args, repo)
+    assert list(pprepo._phases()) == ['Portal', 'WFL', 'ECR']
+
+    # all phases complete before exiting for the failed phase
+    with pytest.raises(SystemExit):
+        pprepo.run_post_patch()
+    assert sorted(calls) == [('ecr', ), ('file', 'FileFormat'), ('file', 'Software'), ('folder', 'Workflow'), ('wfl', )]
+    # portal objects are deployed in order
+    portal_calls = [c for c in calls if c[0] in ('file', 'folder')]
+    assert portal_calls == [('file', 'Software'), ('file', 'FileFormat'), ('folder', 'Workflow')]
+
+    # sequential by default
+    calls.clear()
+    monkeypatch.setattr(pipeline_deploy.PostPatchRepo, '_post_patch_folder', phase('folder'))
+    monkeypatch.setattr(pipeline_deploy.PostPatchRepo, '_post_patch_wfl', phase('wfl'))
+    monkeypatch.setattr(pipeline_deploy.PostPatchRepo, '_post_patch_ecr', phase('ecr'))
+    pprepo.parallel_phases = False
+    pprepo.run_post_patch()
+    assert calls == [('file', 'Software'), ('file', 'FileFormat'), ('folder', 'Workflow'), ('wfl', ), ('ecr', )]
+
+
+def test_profile(tmp_path, repo):
+    """
+    """
+    profile_output = str(tmp_path / 'deploy.prof')
+    args = _args(tmp_path, repos=[repo], post_software=True, post_workflow=True, debug=True,
+                 profile=True, profile_output=profile_output)
+    pipeline_deploy.main(args)
+    assert pstats.Stats(profile_output).total_calls > 0
+
+    # worker threads are not profiled
+    with pytest.raises(SystemExit):
+        pipeline_deploy.main(_args(tmp_path, repos=[repo], post_software=True, debug=True,
+                                   parallel_phases=True, profile_output=profile_output))
+
+    profiler = pipeline_deploy.profiler.Profiler()
+    pprepo = pipeline_deploy.PostPatchRepo(args, repo, profiler=profiler)
+    pprepo.run_post_patch()
+    rows = {(r['kind'], r['name']): r for r in profiler.summary()}
+    assert rows[('phase', 'Software')]['count'] == 1
+    assert rows[('phase', 'Workflow')]['count'] == 1
+    assert rows[('stage', 'load')]['count'] == 3
+    assert rows[('stage', 'validate')]['count'] == rows[('stage', 'to_json')]['count'] > 3
+    assert ('stage', 'portal_write') not in rows
+
+
+def test_metrics(tmp_path, repo, s3_client, monkeypatch):
+    """
+    """
+    existing = {'efdac7ec-7da3-4f23-9056-7a04abbc5e8b'}
+    def get_metadata(uuid, key):
+        if uuid not in existing:
+            raise Exception('not found')
+    monkeypatch.setattr(pipeline_deploy.ff_utils, 'get_metadata', get_metadata)
+    monkeypatch.setattr(pipeline_deploy.ff_utils, 'patch_metadata', lambda data, uuid, key: None)
+    monkeypatch.setattr(pipeline_deploy.ff_utils, 'post_metadata', lambda data, type, key: None)
+
+    metrics_json = str(tmp_path / 'metrics.json')
+    pipeline_deploy.main(_args(tmp_path, repos=[repo], post_software=True, post_wfl=True, metrics_json=metrics_json))
+    with open(metrics_json) as f:
+        summary = json.load(f)
+    assert summary['objects']['Software']['patched'] == 1
+    assert summary['objects']['Software']['created'] >= 1
+    assert summary['objects']['WFL'] == {'uploaded': 4}
+    assert summary['latency']['portal_get']['count'] == summary['latency']['portal_write']['count']
+    assert summary['latency']['portal_write']['bytes'] > 0
+    # description files and manifest
+    assert summary['latency']['upload']['count'] == 5
+
+    # unchanged files are skipped
+    metrics = pipeline_deploy.metrics.Metrics()
+    pprepo = pipeline_deploy.PostPatchRepo(_args(tmp_path), repo, metrics=metrics)
+    pprepo._post_patch_wfl()
+    assert metrics.summary()['objects'] == {'WFL': {'skipped': 4}}
+
+
+def test_trace_file(tmp_path, repo, s3_client):
+    """
+    """
+    trace_file = str(tmp_path / 'trace.json')
+    args = _args(tmp_path, repos=[repo], post_software=True, post_wfl=True, debug=True,
+                 parallel_phases=True, trace_file=trace_file)
+    pipeline_deploy.main(args)
+    with open(trace_file) as f:
+        events = json.load(f)['traceEvents']
+
+    spans = [e for e in events if e['ph'] == 'X']
+    assert [e['name'] for e in spans if e['cat'] == 'repo'] == [repo]
+    assert sorted(e['name'] for e in spans if e['cat'] == 'phase') == ['Software', 'WFL']
+    objects = [e for e in spans if e['cat'] == 'object']
+    assert {e['args']['type'] for e in objects} == {'Software', 'WFL'}
+    assert 'gatk' in [e['name'] for e in objects]
+    # phases run in worker threads, not in the thread running the repository
+    tids = {e['name']: e['tid'] for e in spans if e['cat'] == 'phase'}
+    repo_tid = [e['tid'] for e in spans if e['cat'] == 'repo'][0]
+    assert repo_tid not in tids.values()
+
+
+def test_bundle(tmp_path, repo, monkeypatch):
+    """
+    """
+    export_bundle = str(tmp_path / 'bundle.ndjson')
+    pipeline_deploy.main(_args(tmp_path, repos=[repo], post_software=True, post_workflow=True,
+                               post_metaworkflow=True, export_bundle=export_bundle))
+    entries = list(pipeline_deploy.bundle.read_bundle(export_bundle))
+    assert [e['type'] for e in entries][0] == 'Software'
+    assert {e['type'] for e in entries} == {'Software', 'Workflow', 'MetaWorkflow'}
+    assert all(e['pipeline'] == 'test_pipeline' and e['alias'] == e['object']['aliases'][0] for e in entries)
+
+    # replay, no YAML parsing
+    posted = []
+    monkeypatch.setattr(pipeline_deploy.ff_utils, 'get_metadata', lambda uuid, key: None)
+    monkeypatch.setattr(pipeline_deploy.ff_utils, 'patch_metadata', lambda data, uuid, key: posted.append(data['aliases'][0]))
+    monkeypatch.setattr(pipeline_deploy.yaml_parser, 'load_yaml', None)
+    args = _args(tmp_path, repos=[repo], post_software=True, post_metaworkflow=True, from_bundle=export_bundle)
+    pipeline_deploy.main(args)
+    assert posted == [e['alias'] for e in entries if e['type'] in ('Software', 'MetaWorkflow')]
+
+    # corrupted bundle
+    with open(export_bundle) as f:
+        lines = f.readlines()
+    lines[0] = lines[0].replace('gatk', 'gatk-modified')
+    with open(export_bundle, 'w') as f:
+        f.writelines(lines)
+    with pytest.raises(SystemExit):
+        pipeline_deploy.main(args)
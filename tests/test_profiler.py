@@ -0,0 +1,32 @@
+#################################################################
+#   Libraries
+#################################################################
+import sys, os
+import pytest
+from pipeline_utils.lib.profiler import Profiler
+
+#################################################################
+#   Tests
+#################################################################
+def test_profiler():
+    """
+    """
+    profiler = Profiler()
+    profiler.record('stage', 'validate', 0.1)
+    profiler.record('stage', 'validate', 0.3)
+    profiler.record('phase', 'Software', 0.5)
+    profiler.record('stage', 'upload', 0.2)
+
+    rows = {(r['kind'], r['name']): r for r in profiler.summary()}
+    assert list(rows) == [('stage', 'validate'), ('phase', 'Software'), ('stage', 'upload')]
+    assert rows[('stage', 'validate')]['count'] == 2
+    assert rows[('stage', 'validate')]['total'] == pytest.approx(0.4)
+    assert rows[('stage', 'validate')]['mean'] == pytest.approx(0.2)
+    assert rows[('stage', 'validate')]['max'] == pytest.approx(0.3)
+    assert rows[('stage', 'upload')]['count'] == 1
+
+    # phases first
+    lines = profiler.table().split('\n')
+    assert lines[0].split() == ['kind', 'name', 'count', 'total(s)', 'mean(ms)', 'max(ms)']
+    assert lines[1].split()[:3] == ['phase', 'Software', '1']
+    assert lines[2].split()[:3] == ['stage', 'validate', '2']
@@ -0,0 +1,114 @@
+#################################################################
+#   Libraries
+#################################################################
+import sys, os
+import json
+import argparse
+import pytest
+import numpy as np
+from pipeline_utils import qc_eval
+from pipeline_utils.lib import yaml_parser
+from pipeline_utils.lib import qc_evaluator
+
+#################################################################
+#   Variables
+#################################################################
+METAWORKFLOW = 'tests/repo_correct/portal_objects/metaworkflows/QC_test.yaml'
+
+#################################################################
+#   Functions
+#################################################################
+def _ruleset():
+    """Helper to load the ruleset from the test MetaWorkflow,
+    ( {c1} and {c2} ) or not ( {c3} and {rl} ) with
+    c1 coverage >= 100 | 80, c2 coverage <= 200 | 180, c3 coverage > 80 | 3.3, rl read_length == PASS | NOT PASS.
+    """
+    d = next(iter(yaml_parser.load_yaml(METAWORKFLOW)))
+    return qc_evaluator.load_rulesets(d)
+
+#################################################################
+#   Tests
+#################################################################
+def test_load_rulesets():
+    """
+    """
+    rulesets = _ruleset()
+    assert [r['name'] for r in rulesets] == ['qc_ruleset_name_1']
+    assert rulesets[0]['rule'] == '( {c1} and {c2} ) or not ( {c3} and {rl} )'
+    assert rulesets[0]['thresholds'][0] == {
+        'id': 'c1', 'metric': 'coverage', 'operator': '>=', 'pass_target': 100.0, 'warn_target': 80.0, 'use_as_qc_flag': True
+    }
+
+def test_evaluate():
+    """
+    """
+    ruleset = qc_evaluator.QCRuleset(_ruleset()[0])
+    metrics = {
+        'coverage':    ['150',  '90',   '250',  '190', '',     '50'],
+        'read_length': ['PASS', 'PASS', 'PASS', 'NOT PASS', 'PASS', 'FAIL']
+    }
+    status = ruleset.evaluate(metrics, 6)
+    P, W, F = qc_evaluator.PASS, qc_evaluator.WARN, qc_evaluator.FAIL
+    assert status['c1'].tolist() == [P, W, P, P, F, F]
+    assert status['c2'].tolist() == [P, P, F, P, F, P]
+    assert status['rl'].tolist() == [P, P, P, W, P, F]
+    # c3 fails for the missing coverage, so not ( {c3} and {rl} ) holds
+    assert status['overall'].tolist() == [P, W, F, P, P, P]
+    assert qc_evaluator.QCRuleset.summary(status)['overall'] == {'FAIL': 1, 'WARN': 1, 'PASS': 4}
+
+    # thousands of samples at once
+    n = 10000
+    metrics = {'coverage': [str(i % 300) for i in range(n)], 'read_length': ['PASS'] * n}
+    status = ruleset.evaluate(metrics, n)
+    assert status['overall'].shape == (n,)
+    assert status['c1'].tolist()[:101:20] == [F, F, F, F, W, P]
+
+def test_evaluate_missing():
+    """
+    """
+    F = qc_evaluator.FAIL
+    thresholds = [
+        {'id': 'c1', 'metric': 'coverage', 'operator': '!=', 'pass_target': 0, 'warn_target': 100},
+        {'id': 'rl', 'metric': 'read_length', 'operator': '!=', 'pass_target': 'FAIL', 'warn_target': 'NOT PASS'}
+    ]
+    ruleset = qc_evaluator.QCRuleset({'name': 'missing', 'thresholds': thresholds, 'rule': None})
+    metrics = {
+        'coverage':    ['',  'NA', '0',    '30'],
+        'read_length': ['', ' ',   'FAIL', 'PASS']
+    }
+    status = ruleset.evaluate(metrics, 4)
+    P, W = qc_evaluator.PASS, qc_evaluator.WARN
+    assert status['c1'].tolist() == [F, F, W, P]
+    assert status['rl'].tolist() == [F, F, W, P]
+    assert status['overall'].tolist() == [F, F, W, P]
+
+def test_evaluate_errors():
+    """
+    """
+    ruleset = _ruleset()[0]
+    with pytest.raises(ValueError):
+        qc_evaluator.QCRuleset(ruleset).evaluate({'coverage': ['100']}, 1)
+    for rule in ['{c1} and {missing}', '{c1} + {c2}', '( {c1} and']:
+        with pytest.raises(ValueError):
+            qc_evaluator.QCRuleset(dict(ruleset, rule=rule))
+
+def test_qc_eval(tmp_path, capsys):
+    """
+    """
+    metrics = tmp_path / 'metrics.csv'
+    metrics.write_text('sample,coverage,read_length\nA,150,PASS\nB,90,PASS\nC,250,PASS\n')
+    output = tmp_path / 'status.tsv'
+    args = argparse.Namespace(files=[METAWORKFLOW], metrics=str(metrics), sample_column='sample',
+                              rulesets=None, output=str(output), json=True)
+    qc_eval.main(args)
+    reports = json.loads(capsys.readouterr().out)
+    assert reports[0]['rulesets'][0]['summary']['overall'] == {'FAIL': 1, 'WARN': 1, 'PASS': 1}
+    lines = output.read_text().splitlines()
+    assert lines[0].split('\t')[0] == 'sample'
+    assert lines[0].split('\t')[-1] == 'gatk-HC-pipeline.qc_ruleset_name_1.overall'
+    assert [l.split('\t')[-1] for l in lines[1:]] == ['PASS', 'WARN', 'FAIL']
+
+    metrics.write_text('sample,read_length\nA,PASS\n')
+    args.json = False
+    with pytest.raises(SystemExit):
+        qc_eval.main(args)
@@ -0,0 +1,41 @@
+#################################################################
+#   Libraries
+#################################################################
+import sys, os
+import json
+import threading
+import pytest
+from pipeline_utils.lib.tracer import Tracer
+
+#################################################################
+#   Tests
+#################################################################
+def test_tracer(tmp_path):
+    """
+    """
+    tracer = Tracer()
+    with tracer.span('repo', 'repo'):
+        with tracer.span('Software', 'phase'):
+            pass
+        def _phase():
+            with tracer.span('ECR', 'phase', image='bar'):
+                pass
+        thread = threading.Thread(target=_phase, name='builder')
+        thread.start()
+        thread.join()
+
+    events = tracer.events()
+    spans = {e['name']: e for e in events if e['ph'] == 'X'}
+    threads = {e['args']['name']: e['tid'] for e in events if e['ph'] == 'M'}
+    assert set(spans) == {'repo', 'Software', 'ECR'}
+    assert spans['ECR']['args']['image'] == 'bar'
+    assert spans['ECR']['tid'] == threads['builder'] != spans['repo']['tid']
+    # nested spans are within the parent span
+    assert spans['repo']['ts'] <= spans['Software']['ts']
+    assert spans['Software']['ts'] + spans['Software']['dur'] <= spans['repo']['ts'] + spans['repo']['dur']
+    assert len({e['args']['span'] for e in spans.values()}) == 3
+
+    tracer.write(tmp_path / 'trace.json')
+    with open(tmp_path / 'trace.json') as f:
+        trace = json.load(f)
+    assert trace['traceEvents'] == events
@@ -0,0 +1,63 @@
+#################################################################
+#   Libraries
+#################################################################
+import sys, os
+import json
+import argparse
+import pytest
+from pipeline_utils import validate
+
+#################################################################
+#   Tests
+#################################################################
+def test_validate_file():
+    """
+    """
+    report = validate.validate_file('tests/repo_correct/portal_objects/software.yaml')
+    assert report['type'] == 'Software'
+    assert report['valid'] is True
+    assert report['error'] is None
+    assert [d['name'] for d in report['documents']][:2] == ['gatk', 'picard']
+
+    report = validate.validate_file('tests/repo_error/portal_objects/workflows/B_minimal-gatk-HC.yaml')
+    assert report['type'] == 'Workflow'
+    assert report['valid'] is False
+    assert any(d['errors'] for d in report['documents'])
+
+    report = validate.validate_file('tests/repo_correct/PIPELINE')
+    assert report['valid'] is False
+    assert report['error'] == 'Cannot infer object type from file path'
+
+
+def test_validate_files(tmp_path):
+    """
+    """
+    os.mkdir(tmp_path / 'metaworkflows')
+    malformed = str(tmp_path / 'metaworkflows' / 'malformed.yaml')
+    with open(malformed, 'w') as f:
+        f.write('name: [bwa\n')
+
+    files = [
+        'tests/repo_correct/portal_objects/software.yaml',
+        'tests/repo_correct/portal_objects/metaworkflows/A_gatk-HC-GT.yaml',
+        malformed
+    ]
+    reports = validate.validate_files(files, jobs=2)
+    assert [r['file'] for r in reports] == files
+    assert [r['valid'] for r in reports] == [True, True, False]
+    assert reports[2]['error'].startswith('ScannerError') or reports[2]['error'].startswith('ParserError')
+    assert validate.validate_files(files, jobs=1) == reports
+
+
+def test_validate_main(capsys):
+    """
+    """
+    args = argparse.Namespace(files=['tests/repo_correct/portal_objects/software.yaml'], jobs=1, json=True)
+    validate.main(args)
+    reports = json.loads(capsys.readouterr().out)
+    assert reports[0]['valid'] is True
+
+    args.files.append('tests/repo_error/portal_objects/software.yaml')
+    with pytest.raises(SystemExit) as e:
+        validate.main(args)
+    assert e.value.code == 1
@@ -0,0 +1,117 @@
+#################################################################
+#   Libraries
+#################################################################
+import sys, os
+import shutil
+import argparse
+import pytest
+from pipeline_utils import watch
+from pipeline_utils.lib import yaml_parser
+from pipeline_utils.lib import portal_objects
+
+#################################################################
+#   Helpers
+#################################################################
+def _args(**kwargs):
+    """Create command line arguments for watch.
+    """
+    args = {
+        'repos': [],
+        'wfl_bucket': 'BUCKETCWL',
+        'consortia': ['smaht'],
+        'submission_centers': ['smaht_dac'],
+        'poll_interval': 0,
+        'verbose': False
+    }
+    args.update(kwargs)
+    return argparse.Namespace(**args)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """Copy the test repository to a temporary folder.
+    """
+    repo_ = str(tmp_path / 'repo')
+    shutil.copytree('tests/repo_correct', repo_)
+    return repo_
+
+#################################################################
+#   Tests
+#################################################################
+def test_infer_type():
+    """
+    """
+    assert portal_objects.infer_type('repo/portal_objects/software.yaml') == 'Software'
+    assert portal_objects.infer_type('repo/portal_objects/file_format.yml') == 'FileFormat'
+    assert portal_objects.infer_type('repo/portal_objects/file_reference.yaml') == 'ReferenceFile'
+    assert portal_objects.infer_type('repo/portal_objects/reference_genome.yaml') == 'ReferenceGenome'
+    assert portal_objects.infer_type('repo/portal_objects/workflows/A_gatk-HC.yaml') == 'Workflow'
+    assert portal_objects.infer_type('repo/portal_objects/metaworkflows/A_gatk-HC-GT.yml') == 'MetaWorkflow'
+    assert portal_objects.infer_type('repo/portal_objects/workflows/README.md') is None
+    assert portal_objects.infer_type('repo/portal_objects/other.yaml') is None
+
+
+def test_validator_cache():
+    """
+    """
+    data = {'name': 'gatk', 'version': '4.1.2', 'category': ['Aligner']}
+    yaml_parser.YAMLSoftware(data)
+    validator = yaml_parser.VALIDATORS['/schemas/YAMLSoftware']
+    yaml_parser.YAMLSoftware(data)
+    assert yaml_parser.VALIDATORS['/schemas/YAMLSoftware'] is validator
+
+
+def test_watcher(repo, monkeypatch):
+    """
+    """
+    converted = []
+    to_json = portal_objects.to_json
+    def _to_json(data, type, **kwargs):
+        converted.append(data.get('name'))
+        return to_json(data, type, **kwargs)
+    monkeypatch.setattr(portal_objects, 'to_json', _to_json)
+
+    watcher = watch.Watcher(_args(), repo)
+    files_ = portal_objects.portal_files(repo)
+    assert len(files_) == 9
+
+    # first scan checks all the documents
+    assert watcher.scan() == files_
+    assert 'gatk' in converted
+    assert all(watcher._documents[fn] for fn in files_)
+
+    # nothing changed
+    converted.clear()
+    assert watcher.scan() == []
+    assert converted == []
+
+    # only the new document in the changed file is checked
+    software_ = f'{repo}/portal_objects/software.yaml'
+    with open(software_, 'a') as f:
+        f.write('\n---\nname: samtools\nversion: "1.9"\ncategory:\n  - Aligner\n')
+    assert watcher.scan() == [software_]
+    assert converted == ['samtools']
+
+    # invalid documents are reported and checked again
+    converted.clear()
+    with open(software_, 'a') as f:
+        f.write('\n---\nname: bwa\ncategory: Aligner\n')
+    assert watcher.scan() == [software_]
+    assert converted == ['bwa']
+
+    # malformed YAML does not stop the watcher
+    with open(software_, 'a') as f:
+        f.write('\n---\nname: [bwa\n')
+    assert watcher.scan() == [software_]
+
+    # removed files
+    os.remove(software_)
+    assert watcher.scan() == []
+    assert software_ not in watcher._documents
+
+    # file removed between the scan and the check
+    assert watcher._check_file(software_) == 1
+
+    # placeholder for the bucket if not specified
+    watcher = watch.Watcher(_args(wfl_bucket=None), repo)
+    assert watcher.wflbucket_url.startswith('s3://<wfl-bucket>/')
@@ -64,3 +64,27 @@ def test_file_reference_error():
                                 )
         except yaml_parser.ValidationError as e:
             pass
+
+def test_file_reference_many():
+    """
+    """
+    documents = list(yaml_parser.load_yaml('tests/repo_correct/portal_objects/file_reference.yaml'))
+    res = [
+        yaml_parser.YAMLReferenceFile(d).to_json(submission_centers=["hms-dbmi"], consortia=["cgap-core", "smaht"])
+        for d in documents
+    ]
+    many = yaml_parser.YAMLReferenceFile.to_json_many(documents, submission_centers=["hms-dbmi"], consortia=["cgap-core", "smaht"])
+    assert not isinstance(many, list)
+    assert list(many) == res
+    assert res[0]['aliases'] == ["cgap-core_smaht:ReferenceFile-reference_genome_hg38"]
+    assert yaml_parser.YAMLReferenceFile.alias_prefix(["smaht", "cgap-core"]) == "cgap-core_smaht:ReferenceFile-"
+    assert yaml_parser.string_consortia.cache_info().maxsize == yaml_parser.CONSORTIA_CACHE_SIZE
+
+    # objects already validated are converted as they are
+    objects = [yaml_parser.YAMLReferenceFile(d) for d in documents]
+    many = yaml_parser.YAMLReferenceFile.to_json_many(objects, submission_centers=["hms-dbmi"], consortia=["cgap-core", "smaht"])
+    assert list(many) == res
+
+    documents = list(yaml_parser.load_yaml('tests/repo_error/portal_objects/file_reference.yaml'))
+    with pytest.raises(yaml_parser.ValidationError):
+        list(yaml_parser.YAMLReferenceFile.to_json_many(documents, submission_centers=["hms-dbmi"], consortia=["cgap-core"]))
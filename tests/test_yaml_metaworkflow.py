@@ -333,3 +333,56 @@ def test_metaworkflow_error():
                                 )
             except yaml_parser.ValidationError as e:
                 pass
+
+def test_shards_product():
+    """
+    """
+    from pipeline_utils.lib import metaworkflow_dag
+    d = {
+        'name': 'test-pipeline',
+        'description': 'test pipeline',
+        'category': ['Variant Calling'],
+        'input': {'input_vcf': {'argument_type': 'file.vcf', 'dimensionality': 1}},
+        'workflows': {
+            'gatk-HC': {
+                'input': {'input_vcf': {'argument_type': 'file.vcf', 'source_argument_name': 'input_vcf'}},
+                'config': {'ec2_type': 'm5.xlarge'},
+                'shards': {'product': [['chr1', 'chrX'], {'range': [0, 30, 10]}]}
+            }
+        }
+    }
+    d_ = yaml_parser.YAMLMetaWorkflow(d).to_json(
+                        submission_centers=["hms-dbmi"],
+                        consortia=["cgap-core"],
+                        version='v1.0.0'
+                    )
+    assert d_['workflows'][0]['shards'] == [
+        ['chr1', '0'], ['chr1', '10'], ['chr1', '20'], ['chrX', '0'], ['chrX', '10'], ['chrX', '20']
+    ]
+    # counted without expanding
+    fanout = metaworkflow_dag.MetaWorkflowDAG(d).fanout([2])
+    assert fanout['steps']['gatk-HC'] == {'scatter': 0, 'runs': 6, 'fixed_shards': True, 'gather_input': []}
+
+    # lists of shards are still supported
+    d['workflows']['gatk-HC']['shards'] = [['0'], ['1']]
+    d_ = yaml_parser.YAMLMetaWorkflow(d).to_json(
+                        submission_centers=["hms-dbmi"],
+                        consortia=["cgap-core"],
+                        version='v1.0.0'
+                    )
+    assert d_['workflows'][0]['shards'] == [['0'], ['1']]
+
+    for shards in [{'product': []}, {'product': [{'range': [10]}]}, {'product': [['chr1']], 'chromosomes': ['chr1']}]:
+        d['workflows']['gatk-HC']['shards'] = shards
+        with pytest.raises(yaml_parser.ValidationError):
+            yaml_parser.YAMLMetaWorkflow(d)
+
+    # ranges with step 0 or without values are rejected when the object is created
+    for range_, message in [([0, 30, 0], 'has step 0'), ([10, 0], 'is empty')]:
+        d['workflows']['gatk-HC']['shards'] = {'product': [['chr1'], {'range': range_}]}
+        with pytest.raises(yaml_parser.ValidationError) as e:
+            yaml_parser.YAMLMetaWorkflow(d)
+        error = next(iter(e.value.errors))
+        assert error.validator == 'range'
+        assert list(error.relative_path) == ['workflows', 'gatk-HC', 'shards', 'product', 1, 'range']
+        assert f'gatk-HC, {range_} {message}' in str(e.value)
@@ -72,3 +72,21 @@ def test_software_error():
                                 )
         except yaml_parser.ValidationError as e:
             pass
+
+def test_software_fields():
+    """
+    """
+    d = next(yaml_parser.load_yaml('tests/repo_correct/portal_objects/software.yaml'))
+    d['unknown_field'] = 'value'
+    software = yaml_parser.YAMLSoftware(d)
+    assert not hasattr(software, '__dict__')
+    assert 'source_url' in yaml_parser.YAMLSoftware.__slots__
+    # fields in the document
+    assert software.name == 'gatk'
+    assert software.version == '4.1.2'
+    # fields in the schema not in the document
+    assert software.commit is None
+    assert software.uuid is None
+    # fields not in the schema
+    assert software.unknown_field == 'value'
+    assert getattr(software, 'missing_field', None) is None